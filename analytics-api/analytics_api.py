@@ -0,0 +1,192 @@
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import time
+import boto3
+from aiohttp import web
+from datetime import datetime
+
+S3_BUCKET_NAME = os.environ.get('S3_BUCKET_NAME', 'ecommerce-analytics-bucket')
+S3_KEY_PREFIX = os.environ.get('S3_KEY_PREFIX', 'analytics')
+REFRESH_INTERVAL_SECONDS = int(os.environ.get('REFRESH_INTERVAL_SECONDS', '60'))
+DASHBOARD_PATH = os.path.join(os.path.dirname(__file__), '..', 'dashboard.html')
+
+# Sections the Lambda exports as JSON under <prefix>/<section>/<timestamp>.json.
+SERVED_SECTIONS = ['customers', 'products', 'sales', 'payments']
+
+def encode_entry(data, source_key):
+    # Bodies are encoded (and gzipped) once per refresh, so a request is a
+    # dictionary lookup and a write of ready-made bytes.
+    body = json.dumps(data, separators=(',', ':'), default=str).encode('utf-8')
+    return {
+        'data': data,
+        'body': body,
+        'gzip_body': gzip.compress(body, compresslevel=6),
+        'etag': f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+        'source_key': source_key,
+        'loaded_at': datetime.now().isoformat()
+    }
+
+def build_summary(sections):
+    segments = sections.get('customers', {}).get('customer_segments', [])
+    total_orders = sum(segment['total_orders'] for segment in segments)
+    total_revenue = sum(segment['total_revenue'] for segment in segments)
+    return {
+        'total_customers': sum(segment['total_customers'] for segment in segments),
+        'total_orders': total_orders,
+        'total_revenue': round(total_revenue, 2),
+        'avg_order_value': round(total_revenue / total_orders, 2) if total_orders else 0
+    }
+
+class AggregateStore:
+    def __init__(self, s3_client, bucket_name, key_prefix, sections=SERVED_SECTIONS):
+        self.s3_client = s3_client
+        self.bucket_name = bucket_name
+        self.key_prefix = key_prefix
+        self.sections = sections
+        self.entries = {}
+        self.last_refresh = None
+
+    def find_newer_key(self, section_name):
+        # Export keys end in a sortable timestamp, so listing after the key
+        # already loaded only returns exports written since the last refresh.
+        prefix = f"{self.key_prefix}/{section_name}/"
+        current = self.entries.get(section_name)
+        list_kwargs = {'Bucket': self.bucket_name, 'Prefix': prefix}
+        if current:
+            list_kwargs['StartAfter'] = current['source_key']
+
+        newest_key = None
+        for page in self.s3_client.get_paginator('list_objects_v2').paginate(**list_kwargs):
+            for item in page.get('Contents', []):
+                # Only direct children: sections with several row sets export
+                # a directory per set in the columnar formats.
+                if item['Key'].endswith('.json') and '/' not in item['Key'][len(prefix):]:
+                    newest_key = max(newest_key or item['Key'], item['Key'])
+        return newest_key
+
+    def load_section(self, section_name):
+        key = self.find_newer_key(section_name)
+        if key is None:
+            return None
+        response = self.s3_client.get_object(Bucket=self.bucket_name, Key=key)
+        return encode_entry(json.loads(response['Body'].read()), key)
+
+    async def refresh(self):
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *(asyncio.to_thread(self.load_section, section_name) for section_name in self.sections),
+            return_exceptions=True
+        )
+
+        changed = []
+        for section_name, result in zip(self.sections, results):
+            if isinstance(result, Exception):
+                print(f"Error refreshing {section_name}, serving the previous export: {str(result)}")
+            elif result is not None:
+                self.entries[section_name] = result
+                changed.append(section_name)
+
+        if changed:
+            sections = {
+                section_name: self.entries[section_name]['data']
+                for section_name in self.sections if section_name in self.entries
+            }
+            self.entries['summary'] = encode_entry(build_summary(sections), None)
+            self.entries['all'] = encode_entry(dict(sections, summary=self.entries['summary']['data']), None)
+        self.last_refresh = datetime.now().isoformat()
+        print(f"Refreshed {changed or 'no'} sections in {(time.perf_counter() - started) * 1000:.1f}ms")
+        return changed
+
+    async def refresh_forever(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"Error refreshing aggregate store: {str(e)}")
+
+def entry_response(request, entry):
+    headers = {
+        'ETag': entry['etag'],
+        'Cache-Control': f"max-age={REFRESH_INTERVAL_SECONDS}"
+    }
+    if_none_match = request.headers.get('If-None-Match', '')
+    if entry['etag'] in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*':
+        return web.Response(status=304, headers=headers)
+
+    headers['Vary'] = 'Accept-Encoding'
+    if 'gzip' in request.headers.get('Accept-Encoding', ''):
+        headers['Content-Encoding'] = 'gzip'
+        return web.Response(body=entry['gzip_body'], content_type='application/json', headers=headers)
+    return web.Response(body=entry['body'], content_type='application/json', headers=headers)
+
+async def get_section(request):
+    entry = request.app['store'].entries.get(request.match_info['section_name'])
+    if entry is None:
+        raise web.HTTPNotFound(text=json.dumps({'error': 'No export loaded for this section'}), content_type='application/json')
+    return entry_response(request, entry)
+
+async def get_all_sections(request):
+    entry = request.app['store'].entries.get('all')
+    if entry is None:
+        raise web.HTTPServiceUnavailable(text=json.dumps({'error': 'No exports loaded yet'}), content_type='application/json')
+    return entry_response(request, entry)
+
+async def post_refresh(request):
+    changed = await request.app['store'].refresh()
+    return web.json_response({'changed_sections': changed, 'timestamp': datetime.now().isoformat()})
+
+async def get_health(request):
+    store = request.app['store']
+    return web.json_response({
+        'sections': {
+            section_name: {'source_key': entry['source_key'], 'loaded_at': entry['loaded_at'], 'etag': entry['etag']}
+            for section_name, entry in store.entries.items()
+            if section_name in store.sections
+        },
+        'last_refresh': store.last_refresh
+    })
+
+async def get_dashboard(request):
+    return web.FileResponse(DASHBOARD_PATH)
+
+def create_app(store, refresh_interval=REFRESH_INTERVAL_SECONDS):
+    app = web.Application()
+    app['store'] = store
+
+    async def start_refresh(app):
+        await store.refresh()
+        app['refresh_task'] = asyncio.create_task(store.refresh_forever(refresh_interval))
+
+    async def stop_refresh(app):
+        app['refresh_task'].cancel()
+
+    app.on_startup.append(start_refresh)
+    app.on_cleanup.append(stop_refresh)
+    app.router.add_get('/', get_dashboard)
+    app.router.add_get('/api/sections', get_all_sections)
+    app.router.add_get('/api/sections/{section_name}', get_section)
+    app.router.add_post('/api/refresh', post_refresh)
+    app.router.add_get('/health', get_health)
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the exported analytics sections from memory")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--bucket', default=S3_BUCKET_NAME)
+    parser.add_argument('--prefix', default=S3_KEY_PREFIX)
+    parser.add_argument('--s3-endpoint', default=None, help="S3-compatible endpoint to read exports from")
+    parser.add_argument('--refresh-interval', type=int, default=REFRESH_INTERVAL_SECONDS)
+    args = parser.parse_args()
+
+    s3_client = boto3.client('s3', endpoint_url=args.s3_endpoint)
+    store = AggregateStore(s3_client, args.bucket, args.prefix)
+    web.run_app(create_app(store, args.refresh_interval), host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
@@ -47,6 +47,128 @@ CREATE EXTERNAL TABLE IF NOT EXISTS ecommerce_analytics.payment_methods (
 ROW FORMAT SERDE 'org.openx.data.jsonserde.JsonSerDe'
 LOCATION 's3://ecommerce-analytics-bucket/analytics/payments/';
 
+CREATE EXTERNAL TABLE IF NOT EXISTS ecommerce_analytics.sales_analytics (
+    order_id INT,
+    customer_id INT,
+    order_date TIMESTAMP,
+    order_quarter INT,
+    status STRING,
+    total_amount DECIMAL(10,2),
+    total_items BIGINT,
+    unique_products BIGINT,
+    avg_item_price DECIMAL(14,6)
+)
+PARTITIONED BY (order_year INT, order_month INT)
+STORED AS PARQUET
+LOCATION 's3://ecommerce-datalake-bucket/analytics/sales/';
+
+CREATE EXTERNAL TABLE IF NOT EXISTS ecommerce_analytics.raw_customers (
+    customer_id INT,
+    first_name STRING,
+    last_name STRING,
+    email STRING,
+    phone STRING,
+    address STRING,
+    city STRING,
+    state STRING,
+    zip_code STRING,
+    country STRING,
+    registration_date DATE,
+    customer_segment STRING,
+    total_spent DECIMAL(10,2),
+    last_purchase_date DATE,
+    ingested_at TIMESTAMP
+)
+PARTITIONED BY (ingest_date STRING)
+STORED AS PARQUET
+LOCATION 's3://ecommerce-datalake-bucket/raw/customers/';
+
+CREATE EXTERNAL TABLE IF NOT EXISTS ecommerce_analytics.raw_orders (
+    order_id INT,
+    customer_id INT,
+    order_date TIMESTAMP,
+    status STRING,
+    total_amount DECIMAL(10,2),
+    shipping_address STRING,
+    shipping_city STRING,
+    shipping_state STRING,
+    shipping_zip STRING,
+    shipping_cost DECIMAL(8,2),
+    tax_amount DECIMAL(8,2),
+    discount_amount DECIMAL(8,2),
+    promo_code STRING,
+    updated_at TIMESTAMP,
+    ingested_at TIMESTAMP
+)
+PARTITIONED BY (ingest_date STRING)
+STORED AS PARQUET
+LOCATION 's3://ecommerce-datalake-bucket/raw/orders/';
+
+CREATE EXTERNAL TABLE IF NOT EXISTS ecommerce_analytics.raw_products (
+    product_id INT,
+    product_name STRING,
+    category STRING,
+    subcategory STRING,
+    brand STRING,
+    price DECIMAL(10,2),
+    cost DECIMAL(10,2),
+    stock_quantity INT,
+    description STRING,
+    created_date DATE,
+    is_active BOOLEAN,
+    ingested_at TIMESTAMP
+)
+PARTITIONED BY (ingest_date STRING)
+STORED AS PARQUET
+LOCATION 's3://ecommerce-datalake-bucket/raw/products/';
+
+CREATE EXTERNAL TABLE IF NOT EXISTS ecommerce_analytics.raw_order_items (
+    order_item_id INT,
+    order_id INT,
+    product_id INT,
+    quantity INT,
+    unit_price DECIMAL(10,2),
+    total_price DECIMAL(10,2),
+    ingested_at TIMESTAMP
+)
+PARTITIONED BY (ingest_date STRING)
+STORED AS PARQUET
+LOCATION 's3://ecommerce-datalake-bucket/raw/order_items/';
+
+CREATE EXTERNAL TABLE IF NOT EXISTS ecommerce_analytics.raw_reviews (
+    review_id INT,
+    customer_id INT,
+    product_id INT,
+    order_id INT,
+    rating INT,
+    review_title STRING,
+    review_text STRING,
+    review_date TIMESTAMP,
+    is_verified_purchase BOOLEAN,
+    helpful_votes INT,
+    ingested_at TIMESTAMP
+)
+PARTITIONED BY (ingest_date STRING)
+STORED AS PARQUET
+LOCATION 's3://ecommerce-datalake-bucket/raw/reviews/';
+
+CREATE EXTERNAL TABLE IF NOT EXISTS ecommerce_analytics.raw_payments (
+    payment_id INT,
+    order_id INT,
+    payment_method STRING,
+    payment_status STRING,
+    amount DECIMAL(10,2),
+    payment_date TIMESTAMP,
+    transaction_id STRING,
+    refund_amount DECIMAL(10,2),
+    refund_date TIMESTAMP,
+    updated_at TIMESTAMP,
+    ingested_at TIMESTAMP
+)
+PARTITIONED BY (ingest_date STRING)
+STORED AS PARQUET
+LOCATION 's3://ecommerce-datalake-bucket/raw/payments/';
+
 SELECT 
     customer_segment,
     customer_count,
@@ -180,4 +302,15 @@ UNION ALL
 SELECT 
     'Average Order Value',
     ROUND(AVG(avg_order_value), 2)
-FROM ecommerce_analytics.monthly_sales;
\ No newline at end of file
+FROM ecommerce_analytics.monthly_sales;
+
+SELECT 
+    order_year,
+    order_month,
+    COUNT(*) as total_orders,
+    SUM(total_amount) as total_revenue,
+    COUNT(DISTINCT customer_id) as unique_customers
+FROM ecommerce_analytics.sales_analytics
+WHERE order_year = 2024 AND order_month BETWEEN 1 AND 3
+GROUP BY order_year, order_month
+ORDER BY order_year, order_month;
@@ -134,7 +134,8 @@ deploy_lambda() {
     
     # Create deployment package
     cd aws-lambda
-    zip -r data-processor.zip data_processor.py
+    zip -r data-processor.zip data_processor.py customer_insights.py athena_runner.py
+    zip -j data-processor.zip ../aws-athena/athena_queries.sql
     cd ..
     
     # Get function name from stack outputs
@@ -169,7 +170,9 @@ setup_glue_job() {
         --default-arguments '{
             "--job-language": "python",
             "--job-bookmark-option": "job-bookmark-enable",
-            "--enable-metrics": "true"
+            "--enable-metrics": "true",
+            "--FULL_REFRESH": "false",
+            "--JDBC_FETCH_SIZE": "10000"
         }' \
         --max-capacity 2 \
         --region "$REGION" || log_warning "Glue job may already exist"
@@ -1,15 +1,28 @@
 import sys
+import json
+import time
+import resource
+import urllib.request
+import boto3
 from awsglue.transforms import *
 from awsglue.utils import getResolvedOptions
+from pyspark import SparkConf
 from pyspark.context import SparkContext
 from awsglue.context import GlueContext
 from awsglue.job import Job
 from awsglue.dynamicframe import DynamicFrame
 from pyspark.sql import functions as F
 from pyspark.sql.types import *
-from datetime import datetime
+from pyspark.sql.window import Window
+from pyspark import StorageLevel
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 
-sc = SparkContext()
+# FAIR scheduling lets Spark jobs submitted from concurrent driver threads
+# share executors instead of queueing behind each other.
+sc = SparkContext(conf=SparkConf().set("spark.scheduler.mode", "FAIR"))
 glueContext = GlueContext(sc)
 spark = glueContext.spark_session
 job = Job(glueContext)
@@ -23,6 +36,188 @@ args = getResolvedOptions(sys.argv, [
 
 job.init(args['JOB_NAME'], args)
 
+def get_optional_arg(name, default):
+    if f"--{name}" in sys.argv:
+        return getResolvedOptions(sys.argv, [name])[name]
+    return default
+
+FULL_REFRESH = get_optional_arg('FULL_REFRESH', 'false').lower() == 'true'
+
+JDBC_URL = f"jdbc:mysql://your-rds-endpoint:3306/{args['DATABASE_NAME']}?useCursorFetch=true"
+JDBC_USER = "admin"
+JDBC_PASSWORD = "your-password"
+
+RAW_PATH = f"{args['S3_OUTPUT_PATH']}/raw"
+ANALYTICS_PATH = f"{args['S3_OUTPUT_PATH']}/analytics"
+WATERMARK_PATH = f"{args['S3_OUTPUT_PATH']}/_state/watermarks.json"
+METRICS_PATH = f"{args['S3_OUTPUT_PATH']}/_state/metrics"
+
+s3_client = boto3.client('s3')
+glue_client = boto3.client('glue')
+run_started_at = datetime.now()
+
+CATALOG_DATABASE = get_optional_arg('CATALOG_DATABASE', 'ecommerce_analytics')
+TARGET_FILE_SIZE_MB = int(get_optional_arg('TARGET_FILE_SIZE_MB', '128'))
+MAX_RECORDS_PER_FILE = int(get_optional_arg('MAX_RECORDS_PER_FILE', '1000000'))
+# Number of independent pipeline stages (extracts, transforms, writes) run at
+# once. Each concurrent extract also opens READ_PARTITIONS JDBC connections.
+STAGE_PARALLELISM = int(get_optional_arg('STAGE_PARALLELISM', '4'))
+
+# Only the partitions present in a write are replaced, and adaptive execution
+# coalesces shuffle output towards the target file size.
+spark.conf.set("spark.sql.sources.partitionOverwriteMode", "dynamic")
+spark.conf.set("spark.sql.files.maxRecordsPerFile", MAX_RECORDS_PER_FILE)
+spark.conf.set("spark.sql.adaptive.enabled", "true")
+spark.conf.set("spark.sql.adaptive.coalescePartitions.enabled", "true")
+spark.conf.set("spark.sql.adaptive.advisoryPartitionSizeInBytes", f"{TARGET_FILE_SIZE_MB}m")
+# Shuffle joins split partitions that are much larger than the median.
+spark.conf.set("spark.sql.adaptive.skewJoin.enabled", "true")
+
+PRIMARY_KEYS = {
+    "customers": "customer_id",
+    "orders": "order_id",
+    "products": "product_id",
+    "order_items": "order_item_id",
+    "reviews": "review_id",
+    "payments": "payment_id"
+}
+
+# Tables extracted incrementally above the saved high-water mark. orders and
+# payments change status after insert, so they are tracked on updated_at
+# (ON UPDATE CURRENT_TIMESTAMP) and changed rows are extracted again.
+# customers and products are small and updated in place, so they are always reloaded.
+WATERMARK_COLUMNS = {
+    "orders": "updated_at",
+    "order_items": "order_item_id",
+    "reviews": "review_date",
+    "payments": "updated_at"
+}
+
+# Timestamp watermarks re-read this many seconds below the saved value, so
+# rows written in the same second or committed after a later row are not
+# missed. The raw merge keeps one version of each key, so overlap is harmless.
+WATERMARK_OVERLAP_SECONDS = int(get_optional_arg('WATERMARK_OVERLAP_SECONDS', '300'))
+
+# Number of parallel JDBC range reads per table, split on the primary key.
+# Override with --READ_PARTITIONS '{"order_items": 32}'.
+READ_PARTITIONS = {
+    "customers": 1,
+    "products": 1,
+    "orders": 8,
+    "order_items": 16,
+    "reviews": 4,
+    "payments": 8
+}
+READ_PARTITIONS.update(json.loads(get_optional_arg('READ_PARTITIONS', '{}')))
+
+JDBC_FETCH_SIZE = int(get_optional_arg('JDBC_FETCH_SIZE', '10000'))
+
+STRICT_SCHEMA = get_optional_arg('STRICT_SCHEMA', 'false').lower() == 'true'
+
+CACHE_STORAGE_LEVEL = getattr(StorageLevel, get_optional_arg('CACHE_STORAGE_LEVEL', 'MEMORY_AND_DISK'))
+
+# Join sides whose estimated size is at or below this are broadcast to every
+# executor instead of being shuffled; the default matches Spark's own
+# autoBroadcastJoinThreshold.
+BROADCAST_SIZE_LIMIT_BYTES = int(get_optional_arg('BROADCAST_SIZE_MB', '10')) * 1024 * 1024
+
+# Rows are sorted on these columns when written or compacted, so each Parquet
+# row group covers a narrow key range and filters on them can skip row groups
+# using the min/max statistics.
+CLUSTER_KEYS = {
+    "customers": ["customer_id"],
+    "orders": ["customer_id", "order_date"],
+    "products": ["product_id"],
+    "order_items": ["product_id", "order_id"],
+    "reviews": ["product_id", "customer_id"],
+    "payments": ["order_id", "payment_date"]
+}
+ANALYTICS_CLUSTER_KEYS = {
+    "customers": ["customer_id"],
+    "products": ["product_id"],
+    "sales": ["customer_id", "order_date"]
+}
+ANALYTICS_PARTITION_KEYS = {
+    "sales": ["order_year", "order_month"]
+}
+
+# After a successful run the raw and analytics zones are compacted: raw
+# ingest_date partitions beyond the newest KEEP_RAW_SNAPSHOTS are folded into
+# one, and partitions with at least COMPACT_MIN_FILES files (more than their
+# size needs) are rewritten into sorted files of about TARGET_FILE_SIZE_MB.
+COMPACTION_ENABLED = get_optional_arg('COMPACTION_ENABLED', 'true').lower() == 'true'
+KEEP_RAW_SNAPSHOTS = int(get_optional_arg('KEEP_RAW_SNAPSHOTS', '7'))
+COMPACT_MIN_FILES = int(get_optional_arg('COMPACT_MIN_FILES', '4'))
+COMPACTION_STAGING_PATH = f"{args['S3_OUTPUT_PATH']}/_state/compaction"
+
+class DataFrameCache:
+    def __init__(self, storage_level):
+        self.storage_level = storage_level
+        self.cached = {}
+        self.row_counts = {}
+    
+    def persist(self, name, df, storage_level=None):
+        df = df.persist(storage_level or self.storage_level)
+        row_count = df.count()
+        self.cached[name] = df
+        self.row_counts[name] = row_count
+        print(f"Cached {name}: {row_count} rows at {df.storageLevel}")
+        return df
+    
+    def release(self, *names):
+        for name in names:
+            df = self.cached.pop(name, None)
+            if df is not None:
+                df.unpersist()
+    
+    def release_all(self):
+        self.release(*list(self.cached))
+
+cache = DataFrameCache(CACHE_STORAGE_LEVEL)
+
+class StageScheduler:
+    def __init__(self, parallelism):
+        self.parallelism = parallelism
+        self.stages = {}
+    
+    def add(self, name, function, depends_on=()):
+        missing = [dependency for dependency in depends_on if dependency not in self.stages]
+        if missing:
+            raise ValueError(f"Stage {name} depends on unknown stages: {missing}")
+        self.stages[name] = (function, tuple(depends_on))
+    
+    def run_stage(self, name, results):
+        # Each stage gets its own fair scheduler pool, so a long write cannot
+        # starve the extracts and writes running beside it.
+        spark.sparkContext.setLocalProperty("spark.scheduler.pool", name)
+        function, depends_on = self.stages[name]
+        return function(*(results[dependency] for dependency in depends_on))
+    
+    def run(self):
+        results = {}
+        pending = dict(self.stages)
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.parallelism, thread_name_prefix="stage") as executor:
+            while pending or running:
+                for name, (_, depends_on) in list(pending.items()):
+                    if all(dependency in results for dependency in depends_on):
+                        running[executor.submit(self.run_stage, name, results)] = name
+                        del pending[name]
+                
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    error = future.exception()
+                    if error is not None:
+                        # Fail fast: nothing new starts, and Spark jobs still
+                        # running for sibling stages are cancelled.
+                        print(f"Stage {name} failed, cancelling {sorted(running.values())}")
+                        spark.sparkContext.cancelAllJobs()
+                        executor.shutdown(wait=True, cancel_futures=True)
+                        raise error
+                    results[name] = future.result()
+        return results
+
 customer_schema = StructType([
     StructField("customer_id", IntegerType(), True),
     StructField("first_name", StringType(), True),
@@ -53,7 +248,8 @@ order_schema = StructType([
     StructField("shipping_cost", DecimalType(8,2), True),
     StructField("tax_amount", DecimalType(8,2), True),
     StructField("discount_amount", DecimalType(8,2), True),
-    StructField("promo_code", StringType(), True)
+    StructField("promo_code", StringType(), True),
+    StructField("updated_at", TimestampType(), True)
 ])
 
 product_schema = StructType([
@@ -101,30 +297,373 @@ payment_schema = StructType([
     StructField("payment_date", TimestampType(), True),
     StructField("transaction_id", StringType(), True),
     StructField("refund_amount", DecimalType(10,2), True),
-    StructField("refund_date", TimestampType(), True)
+    StructField("refund_date", TimestampType(), True),
+    StructField("updated_at", TimestampType(), True)
 ])
 
-def extract_data_from_rds(table_name, schema):
+def split_s3_path(path):
+    bucket, _, key = path.replace("s3://", "", 1).partition("/")
+    return bucket, key
+
+stage_records = []
+
+def get_s3_object_sizes(path):
+    bucket, prefix = split_s3_path(path)
+    sizes = {}
+    for page in s3_client.get_paginator('list_objects_v2').paginate(Bucket=bucket, Prefix=prefix):
+        sizes.update((item['Key'], item['Size']) for item in page.get('Contents', []))
+    return sizes
+
+def get_written_bytes(path, sizes_before):
+    # Spark gives every output file a unique name, so the files a write
+    # produced are the keys that were not there before it. Earlier appends
+    # and partitions an overwrite left alone are not counted.
+    return sum(size for key, size in get_s3_object_sizes(path).items() if key not in sizes_before)
+
+@contextmanager
+def timed_stage(stage_name, rows=None):
+    record = {'stage': stage_name, 'rows': rows, 'bytes': None, 'status': 'ok'}
+    # Spark jobs started inside the stage are grouped under its name in the
+    # Spark UI, which is where executor-side time and shuffle sizes live.
+    spark.sparkContext.setJobGroup(stage_name, stage_name)
+    started = time.perf_counter()
     try:
-        dynamic_frame = glueContext.create_dynamic_frame.from_options(
-            connection_type="mysql",
-            connection_options={
-                "url": f"jdbc:mysql://your-rds-endpoint:3306/{args['DATABASE_NAME']}",
-                "dbtable": table_name,
-                "user": "admin",
-                "password": "your-password"
-            },
-            transformation_ctx=f"extract_{table_name}"
+        yield record
+    except Exception:
+        record['status'] = 'error'
+        raise
+    finally:
+        record['duration_ms'] = round((time.perf_counter() - started) * 1000, 2)
+        record['driver_peak_rss_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+        stage_records.append(record)
+        print(json.dumps(dict(record, metric='glue_stage')))
+
+def save_stage_metrics():
+    # Stages overlap, so total_ms (the sum of stage durations) can exceed
+    # wall_ms; the gap is what running them concurrently saved.
+    summary = {
+        'run_started_at': run_started_at.isoformat(),
+        'wall_ms': round((datetime.now() - run_started_at).total_seconds() * 1000, 2),
+        'total_ms': round(sum(record['duration_ms'] for record in stage_records), 2),
+        'stages': stage_records
+    }
+    print(json.dumps(dict(summary, metric='glue_run_summary')))
+    bucket, prefix = split_s3_path(METRICS_PATH)
+    s3_client.put_object(
+        Bucket=bucket,
+        Key=f"{prefix}/{run_started_at.strftime('%Y%m%d_%H%M%S')}.json",
+        Body=json.dumps(summary),
+        ContentType='application/json'
+    )
+
+def load_watermarks():
+    bucket, key = split_s3_path(WATERMARK_PATH)
+    try:
+        response = s3_client.get_object(Bucket=bucket, Key=key)
+        return json.loads(response['Body'].read())
+    except s3_client.exceptions.NoSuchKey:
+        print("No saved watermarks found, extracting all rows")
+        return {}
+
+def save_watermarks(watermarks):
+    bucket, key = split_s3_path(WATERMARK_PATH)
+    s3_client.put_object(
+        Bucket=bucket,
+        Key=key,
+        Body=json.dumps(watermarks),
+        ContentType='application/json'
+    )
+    print(f"Saved watermarks to {WATERMARK_PATH}: {watermarks}")
+
+def build_watermark_condition(table_name, watermark=None):
+    watermark_column = WATERMARK_COLUMNS.get(table_name)
+    if watermark is None or watermark_column is None:
+        return None
+    
+    if isinstance(watermark, str):
+        return f"{watermark_column} >= TIMESTAMPADD(SECOND, -{WATERMARK_OVERLAP_SECONDS}, '{watermark}')"
+    return f"{watermark_column} > {watermark}"
+
+def build_source_query(table_name, watermark=None):
+    condition = build_watermark_condition(table_name, watermark)
+    if condition is None:
+        return table_name
+    
+    return f"(SELECT * FROM {table_name} WHERE {condition}) AS {table_name}_delta"
+
+# Every query against RDS goes through jdbc_reader, so these counts show how
+# often each source table was read in a run: the key bounds query and one
+# extract for partitioned reads, the extract alone otherwise.
+jdbc_reads = defaultdict(int)
+
+def jdbc_reader(table_name, dbtable):
+    jdbc_reads[table_name] += 1
+    return spark.read.format("jdbc") \
+        .option("url", JDBC_URL) \
+        .option("dbtable", dbtable) \
+        .option("user", JDBC_USER) \
+        .option("password", JDBC_PASSWORD) \
+        .option("fetchsize", JDBC_FETCH_SIZE)
+
+def get_key_bounds(table_name, watermark=None):
+    key = PRIMARY_KEYS[table_name]
+    condition = build_watermark_condition(table_name, watermark)
+    where_clause = f" WHERE {condition}" if condition else ""
+    bounds_query = f"(SELECT MIN({key}) AS lower_bound, MAX({key}) AS upper_bound FROM {table_name}{where_clause}) AS {table_name}_bounds"
+    
+    bounds = jdbc_reader(table_name, bounds_query).load().collect()[0]
+    return bounds["lower_bound"], bounds["upper_bound"]
+
+def find_schema_mismatches(df, schema):
+    source_types = {field.name.lower(): field for field in df.schema.fields}
+    mismatches = []
+    
+    for field in schema.fields:
+        source_field = source_types.get(field.name.lower())
+        if source_field is None:
+            mismatches.append(f"{field.name}: missing from source")
+        elif source_field.dataType != field.dataType:
+            mismatches.append(
+                f"{field.name}: source {source_field.dataType.simpleString()} != expected {field.dataType.simpleString()}"
+            )
+    
+    return mismatches
+
+def apply_schema(df, schema, table_name, strict=False):
+    mismatches = find_schema_mismatches(df, schema)
+    if mismatches:
+        report = "; ".join(mismatches)
+        if strict:
+            raise ValueError(f"Schema mismatch for {table_name}: {report}")
+        print(f"Casting {table_name} to expected schema: {report}")
+    
+    source_columns = {column.lower(): column for column in df.columns}
+    return df.select([
+        (F.col(source_columns[field.name.lower()]) if field.name.lower() in source_columns else F.lit(None))
+        .cast(field.dataType)
+        .alias(field.name)
+        for field in schema.fields
+    ])
+
+def extract_data_from_rds(table_name, schema, watermark=None):
+    # Errors propagate so the extract stage, and the scheduler, report the
+    # table that failed rather than a missing input further down.
+    reader = jdbc_reader(table_name, build_source_query(table_name, watermark))
+    
+    num_partitions = READ_PARTITIONS.get(table_name, 1)
+    if num_partitions > 1:
+        lower_bound, upper_bound = get_key_bounds(table_name, watermark)
+        if lower_bound is not None and upper_bound > lower_bound:
+            num_partitions = min(num_partitions, upper_bound - lower_bound + 1)
+            print(f"Reading {table_name} in {num_partitions} partitions on {PRIMARY_KEYS[table_name]} [{lower_bound}, {upper_bound}]")
+            reader = reader \
+                .option("partitionColumn", PRIMARY_KEYS[table_name]) \
+                .option("lowerBound", lower_bound) \
+                .option("upperBound", upper_bound) \
+                .option("numPartitions", num_partitions)
+    
+    return apply_schema(reader.load(), schema, table_name, STRICT_SCHEMA)
+
+def get_new_watermark(table_name, df, watermark=None):
+    watermark_column = WATERMARK_COLUMNS.get(table_name)
+    if watermark_column is None:
+        return None
+    
+    latest = df.agg(F.max(watermark_column).alias("latest")).collect()[0]["latest"]
+    if latest is None:
+        return watermark
+    if isinstance(latest, datetime):
+        return latest.strftime('%Y-%m-%d %H:%M:%S')
+    return int(latest)
+
+def register_partitions(catalog_table, path, df, partition_keys):
+    try:
+        table = glue_client.get_table(DatabaseName=CATALOG_DATABASE, Name=catalog_table)['Table']
+    except glue_client.exceptions.EntityNotFoundException:
+        print(f"Catalog table {CATALOG_DATABASE}.{catalog_table} not found, skipping partition registration")
+        return
+    
+    partitions = []
+    for row in df.select(*partition_keys).distinct().collect():
+        values = [str(row[key]) for key in partition_keys]
+        partition_path = "/".join(f"{key}={value}" for key, value in zip(partition_keys, values))
+        storage_descriptor = dict(table['StorageDescriptor'], Location=f"{path.rstrip('/')}/{partition_path}/")
+        partitions.append({'Values': values, 'StorageDescriptor': storage_descriptor})
+    
+    for start in range(0, len(partitions), 100):
+        response = glue_client.batch_create_partition(
+            DatabaseName=CATALOG_DATABASE,
+            TableName=catalog_table,
+            PartitionInputList=partitions[start:start + 100]
         )
+        for error in response.get('Errors', []):
+            if error['ErrorDetail']['ErrorCode'] != 'AlreadyExistsException':
+                print(f"Error registering partition {error['PartitionValues']} for {catalog_table}: {error['ErrorDetail']['ErrorMessage']}")
+    
+    print(f"Registered {len(partitions)} partitions for {CATALOG_DATABASE}.{catalog_table}")
+
+def cluster(df, keys):
+    # Range partitioning gives each file a disjoint slice of the keys, and
+    # adaptive execution sizes the slices towards TARGET_FILE_SIZE_MB.
+    return df.repartitionByRange(*keys).sortWithinPartitions(*keys)
+
+def write_partitioned_parquet(df, path, partition_keys, mode="overwrite", replace_all=False,
+                              catalog_table=None, cluster_by_keys=True, sort_keys=()):
+    # Clustering by the partition keys gives one task (and few files) per
+    # partition. Single-valued partitions such as ingest_date skip it so the
+    # write keeps the parallelism of the read.
+    if cluster_by_keys:
+        df = df.repartition(*partition_keys)
+    if sort_keys:
+        df = df.sortWithinPartitions(*partition_keys, *sort_keys)
+    
+    writer = df.write \
+        .mode(mode) \
+        .partitionBy(*partition_keys)
+    if replace_all:
+        writer = writer.option("partitionOverwriteMode", "static")
+    writer.parquet(path)
+    
+    if catalog_table:
+        register_partitions(catalog_table, path, df, partition_keys)
+
+def write_raw_data(table_name, df):
+    raw_df = df.withColumn(
+        "ingested_at", F.lit(run_started_at).cast(TimestampType())
+    ).withColumn(
+        "ingest_date", F.lit(run_started_at.strftime('%Y-%m-%d'))
+    )
+    
+    incremental = not FULL_REFRESH and table_name in WATERMARK_COLUMNS
+    write_partitioned_parquet(
+        raw_df,
+        f"{RAW_PATH}/{table_name}/",
+        ["ingest_date"],
+        mode="append" if incremental else "overwrite",
+        replace_all=not incremental,
+        catalog_table=f"raw_{table_name}",
+        cluster_by_keys=False,
+        sort_keys=CLUSTER_KEYS[table_name]
+    )
+
+def keep_latest_rows(raw_df, table_name):
+    latest_first = Window.partitionBy(PRIMARY_KEYS[table_name]) \
+        .orderBy(F.col("ingested_at").desc())
+    
+    return raw_df.withColumn("_row_rank", F.row_number().over(latest_first)) \
+        .filter(F.col("_row_rank") == 1) \
+        .drop("_row_rank")
+
+def get_order_months(orders_df):
+    return [tuple(row) for row in orders_df.select(F.year("order_date"), F.month("order_date")).distinct().collect()]
+
+def in_order_months(order_months):
+    # Date ranges rather than year()/month(), so the filter is pushed down to
+    # the Parquet scan.
+    condition = F.lit(False)
+    for year, month in order_months:
+        month_start = datetime(year, month, 1)
+        next_month = datetime(year + month // 12, month % 12 + 1, 1)
+        condition = condition | ((F.col("order_date") >= month_start) & (F.col("order_date") < next_month))
+    return condition
+
+def read_raw_table(table_name, condition=None):
+    raw_df = spark.read.parquet(f"{RAW_PATH}/{table_name}/")
+    if condition is not None:
+        raw_df = raw_df.filter(condition)
+    return keep_latest_rows(raw_df, table_name).drop("ingested_at", "ingest_date")
+
+def load_source_table(table_name, schema, watermarks):
+    watermark = watermarks.get(table_name)
+    with timed_stage(f"extract.{table_name}") as stage:
+        df = extract_data_from_rds(table_name, schema, watermark)
         
-        df = dynamic_frame.toDF()
-        df = spark.createDataFrame(df.rdd, schema)
-        
-        return df
+        # Materialize the JDBC read once; the watermark, the raw write and the
+        # transforms all reuse the cached rows instead of querying RDS again.
+        df = cache.persist(table_name, df)
+        stage['rows'] = cache.row_counts[table_name]
+    new_watermark = get_new_watermark(table_name, df, watermark)
+    
+    with timed_stage(f"write_raw.{table_name}", rows=cache.row_counts[table_name]) as stage:
+        raw_partition = f"{RAW_PATH}/{table_name}/ingest_date={run_started_at.strftime('%Y-%m-%d')}/"
+        sizes_before = get_s3_object_sizes(raw_partition)
+        write_raw_data(table_name, df)
+        stage['bytes'] = get_written_bytes(raw_partition, sizes_before)
+    
+    if FULL_REFRESH or table_name not in WATERMARK_COLUMNS:
+        return df, new_watermark
+    
+    with timed_stage(f"merge.{table_name}") as stage:
+        condition = None
+        if table_name == "orders":
+            # Orders only feed the sales table, where the write replaces just
+            # the order_year/order_month partitions present in its input, so
+            # only the months the delta touches are merged and rewritten.
+            order_months = get_order_months(df)
+            condition = in_order_months(order_months)
+            print(f"Merging {table_name} in {len(order_months)} order months touched by the delta")
+        print(f"Merged {table_name} delta above watermark {watermark}")
+        merged_df = read_raw_table(table_name, condition)
+        cache.release(table_name)
+        merged_df = cache.persist(table_name, merged_df)
+        stage['rows'] = cache.row_counts[table_name]
+    return merged_df, new_watermark
+
+def fetch_spark_api(path):
+    api = f"{spark.sparkContext.uiWebUrl}/api/v1/applications/{spark.sparkContext.applicationId}"
+    with urllib.request.urlopen(f"{api}/{path}") as response:
+        return json.load(response)
+
+def get_job_group_stages(job_group):
+    stage_ids = {
+        stage_id
+        for job in fetch_spark_api("jobs") if job.get("jobGroup") == job_group
+        for stage_id in job["stageIds"]
+    }
+    return [stage for stage in fetch_spark_api("stages?status=complete") if stage["stageId"] in stage_ids]
+
+def get_task_skew(job_group):
+    # Task run-time spread per Spark stage of one job group. A max/median
+    # ratio near 1 means no stragglers; a large one points at a hot key.
+    if not spark.sparkContext.uiWebUrl:
+        return None
+    try:
+        task_skew = []
+        for stage in get_job_group_stages(job_group):
+            if stage["numTasks"] < 2:
+                continue
+            summary = fetch_spark_api(f"stages/{stage['stageId']}/{stage['attemptId']}/taskSummary?quantiles=0.5,1.0")
+            median_ms, max_ms = summary["executorRunTime"]
+            task_skew.append({
+                'spark_stage': stage["stageId"],
+                'tasks': stage["numTasks"],
+                'median_task_ms': median_ms,
+                'max_task_ms': max_ms,
+                'skew_ratio': round(max_ms / max(median_ms, 1), 2)
+            })
+        return task_skew
     except Exception as e:
-        print(f"Error extracting {table_name}: {str(e)}")
+        print(f"Could not read task metrics for {job_group}: {str(e)}")
         return None
 
+def get_input_bytes(job_group):
+    # Bytes read from storage by one job group's Spark stages.
+    if not spark.sparkContext.uiWebUrl:
+        return None
+    try:
+        return sum(stage["inputBytes"] for stage in get_job_group_stages(job_group))
+    except Exception as e:
+        print(f"Could not read input metrics for {job_group}: {str(e)}")
+        return None
+
+def write_analytics_table(name, df, rows, write):
+    path = f"{ANALYTICS_PATH}/{name}/"
+    with timed_stage(f"write.{name}", rows=rows) as stage:
+        sizes_before = get_s3_object_sizes(path)
+        write(df, path)
+        stage['bytes'] = get_written_bytes(path, sizes_before)
+        stage['task_skew'] = get_task_skew(f"write.{name}")
+
 def transform_customer_data(customers_df):
     if customers_df is None:
         return None
@@ -158,24 +697,31 @@ def transform_order_data(orders_df, order_items_df):
     if orders_df is None or order_items_df is None:
         return None
     
-    orders_with_items = orders_df.join(
-        order_items_df, 
-        orders_df.order_id == order_items_df.order_id, 
-        "left"
-    )
-    
-    order_metrics = orders_with_items.groupBy("order_id").agg(
-        F.first("customer_id").alias("customer_id"),
-        F.first("order_date").alias("order_date"),
-        F.first("status").alias("status"),
-        F.first("total_amount").alias("total_amount"),
-        F.first("shipping_cost").alias("shipping_cost"),
-        F.first("tax_amount").alias("tax_amount"),
-        F.first("discount_amount").alias("discount_amount"),
+    # Roll order_items up to one row per order before joining, so only the
+    # small per-order aggregate is shuffled instead of every order row per item.
+    item_rollup = order_items_df.groupBy("order_id").agg(
         F.sum("quantity").alias("total_items"),
         F.count("product_id").alias("unique_products"),
         F.avg("unit_price").alias("avg_item_price")
     )
+    item_rollup = broadcast_if_small(item_rollup)
+    
+    order_metrics = orders_df.select(
+        "order_id",
+        "customer_id",
+        "order_date",
+        "status",
+        "total_amount",
+        "shipping_cost",
+        "tax_amount",
+        "discount_amount"
+    ).join(
+        item_rollup,
+        "order_id",
+        "left"
+    ).withColumn(
+        "unique_products", F.coalesce(F.col("unique_products"), F.lit(0).cast("long"))
+    )
     
     orders_transformed = order_metrics.withColumn(
         "order_year", F.year(F.col("order_date"))
@@ -191,30 +737,69 @@ def transform_order_data(orders_df, order_items_df):
     
     return orders_transformed
 
+def get_key_skew(aggregated_df, count_column):
+    stats = aggregated_df.agg(
+        F.max(count_column).alias("max_rows"),
+        F.avg(count_column).alias("avg_rows"),
+        F.sum(count_column).alias("total_rows")
+    ).collect()[0]
+    if not stats["total_rows"]:
+        return {'max_rows': 0, 'avg_rows': 0, 'hottest_key_share': 0.0, 'skew_ratio': 0.0}
+    return {
+        'max_rows': stats["max_rows"],
+        'avg_rows': round(stats["avg_rows"], 2),
+        'hottest_key_share': round(stats["max_rows"] / stats["total_rows"], 4),
+        'skew_ratio': round(stats["max_rows"] / stats["avg_rows"], 2)
+    }
+
+def estimate_size_bytes(df):
+    # Spark's plan statistics: the in-memory size once a frame is cached,
+    # otherwise its inputs' size scaled to the output row width.
+    try:
+        return int(df._jdf.queryExecution().optimizedPlan().stats().sizeInBytes().toString())
+    except Exception as e:
+        print(f"Could not estimate plan size: {str(e)}")
+        return None
+
+def broadcast_if_small(df):
+    size_bytes = estimate_size_bytes(df)
+    return F.broadcast(df) if size_bytes is not None and size_bytes <= BROADCAST_SIZE_LIMIT_BYTES else df
+
 def transform_product_data(products_df, order_items_df, reviews_df):
     if products_df is None:
         return None
     
-    product_sales = order_items_df.groupBy("product_id").agg(
+    # groupBy combines rows map-side before the shuffle, so a bestseller's
+    # items collapse to one partial row per input partition instead of all
+    # landing on one reducer. The aggregates are cached: they are one row per
+    # product and are reused for the skew report and the joins.
+    product_sales = cache.persist("product_sales", order_items_df.groupBy("product_id").agg(
         F.sum("quantity").alias("total_quantity_sold"),
         F.sum("total_price").alias("total_revenue"),
         F.avg("unit_price").alias("avg_selling_price"),
         F.count("order_item_id").alias("times_ordered")
-    )
+    ))
     
-    product_reviews = reviews_df.groupBy("product_id").agg(
+    product_reviews = cache.persist("product_reviews", reviews_df.groupBy("product_id").agg(
         F.avg("rating").alias("avg_rating"),
         F.count("review_id").alias("total_reviews"),
         F.sum("helpful_votes").alias("total_helpful_votes")
-    )
+    ))
     
+    key_skew = get_key_skew(product_sales, "times_ordered")
+    print(json.dumps(dict(key_skew, metric='key_skew', table='order_items', key='product_id')))
+    
+    # Both sides are unique on product_id after aggregation, so the joins
+    # cannot skew whatever the key skew above. The cached aggregates' measured
+    # size decides the join: broadcast when small, otherwise a shuffle join,
+    # whose task skew write.products reports.
     products_with_metrics = products_df.join(
-        product_sales, 
-        products_df.product_id == product_sales.product_id, 
+        broadcast_if_small(product_sales),
+        "product_id",
         "left"
     ).join(
-        product_reviews,
-        products_df.product_id == product_reviews.product_id,
+        broadcast_if_small(product_reviews),
+        "product_id",
         "left"
     )
     
@@ -243,8 +828,8 @@ def transform_product_data(products_df, order_items_df, reviews_df):
     
     return products_transformed
 
-def create_analytics_tables(customers_df, orders_df, products_df):
-    customer_analytics = customers_df.select(
+ANALYTICS_COLUMNS = {
+    "customers": [
         "customer_id",
         "full_name",
         "customer_segment",
@@ -253,9 +838,8 @@ def create_analytics_tables(customers_df, orders_df, products_df):
         "days_since_last_purchase",
         "is_active_customer",
         "value_tier"
-    )
-    
-    product_analytics = products_df.select(
+    ],
+    "products": [
         "product_id",
         "product_name",
         "category",
@@ -269,9 +853,8 @@ def create_analytics_tables(customers_df, orders_df, products_df):
         "inventory_turnover",
         "is_bestseller",
         "rating_category"
-    )
-    
-    sales_analytics = orders_df.select(
+    ],
+    "sales": [
         "order_id",
         "customer_id",
         "order_date",
@@ -283,77 +866,333 @@ def create_analytics_tables(customers_df, orders_df, products_df):
         "total_items",
         "unique_products",
         "avg_item_price"
+    ]
+}
+
+def create_analytics_table(name, df):
+    return df.select(*ANALYTICS_COLUMNS[name])
+
+def create_analytics_tables(customers_df, orders_df, products_df):
+    return (
+        create_analytics_table("customers", customers_df),
+        create_analytics_table("products", products_df),
+        create_analytics_table("sales", orders_df)
     )
+
+def build_pipeline(watermarks):
+    # Each table's extract and raw write, each transform and each analytics
+    # write is one stage; a stage starts as soon as the stages it reads from
+    # have finished, and releases cached tables once nothing else needs them.
+    pipeline = StageScheduler(STAGE_PARALLELISM)
+    for table_name, schema in [
+        ("customers", customer_schema),
+        ("orders", order_schema),
+        ("products", product_schema),
+        ("order_items", order_item_schema),
+        ("reviews", review_schema),
+        ("payments", payment_schema)
+    ]:
+        pipeline.add(
+            f"load.{table_name}",
+            lambda table_name=table_name, schema=schema: load_source_table(table_name, schema, watermarks)
+        )
+    
+    # Transforms only build query plans (apart from the cached product
+    # aggregates, whose task skew is reported here); their execution time
+    # shows up in the write that consumes them.
+    def transform(stage_name, function):
+        def run(*loaded):
+            with timed_stage(stage_name) as stage:
+                transformed = function(*(df for df, _ in loaded))
+                stage['task_skew'] = get_task_skew(stage_name)
+                return transformed
+        return run
+    
+    pipeline.add("transform.customers", transform("transform.customers", transform_customer_data), ["load.customers"])
+    pipeline.add("transform.orders", transform("transform.orders", transform_order_data), ["load.orders", "load.order_items"])
+    pipeline.add(
+        "transform.products", transform("transform.products", transform_product_data),
+        ["load.products", "load.order_items", "load.reviews"]
+    )
+    
+    def write_customers(customers_transformed):
+        write_analytics_table(
+            "customers", create_analytics_table("customers", customers_transformed), cache.row_counts["customers"],
+            lambda df, path: cluster(df, ANALYTICS_CLUSTER_KEYS["customers"]).write.mode("overwrite").parquet(path)
+        )
+        cache.release("customers")
     
-    return customer_analytics, product_analytics, sales_analytics
+    def write_products(products_transformed):
+        write_analytics_table(
+            "products", create_analytics_table("products", products_transformed), cache.row_counts["products"],
+            lambda df, path: cluster(df, ANALYTICS_CLUSTER_KEYS["products"]).write.mode("overwrite").parquet(path)
+        )
+        cache.release("products", "reviews", "product_sales", "product_reviews")
+    
+    def write_sales(orders_transformed):
+        write_analytics_table(
+            "sales", create_analytics_table("sales", orders_transformed), cache.row_counts["orders"],
+            lambda df, path: write_partitioned_parquet(
+                df, path, ANALYTICS_PARTITION_KEYS["sales"], replace_all=FULL_REFRESH,
+                catalog_table="sales_analytics", sort_keys=ANALYTICS_CLUSTER_KEYS["sales"]
+            )
+        )
+        cache.release("orders")
+    
+    pipeline.add("write.customers", write_customers, ["transform.customers"])
+    pipeline.add("write.products", write_products, ["transform.products"])
+    pipeline.add("write.sales", write_sales, ["transform.orders"])
+    pipeline.add("release.order_items", lambda *_: cache.release("order_items"), ["write.products", "write.sales"])
+    pipeline.add("release.payments", lambda _: cache.release("payments"), ["load.payments"])
+    return pipeline
 
-def main():
+def is_data_file(relative_key, partitioned):
+    # Data files are Parquet files under key=value directories, or at the
+    # table root when it is not partitioned. Markers such as _SUCCESS and
+    # hidden or temporary files are left out.
+    *directories, file_name = relative_key.split("/")
+    if not file_name.endswith(".parquet") or file_name.startswith(("_", ".")):
+        return False
+    if not partitioned:
+        return not directories
+    return bool(directories) and all("=" in part and not part.startswith(("_", ".")) for part in directories)
+
+def list_table_files(path, partitioned=True):
+    # Data files under a table path grouped by partition directory, such as
+    # "ingest_date=2024-01-05" or "order_year=2024/order_month=3" ("" when the
+    # table is not partitioned).
+    _, prefix = split_s3_path(path)
+    partitions = defaultdict(list)
+    for key, size in get_s3_object_sizes(path).items():
+        if is_data_file(key[len(prefix):], partitioned):
+            directory, _, _ = key[len(prefix):].rpartition("/")
+            partitions[directory].append((key, size))
+    return partitions
+
+def get_parquet_sizes(objects):
+    return [size for key, size in objects if key.endswith(".parquet")]
+
+def get_file_stats(partitions):
+    sizes = [size for objects in partitions.values() for size in get_parquet_sizes(objects)]
+    return {'partitions': len(partitions), 'files': len(sizes), 'bytes': sum(sizes)}
+
+def get_target_file_count(objects):
+    target_bytes = TARGET_FILE_SIZE_MB * 1024 * 1024
+    return max(1, (sum(get_parquet_sizes(objects)) + target_bytes - 1) // target_bytes)
+
+def is_fragmented(objects):
+    file_count = len(get_parquet_sizes(objects))
+    return file_count >= COMPACT_MIN_FILES and file_count > get_target_file_count(objects)
+
+def plan_compaction(partitions, keep_snapshots=None):
+    # Partitions older than the newest keep_snapshots are folded into the
+    # newest of them. Once folded, that partition holds the compacted history
+    # and is only rewritten again when newer partitions expire into it.
+    directories = sorted(partitions)
+    expired = []
+    if keep_snapshots is not None:
+        expired = directories[:max(len(directories) - keep_snapshots, 0)]
+        if len(expired) == 1 and not is_fragmented(partitions[expired[0]]):
+            expired = []
+    fragmented = [
+        directory for directory in directories
+        if directory not in expired and is_fragmented(partitions[directory])
+    ]
+    return expired, fragmented
+
+def get_partition_values(directory):
+    return [part.partition("=")[2] for part in directory.split("/") if part]
+
+def unregister_partitions(catalog_table, directories):
+    partition_values = [values for values in map(get_partition_values, directories) if values]
+    if not partition_values:
+        return
     try:
-        print("Starting E-commerce Analytics ETL Process")
-        
-        print("Extracting data from RDS...")
-        customers_df = extract_data_from_rds("customers", customer_schema)
-        orders_df = extract_data_from_rds("orders", order_schema)
-        products_df = extract_data_from_rds("products", product_schema)
-        order_items_df = extract_data_from_rds("order_items", order_item_schema)
-        reviews_df = extract_data_from_rds("reviews", review_schema)
-        payments_df = extract_data_from_rds("payments", payment_schema)
-        
-        print("Transforming data...")
-        customers_transformed = transform_customer_data(customers_df)
-        orders_transformed = transform_order_data(orders_df, order_items_df)
-        products_transformed = transform_product_data(products_df, order_items_df, reviews_df)
-        
-        print("Creating analytics tables...")
-        customer_analytics, product_analytics, sales_analytics = create_analytics_tables(
-            customers_transformed, orders_transformed, products_transformed
+        for start in range(0, len(partition_values), 25):
+            glue_client.batch_delete_partition(
+                DatabaseName=CATALOG_DATABASE,
+                TableName=catalog_table,
+                PartitionsToDelete=[{'Values': values} for values in partition_values[start:start + 25]]
+            )
+    except glue_client.exceptions.EntityNotFoundException:
+        print(f"Catalog table {CATALOG_DATABASE}.{catalog_table} not found, skipping partition removal")
+        return
+    print(f"Removed {len(partition_values)} compacted partitions from {CATALOG_DATABASE}.{catalog_table}")
+
+def delete_objects(bucket, keys):
+    for start in range(0, len(keys), 1000):
+        s3_client.delete_objects(
+            Bucket=bucket,
+            Delete={'Objects': [{'Key': key} for key in keys[start:start + 1000]], 'Quiet': True}
         )
+
+def swap_in_staged_files(path, partitions, directories, target_directory, staging_path):
+    # S3 has no rename, so the staged files are copied into the target
+    # partition before the originals are deleted. A reader in between sees
+    # rows twice rather than missing them, and raw reads keep one version per
+    # key anyway.
+    bucket, prefix = split_s3_path(path)
+    staging_bucket, _ = split_s3_path(staging_path)
+    target_prefix = f"{prefix}{target_directory}/" if target_directory else prefix
+    staged_files = [key for key, _ in list_table_files(staging_path, partitioned=False)[""]]
+    run_id = run_started_at.strftime('%Y%m%d_%H%M%S')
+    for key in staged_files:
+        s3_client.copy(
+            {'Bucket': staging_bucket, 'Key': key}, bucket,
+            f"{target_prefix}compacted-{run_id}-{key.rpartition('/')[2]}"
+        )
+    delete_objects(bucket, [key for directory in directories for key, _ in partitions[directory]])
+    delete_objects(staging_bucket, list(get_s3_object_sizes(staging_path)))
+
+def rewrite_partitions(name, path, partitions, directories, target_directory, sort_keys, latest_of=None):
+    source_paths = [f"{path}{directory}/" if directory else path for directory in directories]
+    partition_columns = [part.partition("=")[0] for part in target_directory.split("/") if part]
+    df = spark.read.option("basePath", path).parquet(*source_paths)
+    if latest_of:
+        df = keep_latest_rows(df, latest_of)
+    
+    file_count = get_target_file_count([item for directory in directories for item in partitions[directory]])
+    staging_path = f"{COMPACTION_STAGING_PATH}/{run_started_at.strftime('%Y%m%d_%H%M%S')}/{name}/"
+    if target_directory:
+        staging_path = f"{staging_path}{target_directory}/"
+    df.drop(*partition_columns) \
+        .repartitionByRange(file_count, *sort_keys) \
+        .sortWithinPartitions(*sort_keys) \
+        .write.mode("overwrite").parquet(staging_path)
+    swap_in_staged_files(path, partitions, directories, target_directory, staging_path)
+    print(f"Compacted {len(directories)} partitions of {name} into {file_count} files under '{target_directory}'")
+
+# Typical selective lookups against each table. Compaction reports how many
+# bytes Spark reads to answer them before and after, which shows how much
+# row-group pruning the sorted files allow.
+PROBE_COLUMNS = {
+    "raw/orders": ["customer_id", "order_date"],
+    "raw/order_items": ["product_id"],
+    "raw/reviews": ["product_id"],
+    "raw/payments": ["order_id"],
+    "analytics/customers": ["customer_id"],
+    "analytics/products": ["product_id"],
+    "analytics/sales": ["customer_id", "order_date"]
+}
+
+def get_probe_filters(path, columns):
+    # A point lookup on ids, or a one-day range on timestamps, from the middle
+    # of each column's range so it matches a handful of rows.
+    if not columns:
+        return {}
+    bounds = spark.read.parquet(path).agg(
+        *[F.min(column).alias(f"min_{column}") for column in columns],
+        *[F.max(column).alias(f"max_{column}") for column in columns]
+    ).first()
+    filters = {}
+    for column in columns:
+        low, high = bounds[f"min_{column}"], bounds[f"max_{column}"]
+        if low is None:
+            continue
+        if isinstance(low, datetime):
+            middle = low + (high - low) / 2
+            filters[column] = (F.col(column) >= middle) & (F.col(column) < middle + timedelta(days=1))
+        else:
+            filters[column] = F.col(column) == (low + high) // 2
+    return filters
+
+def run_probes(path, filters, stage_name, phase):
+    input_bytes = {}
+    for column, condition in filters.items():
+        job_group = f"{stage_name}.probe.{column}.{phase}"
+        spark.sparkContext.setJobGroup(job_group, job_group)
+        spark.read.parquet(path).filter(condition).count()
+        input_bytes[column] = get_input_bytes(job_group)
+    spark.sparkContext.setJobGroup(stage_name, stage_name)
+    return input_bytes
+
+def compact_table(name, path, sort_keys, latest_of=None, catalog_table=None, keep_snapshots=None, partitioned=True):
+    stage_name = f"compact.{name.replace('/', '.')}"
+    with timed_stage(stage_name) as stage:
+        partitions = list_table_files(path, partitioned)
+        stage['files_before'] = get_file_stats(partitions)
+        expired, fragmented = plan_compaction(partitions, keep_snapshots)
+        stage['expired_partitions'] = len(expired)
+        stage['rewritten_partitions'] = len(fragmented)
+        if not expired and not fragmented:
+            return
         
-        print("Writing data to S3...")
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        
-        customer_analytics.write \
-            .mode("overwrite") \
-            .parquet(f"{args['S3_OUTPUT_PATH']}/analytics/customers/{timestamp}/")
-        
-        product_analytics.write \
-            .mode("overwrite") \
-            .parquet(f"{args['S3_OUTPUT_PATH']}/analytics/products/{timestamp}/")
-        
-        sales_analytics.write \
-            .mode("overwrite") \
-            .parquet(f"{args['S3_OUTPUT_PATH']}/analytics/sales/{timestamp}/")
+        filters = get_probe_filters(path, PROBE_COLUMNS.get(name, []))
+        probes_before = run_probes(path, filters, stage_name, "before")
+        if expired:
+            rewrite_partitions(name, path, partitions, expired, expired[-1], sort_keys, latest_of)
+            if catalog_table:
+                unregister_partitions(catalog_table, expired[:-1])
+        for directory in fragmented:
+            rewrite_partitions(name, path, partitions, [directory], directory, sort_keys)
         
-        print("Writing raw data to data lake...")
-        customers_df.write \
-            .mode("overwrite") \
-            .parquet(f"{args['S3_OUTPUT_PATH']}/raw/customers/{timestamp}/")
+        stage['files_after'] = get_file_stats(list_table_files(path, partitioned))
+        probes_after = run_probes(path, filters, stage_name, "after")
+        stage['probe_input_bytes'] = {
+            column: {'before': probes_before[column], 'after': probes_after[column]}
+            for column in filters
+        }
+
+def compact_data_lake():
+    compaction = StageScheduler(STAGE_PARALLELISM)
+    for table_name in PRIMARY_KEYS:
+        compaction.add(
+            f"compact.raw.{table_name}",
+            lambda table_name=table_name: compact_table(
+                f"raw/{table_name}", f"{RAW_PATH}/{table_name}/", CLUSTER_KEYS[table_name],
+                latest_of=table_name, catalog_table=f"raw_{table_name}", keep_snapshots=KEEP_RAW_SNAPSHOTS
+            )
+        )
+    for table_name, sort_keys in ANALYTICS_CLUSTER_KEYS.items():
+        compaction.add(
+            f"compact.analytics.{table_name}",
+            lambda table_name=table_name, sort_keys=sort_keys: compact_table(
+                f"analytics/{table_name}", f"{ANALYTICS_PATH}/{table_name}/", sort_keys,
+                partitioned=table_name in ANALYTICS_PARTITION_KEYS
+            )
+        )
+    compaction.run()
+
+def main():
+    try:
+        print("Starting E-commerce Analytics ETL Process")
         
-        orders_df.write \
-            .mode("overwrite") \
-            .parquet(f"{args['S3_OUTPUT_PATH']}/raw/orders/{timestamp}/")
+        if FULL_REFRESH:
+            print("Full refresh requested, ignoring saved watermarks")
+            watermarks = {}
+        else:
+            watermarks = load_watermarks()
         
-        products_df.write \
-            .mode("overwrite") \
-            .parquet(f"{args['S3_OUTPUT_PATH']}/raw/products/{timestamp}/")
+        print(f"Extracting, transforming and writing with up to {STAGE_PARALLELISM} concurrent stages...")
+        results = build_pipeline(watermarks).run()
         
-        order_items_df.write \
-            .mode("overwrite") \
-            .parquet(f"{args['S3_OUTPUT_PATH']}/raw/order_items/{timestamp}/")
+        print(f"JDBC reads per table this run: {dict(jdbc_reads)}")
         
-        reviews_df.write \
-            .mode("overwrite") \
-            .parquet(f"{args['S3_OUTPUT_PATH']}/raw/reviews/{timestamp}/")
+        # Watermarks only advance once every stage has succeeded.
+        save_watermarks({
+            table_name: results[f"load.{table_name}"][1]
+            for table_name in WATERMARK_COLUMNS
+            if results[f"load.{table_name}"][1] is not None
+        })
         
-        payments_df.write \
-            .mode("overwrite") \
-            .parquet(f"{args['S3_OUTPUT_PATH']}/raw/payments/{timestamp}/")
+        # Compaction replaces files under raw/ and analytics/, so it runs once
+        # no cached table can fall back to reading them.
+        if COMPACTION_ENABLED:
+            cache.release_all()
+            print(f"Compacting raw and analytics tables, keeping {KEEP_RAW_SNAPSHOTS} raw snapshots...")
+            compact_data_lake()
         
         print("ETL process completed successfully!")
         
     except Exception as e:
         print(f"Error in ETL process: {str(e)}")
         raise
+    finally:
+        cache.release_all()
+        try:
+            save_stage_metrics()
+        except Exception as e:
+            print(f"Error saving stage metrics: {str(e)}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,256 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+
+TERMINAL_STATES = {'SUCCEEDED', 'FAILED', 'CANCELLED'}
+RETRYABLE_ERRORS = {'TooManyRequestsException', 'ThrottlingException'}
+MAX_API_ATTEMPTS = 6
+
+# Athena returns every value as a string; these restore the column types.
+ATHENA_TYPES = {
+    'boolean': lambda value: value == 'true',
+    'tinyint': int,
+    'smallint': int,
+    'integer': int,
+    'bigint': int,
+    'float': float,
+    'real': float,
+    'double': float,
+    'decimal': float
+}
+
+LITERAL_PATTERN = re.compile(r"('(?:[^']|'')*')")
+TABLE_REFERENCE_PATTERN = re.compile(r"\b(?:from|join)\s+([a-z_]\w*(?:\.[a-z_]\w*)?)")
+CTE_NAME_PATTERN = re.compile(r"(?:\bwith|,)\s*([a-z_]\w*)\s+as\s*\(")
+
+def strip_comments(sql):
+    return re.sub(r"--[^\n]*", " ", sql)
+
+def split_statements(sql_text):
+    # Splits on semicolons outside string literals.
+    statements = []
+    current = []
+    for index, part in enumerate(LITERAL_PATTERN.split(sql_text)):
+        if index % 2:
+            current.append(part)
+            continue
+        pieces = strip_comments(part).split(';')
+        current.append(pieces[0])
+        for piece in pieces[1:]:
+            statements.append("".join(current).strip())
+            current = [piece]
+    statements.append("".join(current).strip())
+    return [statement for statement in statements if statement]
+
+def normalize_sql(sql):
+    # Whitespace, comments and keyword case do not change a result, so
+    # reformatted copies of a report share one cache entry. Literals are kept.
+    parts = LITERAL_PATTERN.split(sql)
+    normalized = [
+        part if index % 2 else re.sub(r"\s+", " ", strip_comments(part)).lower()
+        for index, part in enumerate(parts)
+    ]
+    return "".join(normalized).strip().rstrip(';').strip()
+
+def get_input_tables(normalized_sql):
+    without_literals = LITERAL_PATTERN.sub("''", normalized_sql)
+    cte_names = set(CTE_NAME_PATTERN.findall(without_literals))
+    return sorted(set(TABLE_REFERENCE_PATTERN.findall(without_literals)) - cte_names)
+
+def load_reports(path):
+    report_prefix = os.path.splitext(os.path.basename(path))[0]
+    with open(path) as sql_file:
+        statements = split_statements(sql_file.read())
+    queries = [statement for statement in statements if normalize_sql(statement).startswith(('select', 'with'))]
+    return [(f"{report_prefix}_{index:02d}", query) for index, query in enumerate(queries, 1)]
+
+def convert_value(converter, cell):
+    value = cell.get('VarCharValue')
+    return converter(value) if value is not None else None
+
+def split_s3_path(path):
+    bucket, _, prefix = path.replace("s3://", "", 1).partition("/")
+    return bucket, prefix
+
+class AthenaQueryRunner:
+    def __init__(self, athena_client, glue_client, s3_client, database, output_location=None, workgroup='primary',
+                 result_cache=None, max_concurrency=5, poll_interval=0.25, max_poll_interval=5.0, page_size=1000):
+        self.athena_client = athena_client
+        self.glue_client = glue_client
+        self.s3_client = s3_client
+        self.database = database
+        self.output_location = output_location
+        self.workgroup = workgroup
+        self.result_cache = result_cache
+        self.max_concurrency = max_concurrency
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.page_size = page_size
+
+    async def call(self, function, **kwargs):
+        # boto3 calls block, so each runs on a worker thread while the event
+        # loop keeps polling the other queries; throttling is retried.
+        delay = self.poll_interval
+        for attempt in range(MAX_API_ATTEMPTS):
+            try:
+                return await asyncio.to_thread(function, **kwargs)
+            except Exception as e:
+                error_code = getattr(e, 'response', {}).get('Error', {}).get('Code')
+                if error_code not in RETRYABLE_ERRORS or attempt == MAX_API_ATTEMPTS - 1:
+                    raise
+                await asyncio.sleep(delay * random.uniform(1.0, 1.5))
+                delay = min(delay * 2, self.max_poll_interval)
+
+    def get_table_version(self, table_name):
+        # The Lambda appends exports and Glue rewrites partitions in place
+        # without touching the catalog, so the version is a digest of the
+        # object keys and ETags under the table's location.
+        database, _, name = table_name.rpartition('.')
+        try:
+            table = self.glue_client.get_table(DatabaseName=database or self.database, Name=name)['Table']
+        except self.glue_client.exceptions.EntityNotFoundException:
+            return 'not-a-table'
+
+        bucket, prefix = split_s3_path(table['StorageDescriptor']['Location'])
+        digest = hashlib.sha256()
+        for page in self.s3_client.get_paginator('list_objects_v2').paginate(Bucket=bucket, Prefix=prefix):
+            for item in page.get('Contents', []):
+                digest.update(f"{item['Key']}:{item['ETag']}\n".encode())
+        return digest.hexdigest()
+
+    async def get_table_versions(self, table_names):
+        table_names = sorted(table_names)
+        versions = await asyncio.gather(
+            *(asyncio.to_thread(self.get_table_version, table_name) for table_name in table_names),
+            return_exceptions=True
+        )
+        table_versions = {}
+        for table_name, version in zip(table_names, versions):
+            if isinstance(version, Exception):
+                print(f"Could not version {table_name}, its reports will not be cached: {str(version)}")
+                version = None
+            table_versions[table_name] = version
+        return table_versions
+
+    async def start_query(self, sql):
+        kwargs = {
+            'QueryString': sql,
+            'QueryExecutionContext': {'Database': self.database},
+            'WorkGroup': self.workgroup
+        }
+        if self.output_location:
+            kwargs['ResultConfiguration'] = {'OutputLocation': self.output_location}
+        response = await self.call(self.athena_client.start_query_execution, **kwargs)
+        return response['QueryExecutionId']
+
+    async def wait_for_query(self, execution_id):
+        # Quick queries are seen within a poll or two; long scans back off so
+        # many waiting queries do not exhaust the GetQueryExecution quota.
+        delay = self.poll_interval
+        while True:
+            response = await self.call(self.athena_client.get_query_execution, QueryExecutionId=execution_id)
+            execution = response['QueryExecution']
+            state = execution['Status']['State']
+            if state in TERMINAL_STATES:
+                if state != 'SUCCEEDED':
+                    reason = execution['Status'].get('StateChangeReason', 'no reason given')
+                    raise RuntimeError(f"Athena query {execution_id} {state}: {reason}")
+                return execution
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_poll_interval)
+
+    async def stream_results(self, execution_id):
+        kwargs = {'QueryExecutionId': execution_id, 'MaxResults': self.page_size}
+        columns = None
+        while True:
+            page = await self.call(self.athena_client.get_query_results, **kwargs)
+            rows = page['ResultSet']['Rows']
+            if columns is None:
+                column_info = page['ResultSet']['ResultSetMetadata']['ColumnInfo']
+                columns = [column['Name'] for column in column_info]
+                converters = [ATHENA_TYPES.get(column['Type'], str) for column in column_info]
+                # The first row of a SELECT result repeats the column names.
+                rows = rows[1:]
+            yield columns, [
+                tuple(convert_value(converter, cell) for converter, cell in zip(converters, row['Data']))
+                for row in rows
+            ]
+            if not page.get('NextToken'):
+                return
+            kwargs['NextToken'] = page['NextToken']
+
+    async def run_query(self, sql, table_versions, semaphore):
+        normalized_sql = normalize_sql(sql)
+        cache_key = f"athena_{hashlib.sha256(normalized_sql.encode()).hexdigest()[:32]}"
+        fingerprint = None
+        if self.result_cache is not None and None not in table_versions.values():
+            fingerprint = hashlib.sha256(json.dumps(table_versions, sort_keys=True).encode()).hexdigest()
+            entry = self.result_cache.get(cache_key)
+            if entry and entry['fingerprint'] == fingerprint:
+                self.result_cache.touch(cache_key)
+                return dict(entry['data'], cached=True)
+
+        # Only running queries count against Athena's concurrency quota, so
+        # result paging happens outside the semaphore.
+        async with semaphore:
+            execution_id = await self.start_query(sql)
+            execution = await self.wait_for_query(execution_id)
+
+        columns = []
+        rows = []
+        async for columns, batch in self.stream_results(execution_id):
+            rows.extend(batch)
+
+        result = {
+            'columns': columns,
+            'rows': rows,
+            'execution_id': execution_id,
+            'scanned_bytes': execution.get('Statistics', {}).get('DataScannedInBytes')
+        }
+        if fingerprint is not None:
+            try:
+                self.result_cache.set(cache_key, {'fingerprint': fingerprint, 'data': result})
+            except Exception as e:
+                print(f"Error caching Athena result {execution_id}: {str(e)}")
+        return dict(result, cached=False)
+
+    async def run_reports(self, reports):
+        report_tables = {name: get_input_tables(normalize_sql(sql)) for name, sql in reports}
+        table_versions = await self.get_table_versions(set().union(*report_tables.values()))
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        results = await asyncio.gather(
+            *(
+                self.run_query(sql, {table_name: table_versions[table_name] for table_name in report_tables[name]}, semaphore)
+                for name, sql in reports
+            ),
+            return_exceptions=True
+        )
+        return dict(zip([name for name, _ in reports], results))
+
+def main():
+    import boto3
+    parser = argparse.ArgumentParser(description="Run the SELECT reports in a SQL file on Athena concurrently")
+    parser.add_argument('sql_file')
+    parser.add_argument('--database', default='ecommerce_analytics')
+    parser.add_argument('--workgroup', default='primary')
+    parser.add_argument('--output-location', default=None, help="s3:// path for query results")
+    parser.add_argument('--max-concurrency', type=int, default=5)
+    args = parser.parse_args()
+
+    runner = AthenaQueryRunner(
+        boto3.client('athena'), boto3.client('glue'), boto3.client('s3'), args.database,
+        args.output_location, args.workgroup, max_concurrency=args.max_concurrency
+    )
+    results = asyncio.run(runner.run_reports(load_reports(args.sql_file)))
+    for name, result in results.items():
+        if isinstance(result, Exception):
+            print(f"{name}: failed: {result}")
+        else:
+            print(f"{name}: {len(result['rows'])} rows, {result['scanned_bytes']} bytes scanned")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import calendar
+import numpy as np
+import pandas as pd
+
+# Compact extracts: the heavy grouping, ranking and window work that
+# advanced_queries.sql pushes onto RDS is done here on plain columns instead.
+ORDER_EXTRACT_QUERY = "SELECT customer_id, order_date, total_amount FROM orders"
+CUSTOMER_EXTRACT_QUERY = "SELECT customer_id, customer_segment FROM customers"
+
+# Evaluated in order, first match wins, mirroring the rfm_segments CASE.
+RFM_SEGMENT_RULES = [
+    ('Champions', lambda r, f, m: (r >= 4) & (f >= 4) & (m >= 4)),
+    ('Loyal Customers', lambda r, f, m: (r >= 3) & (f >= 3) & (m >= 3)),
+    ('New Customers', lambda r, f, m: (r >= 4) & (f <= 2)),
+    ('Potential Loyalists', lambda r, f, m: (r >= 3) & (f >= 2) & (m >= 2)),
+    ('Promising', lambda r, f, m: (r >= 4) & (f <= 1) & (m <= 1)),
+    ('Need Attention', lambda r, f, m: (r >= 3) & (f >= 3) & (m <= 2)),
+    ('About to Sleep', lambda r, f, m: (r >= 2) & (f >= 2) & (m >= 3)),
+    ('At Risk', lambda r, f, m: (r <= 2) & (f >= 2) & (m >= 2)),
+    ('Cannot Lose Them', lambda r, f, m: (r <= 2) & (f >= 4) & (m >= 4)),
+    ('Lost', lambda r, f, m: (r <= 1) & (f <= 2) & (m <= 2))
+]
+
+def load_frame(batches, columns):
+    frames = [pd.DataFrame.from_records(rows, columns=batch_columns) for batch_columns, rows in batches]
+    if not frames:
+        return pd.DataFrame({column: [] for column in columns})
+    return pd.concat(frames, ignore_index=True)
+
+def prepare_orders(orders):
+    return pd.DataFrame({
+        'customer_id': orders['customer_id'].astype('int64'),
+        'order_date': pd.to_datetime(orders['order_date']),
+        'total_amount': orders['total_amount'].astype('float64')
+    })
+
+def to_records(frame):
+    frame = frame.round(2).astype(object)
+    return frame.where(frame.notna(), None).to_dict('records')
+
+def score_quintiles(values, ascending=True):
+    # Ties share the lowest rank so equal customers always land in the same
+    # quintile; customers without orders (NaN) score 1.
+    ranks = values.rank(method='min', pct=True, ascending=ascending)
+    return np.ceil(ranks.fillna(0) * 5).clip(1, 5).astype('int64')
+
+def compute_rfm_segments(orders, customers, as_of):
+    per_customer = orders.groupby('customer_id').agg(
+        last_order_date=('order_date', 'max'),
+        frequency=('total_amount', 'size'),
+        monetary_value=('total_amount', 'sum')
+    )
+    rfm = pd.DataFrame(index=pd.Index(customers['customer_id'].astype('int64'), name='customer_id'))
+    rfm = rfm.join(per_customer, how='outer')
+    rfm['frequency'] = rfm['frequency'].fillna(0)
+    rfm['monetary_value'] = rfm['monetary_value'].fillna(0.0)
+    rfm['recency_days'] = (pd.Timestamp(as_of).normalize() - rfm['last_order_date'].dt.normalize()).dt.days
+
+    recency_score = score_quintiles(rfm['recency_days'], ascending=False).to_numpy()
+    frequency_score = score_quintiles(rfm['frequency']).to_numpy()
+    monetary_score = score_quintiles(rfm['monetary_value']).to_numpy()
+    rfm['rfm_segment'] = np.select(
+        [rule(recency_score, frequency_score, monetary_score) for _, rule in RFM_SEGMENT_RULES],
+        [segment for segment, _ in RFM_SEGMENT_RULES],
+        default='Others'
+    )
+
+    segments = rfm.groupby('rfm_segment').agg(
+        customer_count=('frequency', 'size'),
+        avg_recency_days=('recency_days', 'mean'),
+        avg_frequency=('frequency', 'mean'),
+        avg_monetary_value=('monetary_value', 'mean'),
+        total_segment_value=('monetary_value', 'sum')
+    )
+    segments['avg_recency_days'] = segments['avg_recency_days'].round(0)
+    segments['segment_percentage'] = segments['customer_count'] * 100.0 / max(len(rfm), 1)
+    segments = segments.sort_values('total_segment_value', ascending=False).reset_index()
+    return to_records(segments)
+
+def month_labels(month_numbers):
+    return (month_numbers // 12).astype(str) + '-' + (month_numbers % 12 + 1).astype(str).str.zfill(2)
+
+def compute_cohort_retention(orders):
+    # Months as a single integer keep cohort offsets plain subtraction.
+    month_number = orders['order_date'].dt.year * 12 + orders['order_date'].dt.month - 1
+    activity = pd.DataFrame({
+        'customer_id': orders['customer_id'].to_numpy(),
+        'month_number': month_number.to_numpy()
+    }).drop_duplicates()
+    activity['cohort'] = activity.groupby('customer_id')['month_number'].transform('min')
+    activity['period_number'] = activity['month_number'] - activity['cohort']
+
+    retention = activity.groupby(['cohort', 'period_number']).size().rename('customers_retained').reset_index()
+    cohort_sizes = retention.loc[retention['period_number'] == 0].set_index('cohort')['customers_retained']
+    retention['cohort_size'] = retention['cohort'].map(cohort_sizes)
+    retention['retention_rate'] = retention['customers_retained'] * 100.0 / retention['cohort_size']
+    retention['cohort_month'] = month_labels(retention['cohort'])
+    return to_records(retention[['cohort_month', 'cohort_size', 'period_number', 'customers_retained', 'retention_rate']])
+
+def compute_seasonal_indices(orders):
+    frame = pd.DataFrame({
+        'month_number': (orders['order_date'].dt.year * 12 + orders['order_date'].dt.month - 1).to_numpy(),
+        'month': orders['order_date'].dt.month.to_numpy(),
+        'customer_id': orders['customer_id'].to_numpy(),
+        'total_amount': orders['total_amount'].to_numpy()
+    })
+
+    # Seasonal index: the average revenue of a calendar month across years
+    # relative to the average month overall (100 = a typical month).
+    monthly_revenue = frame.groupby(['month_number', 'month'])['total_amount'].sum()
+    seasonal_index = monthly_revenue.groupby(level='month').mean() * 100.0 / monthly_revenue.mean()
+
+    seasonal = frame.groupby('month').agg(
+        total_orders=('total_amount', 'size'),
+        total_revenue=('total_amount', 'sum'),
+        avg_order_value=('total_amount', 'mean'),
+        unique_customers=('customer_id', 'nunique')
+    )
+    seasonal['seasonal_index'] = seasonal_index
+    seasonal['month_over_month_growth'] = seasonal['total_revenue'].pct_change() * 100.0
+    seasonal = seasonal.reset_index()
+    seasonal['quarter'] = (seasonal['month'] - 1) // 3 + 1
+    seasonal['quarterly_total'] = seasonal.groupby('quarter')['total_revenue'].transform('sum')
+    seasonal['month_name'] = seasonal['month'].map(lambda month: calendar.month_name[month])
+    return to_records(seasonal[[
+        'quarter', 'month_name', 'total_orders', 'total_revenue', 'avg_order_value', 'unique_customers',
+        'quarterly_total', 'seasonal_index', 'month_over_month_growth'
+    ]])
+
+def build_customer_insights(orders, customers, as_of):
+    orders = prepare_orders(orders)
+    if orders.empty:
+        return None
+    return {
+        'rfm_segments': compute_rfm_segments(orders, customers, as_of),
+        'cohort_retention': compute_cohort_retention(orders),
+        'seasonal_indices': compute_seasonal_indices(orders)
+    }
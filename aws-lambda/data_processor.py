@@ -1,15 +1,169 @@
 import json
-import boto3
-import pymysql
 import os
-import pandas as pd
-from datetime import datetime, timedelta
+import hashlib
+import re
+import functools
+import resource
+import zlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from decimal import Decimal
 from typing import Dict, List, Any
 
-s3_client = boto3.client('s3')
-athena_client = boto3.client('athena')
+QUERY_TIMEOUT_SECONDS = int(os.environ.get('QUERY_TIMEOUT_SECONDS', '60'))
+MAX_SECTION_WORKERS = int(os.environ.get('MAX_SECTION_WORKERS', '4'))
+CONCURRENT_SECTIONS = os.environ.get('CONCURRENT_SECTIONS', 'false').lower() == 'true'
+MAX_DB_CONNECTIONS = int(os.environ.get('MAX_DB_CONNECTIONS', '4'))
+ROLLUP_REBUILD_HOURS = int(os.environ.get('ROLLUP_REBUILD_HOURS', '24'))
+ROLLUP_OVERLAP_SECONDS = int(os.environ.get('ROLLUP_OVERLAP_SECONDS', '300'))
+RESULT_CACHE_BACKEND = os.environ.get('RESULT_CACHE_BACKEND', 'file')
+# Entries are re-validated against the table fingerprints, so the TTL only
+# bounds staleness from untracked in-place updates. It spans many runs of the
+# hourly schedule, so neither sections nor the table state saved for
+# detect_changes expire between two scheduled runs.
+RESULT_CACHE_TTL_SECONDS = int(os.environ.get('RESULT_CACHE_TTL_SECONDS', '86400'))
+RESULT_CACHE_DIR = os.environ.get('RESULT_CACHE_DIR', '/tmp/analytics-cache')
+STREAM_BATCH_SIZE = int(os.environ.get('STREAM_BATCH_SIZE', '5000'))
+EXPORT_PART_SIZE_BYTES = int(os.environ.get('EXPORT_PART_SIZE_MB', '8')) * 1024 * 1024
+EXPORT_FORMAT = os.environ.get('EXPORT_FORMAT', 'json')
+METRICS_FORMAT = os.environ.get('METRICS_FORMAT', 'json')
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'EcommerceAnalytics')
+ATHENA_DATABASE = os.environ.get('ATHENA_DATABASE', 'ecommerce_analytics')
+ATHENA_WORKGROUP = os.environ.get('ATHENA_WORKGROUP', 'primary')
+ATHENA_OUTPUT_LOCATION = os.environ.get('ATHENA_OUTPUT_LOCATION')
+ATHENA_MAX_CONCURRENT_QUERIES = int(os.environ.get('ATHENA_MAX_CONCURRENT_QUERIES', '5'))
+ATHENA_REPORTS_PATH = os.environ.get('ATHENA_REPORTS_PATH', os.path.join(os.path.dirname(__file__), 'athena_queries.sql'))
 
+# boto3, pymysql, pandas (through customer_insights) and asyncio are imported
+# by the code paths that use them, and boto3 clients are built on first use
+# and then kept for the life of the container, so a cold start only pays for
+# what the invocation needs. Tests and benchmarks can put stand-ins in clients.
+clients = {}
+clients_lock = threading.Lock()
+
+def get_client(service_name):
+    client = clients.get(service_name)
+    if client is None:
+        # boto3's default session is not safe to create clients from
+        # concurrently, and sections run on worker threads.
+        with clients_lock:
+            if service_name not in clients:
+                import boto3
+                clients[service_name] = boto3.client(service_name)
+            client = clients[service_name]
+    return client
+
+class StageMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.records = []
+        self.local = threading.local()
+    
+    def reset(self):
+        with self.lock:
+            self.records = []
+    
+    def active_stages(self):
+        if not hasattr(self.local, 'stack'):
+            self.local.stack = []
+        return self.local.stack
+    
+    def add_counts(self, rows=0, bytes_count=0):
+        # Counts roll up into every enclosing stage on this thread, so an
+        # export stage includes the bytes of the uploads it made.
+        for record in self.active_stages():
+            record['rows'] += rows
+            record['bytes'] += bytes_count
+    
+    def add(self, record):
+        with self.lock:
+            self.records.append(record)
+        emit_stage_record(record)
+    
+    def summary(self):
+        with self.lock:
+            records = list(self.records)
+        stages = {}
+        for record in records:
+            stage = stages.setdefault(record['stage'], {
+                'calls': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0, 'bytes': 0, 'peak_rss_mb': 0.0
+            })
+            stage['calls'] += 1
+            stage['errors'] += record['status'] == 'error'
+            stage['total_ms'] = round(stage['total_ms'] + record['duration_ms'], 2)
+            stage['max_ms'] = max(stage['max_ms'], record['duration_ms'])
+            stage['rows'] += record['rows']
+            stage['bytes'] += record['bytes']
+            stage['peak_rss_mb'] = max(stage['peak_rss_mb'], record['peak_rss_mb'])
+        return stages
+
+def emit_stage_record(record):
+    # One write per line: print() writes the newline separately, which lets
+    # records from concurrent sections interleave and break log parsing.
+    if METRICS_FORMAT == 'emf':
+        # CloudWatch embedded metric format: Lambda log lines in this shape
+        # become metrics with the stage as a dimension, no API calls needed.
+        line = json.dumps(dict(record, _aws={
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': METRICS_NAMESPACE,
+                'Dimensions': [['stage']],
+                'Metrics': [
+                    {'Name': 'duration_ms', 'Unit': 'Milliseconds'},
+                    {'Name': 'rows', 'Unit': 'Count'},
+                    {'Name': 'bytes', 'Unit': 'Bytes'},
+                    {'Name': 'peak_rss_mb', 'Unit': 'Megabytes'}
+                ]
+            }]
+        }))
+    elif METRICS_FORMAT == 'json':
+        line = json.dumps(dict(record, metric='stage'))
+    else:
+        return
+    print(f"{line}\n", end='')
+
+stage_metrics = StageMetrics()
+
+@contextmanager
+def timed_stage(stage_name):
+    record = {'stage': stage_name, 'rows': 0, 'bytes': 0, 'status': 'ok'}
+    stack = stage_metrics.active_stages()
+    stack.append(record)
+    started = time.perf_counter()
+    try:
+        yield record
+    except Exception:
+        record['status'] = 'error'
+        raise
+    finally:
+        stack.pop()
+        record['duration_ms'] = round((time.perf_counter() - started) * 1000, 2)
+        # ru_maxrss is the process high-water mark in KB, so it shows which
+        # stage pushed memory up rather than what each stage used on its own.
+        record['peak_rss_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+        stage_metrics.add(record)
+
+def count_section_rows(data_content):
+    return sum(len(rows) for rows in data_content.values()) if data_content else 0
+
+def instrumented(stage_name=None, count_rows=None):
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with timed_stage(stage_name or function.__name__):
+                result = function(*args, **kwargs)
+                if count_rows:
+                    stage_metrics.add_counts(rows=count_rows(result))
+                return result
+        return wrapper
+    return decorator
+
+@instrumented()
 def get_db_connection():
+    import pymysql
     try:
         connection = pymysql.connect(
             host=os.environ['RDS_ENDPOINT'],
@@ -18,13 +172,87 @@ def get_db_connection():
             database=os.environ['DB_NAME'],
             port=3306,
             charset='utf8mb4',
-            cursorclass=pymysql.cursors.DictCursor
+            cursorclass=pymysql.cursors.DictCursor,
+            autocommit=True,
+            read_timeout=QUERY_TIMEOUT_SECONDS,
+            init_command=f"SET SESSION MAX_EXECUTION_TIME={QUERY_TIMEOUT_SECONDS * 1000}"
         )
         return connection
     except Exception as e:
         print(f"Database connection error: {str(e)}")
         return None
 
+class ConnectionPool:
+    def __init__(self, max_connections, acquire_timeout):
+        self.max_connections = max_connections
+        self.acquire_timeout = acquire_timeout
+        self.idle = []
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(max_connections)
+        self.metrics = {
+            'connections_opened': 0,
+            'connection_setup_ms': 0.0,
+            'reuse_hits': 0,
+            'failed_health_checks': 0
+        }
+    
+    def open_connection(self):
+        started = time.perf_counter()
+        connection = get_db_connection()
+        if connection:
+            with self.lock:
+                self.metrics['connections_opened'] += 1
+                self.metrics['connection_setup_ms'] += (time.perf_counter() - started) * 1000
+        return connection
+    
+    def acquire(self):
+        if not self.slots.acquire(timeout=self.acquire_timeout):
+            raise TimeoutError(f"No database connection available after {self.acquire_timeout}s")
+        
+        with self.lock:
+            connection = self.idle.pop() if self.idle else None
+        
+        if connection is not None:
+            try:
+                connection.ping(reconnect=False)
+                with self.lock:
+                    self.metrics['reuse_hits'] += 1
+                return connection
+            except Exception as e:
+                print(f"Discarding stale database connection: {str(e)}")
+                with self.lock:
+                    self.metrics['failed_health_checks'] += 1
+                self.close_quietly(connection)
+        
+        connection = self.open_connection()
+        if not connection:
+            self.slots.release()
+        return connection
+    
+    def release(self, connection):
+        if connection.open:
+            with self.lock:
+                self.idle.append(connection)
+        self.slots.release()
+    
+    def close_quietly(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+    
+    def get_metrics(self):
+        with self.lock:
+            metrics = dict(self.metrics, idle_connections=len(self.idle), max_connections=self.max_connections)
+        if metrics['connections_opened']:
+            metrics['avg_connection_setup_ms'] = round(metrics['connection_setup_ms'] / metrics['connections_opened'], 2)
+        metrics['connection_setup_ms'] = round(metrics['connection_setup_ms'], 2)
+        return metrics
+
+# Lives at module level so warm invocations of the same container reuse
+# connections instead of repeating the TCP, TLS and auth handshake.
+connection_pool = ConnectionPool(MAX_DB_CONNECTIONS, QUERY_TIMEOUT_SECONDS)
+
 def execute_query(connection, query):
     try:
         with connection.cursor() as cursor:
@@ -33,83 +261,292 @@ def execute_query(connection, query):
             return result
     except Exception as e:
         print(f"Query execution error: {str(e)}")
+        raise
+
+def stream_query(connection, query, batch_size=STREAM_BATCH_SIZE):
+    # Unbuffered server-side cursor: rows arrive from MySQL batch by batch as
+    # plain tuples, so memory is bounded by batch_size rather than the result.
+    import pymysql
+    with connection.cursor(pymysql.cursors.SSCursor) as cursor:
+        cursor.execute(query)
+        columns = [description[0] for description in cursor.description]
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield columns, rows
+
+# Column types of each section's row set, declared once and used both to
+# decode query results and to type the Parquet/ORC exports. MySQL returns SUMs
+# and divisions as Decimal and empty aggregates as NULL; numeric columns come
+# out as int or float with NULL as 0.
+SECTION_COLUMN_TYPES = {
+    'customer_segments': {
+        'segment': 'STRING',
+        'total_customers': 'BIGINT',
+        'total_orders': 'BIGINT',
+        'total_revenue': 'DOUBLE',
+        'avg_order_value': 'DOUBLE',
+        'max_order_value': 'DOUBLE',
+        'min_order_value': 'DOUBLE'
+    },
+    'top_products': {
+        'product_name': 'STRING',
+        'category': 'STRING',
+        'brand': 'STRING',
+        'times_ordered': 'BIGINT',
+        'total_quantity_sold': 'BIGINT',
+        'total_revenue': 'DOUBLE',
+        'avg_selling_price': 'DOUBLE',
+        'avg_rating': 'DOUBLE',
+        'total_reviews': 'BIGINT'
+    },
+    'monthly_sales': {
+        'month': 'STRING',
+        'total_orders': 'BIGINT',
+        'total_revenue': 'DOUBLE',
+        'avg_order_value': 'DOUBLE',
+        'unique_customers': 'BIGINT'
+    },
+    'payment_methods': {
+        'payment_method': 'STRING',
+        'transaction_count': 'BIGINT',
+        'total_amount': 'DOUBLE',
+        'avg_transaction_amount': 'DOUBLE',
+        'successful_transactions': 'BIGINT',
+        'failed_transactions': 'BIGINT',
+        'success_rate': 'DOUBLE'
+    }
+}
+
+# Computed from the decoded NumPy columns of the same row set.
+SECTION_DERIVED_COLUMNS = {
+    'payment_methods': {
+        'success_rate': lambda np, columns: np.where(
+            columns['transaction_count'] > 0,
+            np.round(columns['successful_transactions'] / np.maximum(columns['transaction_count'], 1) * 100, 2),
+            0.0
+        )
+    }
+}
+
+def decode_column(np, values, column_type):
+    if column_type == 'DOUBLE':
+        # NumPy converts Decimal and None (as NaN) itself; NULLs become 0.
+        array = np.array(values, dtype=np.float64)
+        array[np.isnan(array)] = 0.0
+        return array
+    if column_type == 'BIGINT':
+        # Counts and summed quantities, well within float64's exact integers.
+        array = np.array(values, dtype=np.float64)
+        array[np.isnan(array)] = 0
+        return array.astype(np.int64)
+    return np.array(values, dtype=object)
+
+def decode_columns(batches, rows_name):
+    import numpy
+    column_types = SECTION_COLUMN_TYPES[rows_name]
+    derived = SECTION_DERIVED_COLUMNS.get(rows_name, {})
+    expected = [column for column in column_types if column not in derived]
+    
+    chunks = {column: [] for column in expected}
+    for columns, rows in batches:
+        if sorted(columns) != sorted(expected):
+            raise ValueError(f"{rows_name} query returned columns {columns}, expected {expected}")
+        if not rows:
+            continue
+        for column, values in zip(columns, zip(*rows)):
+            chunks[column].append(decode_column(numpy, values, column_types[column]))
+    if not chunks[expected[0]]:
         return None
+    
+    decoded = {column: numpy.concatenate(chunks[column]) for column in expected}
+    for column, compute in derived.items():
+        decoded[column] = compute(numpy, decoded)
+    return {column: decoded[column] for column in column_types}
+
+class SectionRows(list):
+    # Row dicts for the JSON consumers (API, result cache), carrying the
+    # decoded columns for the Parquet export.
+    def __init__(self, columns):
+        names = list(columns)
+        super().__init__(dict(zip(names, row)) for row in zip(*(values.tolist() for values in columns.values())))
+        self.columns = columns
+
+def shape_rows(batches, rows_name):
+    columns = decode_columns(batches, rows_name)
+    return SectionRows(columns) if columns is not None else None
+
+# Each refresh re-aggregates the rollup keys whose source rows changed since
+# the previous refresh, less ROLLUP_OVERLAP_SECONDS for transactions that
+# commit after their timestamp: orders on updated_at, order items through
+# their order, and reviews on review_date. Rows moved to another key or
+# deleted, and reviews edited in place, are corrected when a rollup is
+# rebuilt from scratch every ROLLUP_REBUILD_HOURS. Aggregates over mutable
+# statuses are not rolled up at all; see process_payment_analytics.
+ROLLUP_REFRESHES = {
+    'customer_order_stats': ('customer_id', """
+        SELECT DISTINCT customer_id as rollup_key FROM orders WHERE updated_at >= %(since)s
+    """, "customer_id IN %(keys)s", """
+        INSERT INTO customer_order_stats (customer_id, order_count, revenue, max_order_value, min_order_value)
+        SELECT customer_id, COUNT(order_id), SUM(total_amount), MAX(total_amount), MIN(total_amount)
+        FROM orders
+        WHERE {source_filter}
+        GROUP BY customer_id
+    """),
+    'monthly_sales_stats': ('order_month', """
+        SELECT DISTINCT DATE_FORMAT(order_date, '%%Y-%%m') as rollup_key FROM orders WHERE updated_at >= %(since)s
+    """, "order_date >= CONCAT(%(first_key)s, '-01') AND DATE_FORMAT(order_date, '%%Y-%%m') IN %(keys)s", """
+        INSERT INTO monthly_sales_stats (order_month, order_count, revenue)
+        SELECT DATE_FORMAT(order_date, '%%Y-%%m'), COUNT(order_id), SUM(total_amount)
+        FROM orders
+        WHERE {source_filter}
+        GROUP BY DATE_FORMAT(order_date, '%%Y-%%m')
+    """),
+    'monthly_customer_activity': ('order_month', """
+        SELECT DISTINCT DATE_FORMAT(order_date, '%%Y-%%m') as rollup_key FROM orders WHERE updated_at >= %(since)s
+    """, "order_date >= CONCAT(%(first_key)s, '-01') AND DATE_FORMAT(order_date, '%%Y-%%m') IN %(keys)s", """
+        INSERT INTO monthly_customer_activity (order_month, customer_id)
+        SELECT DISTINCT DATE_FORMAT(order_date, '%%Y-%%m'), customer_id
+        FROM orders
+        WHERE {source_filter}
+    """),
+    'product_sales_stats': ('product_id', """
+        SELECT DISTINCT oi.product_id as rollup_key
+        FROM orders o
+        JOIN order_items oi ON oi.order_id = o.order_id
+        WHERE o.updated_at >= %(since)s
+    """, "product_id IN %(keys)s", """
+        INSERT INTO product_sales_stats (product_id, times_ordered, total_quantity_sold, total_revenue, unit_price_sum)
+        SELECT product_id, COUNT(order_item_id), SUM(quantity), SUM(total_price), SUM(unit_price)
+        FROM order_items
+        WHERE {source_filter}
+        GROUP BY product_id
+    """),
+    'product_review_stats': ('product_id', """
+        SELECT DISTINCT product_id as rollup_key FROM reviews WHERE review_date >= %(since)s
+    """, "product_id IN %(keys)s", """
+        INSERT INTO product_review_stats (product_id, review_count, rating_sum)
+        SELECT product_id, COUNT(review_id), SUM(rating)
+        FROM reviews
+        WHERE {source_filter}
+        GROUP BY product_id
+    """)
+}
+
+SECTION_ROLLUPS = {
+    'customers': ['customer_order_stats'],
+    'products': ['product_sales_stats', 'product_review_stats'],
+    'sales': ['monthly_sales_stats', 'monthly_customer_activity'],
+    'payments': [],
+    'customer_insights': []
+}
+
+def refresh_rollup(connection, rollup_name, rebuild=False):
+    rollup_key, touched_query, source_filter, statement = ROLLUP_REFRESHES[rollup_name]
+    connection.begin()
+    try:
+        with connection.cursor() as cursor:
+            # Locking the checkpoint row serializes overlapping invocations.
+            cursor.execute(
+                "SELECT refreshed_at - INTERVAL %s SECOND as since, "
+                "rebuilt_at IS NULL OR rebuilt_at < NOW() - INTERVAL %s HOUR as rebuild_due "
+                "FROM rollup_checkpoints WHERE rollup_name = %s FOR UPDATE",
+                (ROLLUP_OVERLAP_SECONDS, ROLLUP_REBUILD_HOURS, rollup_name)
+            )
+            checkpoint = cursor.fetchone()
+            rebuild = rebuild or not checkpoint or checkpoint['since'] is None or bool(checkpoint['rebuild_due'])
+            cursor.execute("SELECT NOW() as started_at")
+            started_at = cursor.fetchone()['started_at']
+            if rebuild:
+                cursor.execute(f"DELETE FROM {rollup_name}")
+                cursor.execute(statement.format(source_filter="TRUE"), {})
+                touched = "all"
+            else:
+                cursor.execute(touched_query, {'since': checkpoint['since']})
+                keys = sorted(row['rollup_key'] for row in cursor.fetchall())
+                if keys:
+                    params = {'keys': keys, 'first_key': keys[0]}
+                    cursor.execute(f"DELETE FROM {rollup_name} WHERE {rollup_key} IN %(keys)s", params)
+                    cursor.execute(statement.format(source_filter=source_filter), params)
+                touched = len(keys)
+            
+            cursor.execute(
+                "INSERT INTO rollup_checkpoints (rollup_name, refreshed_at, rebuilt_at) VALUES (%s, %s, %s) "
+                "ON DUPLICATE KEY UPDATE refreshed_at = VALUES(refreshed_at)"
+                + (", rebuilt_at = VALUES(rebuilt_at)" if rebuild else ""),
+                (rollup_name, started_at, started_at)
+            )
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    
+    print(f"{'Rebuilt' if rebuild else 'Refreshed'} {rollup_name}, re-aggregated {touched} {rollup_key} keys")
 
+@instrumented()
+def refresh_rollups(section_names, rebuild=False):
+    connection = connection_pool.acquire()
+    if not connection:
+        raise ConnectionError("Database connection failed for rollup refresh")
+    try:
+        for section_name in section_names:
+            for rollup_name in SECTION_ROLLUPS[section_name]:
+                refresh_rollup(connection, rollup_name, rebuild)
+    finally:
+        connection_pool.release(connection)
+
+@instrumented(count_rows=count_section_rows)
 def process_customer_analytics(connection):
     query = """
     SELECT 
-        c.customer_segment,
-        COUNT(DISTINCT c.customer_id) as total_customers,
-        COUNT(o.order_id) as total_orders,
-        SUM(o.total_amount) as total_revenue,
-        AVG(o.total_amount) as avg_order_value,
-        MAX(o.total_amount) as max_order_value,
-        MIN(o.total_amount) as min_order_value
+        c.customer_segment as segment,
+        COUNT(c.customer_id) as total_customers,
+        COALESCE(SUM(s.order_count), 0) as total_orders,
+        SUM(s.revenue) as total_revenue,
+        SUM(s.revenue) / SUM(s.order_count) as avg_order_value,
+        MAX(s.max_order_value) as max_order_value,
+        MIN(s.min_order_value) as min_order_value
     FROM customers c
-    LEFT JOIN orders o ON c.customer_id = o.customer_id
+    LEFT JOIN customer_order_stats s ON c.customer_id = s.customer_id
     GROUP BY c.customer_segment
     ORDER BY total_revenue DESC
     """
     
-    result = execute_query(connection, query)
-    if result:
-        return {
-            'customer_segments': [
-                {
-                    'segment': row['customer_segment'],
-                    'total_customers': row['total_customers'],
-                    'total_orders': row['total_orders'],
-                    'total_revenue': float(row['total_revenue']) if row['total_revenue'] else 0,
-                    'avg_order_value': float(row['avg_order_value']) if row['avg_order_value'] else 0,
-                    'max_order_value': float(row['max_order_value']) if row['max_order_value'] else 0,
-                    'min_order_value': float(row['min_order_value']) if row['min_order_value'] else 0
-                }
-                for row in result
-            ]
-        }
-    return None
+    rows = shape_rows(stream_query(connection, query), 'customer_segments')
+    return {'customer_segments': rows} if rows else None
 
+@instrumented(count_rows=count_section_rows)
 def process_product_analytics(connection):
     query = """
     SELECT 
         p.product_name,
         p.category,
         p.brand,
-        COUNT(oi.order_item_id) as times_ordered,
-        SUM(oi.quantity) as total_quantity_sold,
-        SUM(oi.total_price) as total_revenue,
-        AVG(oi.unit_price) as avg_selling_price,
-        AVG(r.rating) as avg_rating,
-        COUNT(r.review_id) as total_reviews
+        COALESCE(s.times_ordered, 0) as times_ordered,
+        s.total_quantity_sold,
+        s.total_revenue,
+        s.unit_price_sum / s.times_ordered as avg_selling_price,
+        r.rating_sum / r.review_count as avg_rating,
+        COALESCE(r.review_count, 0) as total_reviews
     FROM products p
-    LEFT JOIN order_items oi ON p.product_id = oi.product_id
-    LEFT JOIN reviews r ON p.product_id = r.product_id
-    GROUP BY p.product_id, p.product_name, p.category, p.brand
-    ORDER BY total_revenue DESC
+    LEFT JOIN product_sales_stats s ON p.product_id = s.product_id
+    LEFT JOIN product_review_stats r ON p.product_id = r.product_id
+    ORDER BY s.total_revenue DESC
     LIMIT 20
     """
     
-    result = execute_query(connection, query)
-    if result:
-        return {
-            'top_products': [
-                {
-                    'product_name': row['product_name'],
-                    'category': row['category'],
-                    'brand': row['brand'],
-                    'times_ordered': row['times_ordered'],
-                    'total_quantity_sold': row['total_quantity_sold'],
-                    'total_revenue': float(row['total_revenue']) if row['total_revenue'] else 0,
-                    'avg_selling_price': float(row['avg_selling_price']) if row['avg_selling_price'] else 0,
-                    'avg_rating': float(row['avg_rating']) if row['avg_rating'] else 0,
-                    'total_reviews': row['total_reviews']
-                }
-                for row in result
-            ]
-        }
-    return None
+    rows = shape_rows(stream_query(connection, query), 'top_products')
+    return {'top_products': rows} if rows else None
 
-def process_sales_analytics(connection):
+@instrumented(count_rows=count_section_rows)
+def process_sales_analytics(connection, months=None):
+    # Whole months come from the rollups; only the partial month at the start
+    # of the 12-month window is aggregated from orders directly. Passing months
+    # limits the rollup half to those months for change-driven refreshes.
+    month_filter = ""
+    if months is not None:
+        month_filter = f"AND m.order_month IN ({', '.join(repr(month) for month in months)})" if months else "AND FALSE"
     query = """
     SELECT 
         DATE_FORMAT(order_date, '%Y-%m') as month,
@@ -119,71 +556,561 @@ def process_sales_analytics(connection):
         COUNT(DISTINCT customer_id) as unique_customers
     FROM orders
     WHERE order_date >= DATE_SUB(NOW(), INTERVAL 12 MONTH)
+        AND order_date < DATE_FORMAT(DATE_SUB(NOW(), INTERVAL 11 MONTH), '%Y-%m-01')
     GROUP BY DATE_FORMAT(order_date, '%Y-%m')
+    UNION ALL
+    SELECT 
+        m.order_month as month,
+        m.order_count as total_orders,
+        m.revenue as total_revenue,
+        m.revenue / m.order_count as avg_order_value,
+        (SELECT COUNT(*) FROM monthly_customer_activity a WHERE a.order_month = m.order_month) as unique_customers
+    FROM monthly_sales_stats m
+    WHERE m.order_month >= DATE_FORMAT(DATE_SUB(NOW(), INTERVAL 11 MONTH), '%Y-%m')
+        {month_filter}
     ORDER BY month
     """
     
-    result = execute_query(connection, query)
-    if result:
-        return {
-            'monthly_sales': [
-                {
-                    'month': row['month'],
-                    'total_orders': row['total_orders'],
-                    'total_revenue': float(row['total_revenue']) if row['total_revenue'] else 0,
-                    'avg_order_value': float(row['avg_order_value']) if row['avg_order_value'] else 0,
-                    'unique_customers': row['unique_customers']
-                }
-                for row in result
-            ]
-        }
-    return None
+    rows = shape_rows(stream_query(connection, query.format(month_filter=month_filter)), 'monthly_sales')
+    return {'monthly_sales': rows} if rows else None
 
+@instrumented(count_rows=count_section_rows)
 def process_payment_analytics(connection):
+    # Payment statuses change after insert, so this section is aggregated live
+    # rather than from a rollup. idx_payments_method_status_amount covers every
+    # column read, so it is an index-only scan.
     query = """
     SELECT 
-        p.payment_method,
-        COUNT(p.payment_id) as transaction_count,
-        SUM(p.amount) as total_amount,
-        AVG(p.amount) as avg_transaction_amount,
-        COUNT(CASE WHEN p.payment_status = 'Completed' THEN 1 END) as successful_transactions,
-        COUNT(CASE WHEN p.payment_status = 'Failed' THEN 1 END) as failed_transactions
-    FROM payments p
-    GROUP BY p.payment_method
+        payment_method,
+        COUNT(payment_id) as transaction_count,
+        SUM(amount) as total_amount,
+        AVG(amount) as avg_transaction_amount,
+        COUNT(CASE WHEN payment_status = 'Completed' THEN 1 END) as successful_transactions,
+        COUNT(CASE WHEN payment_status = 'Failed' THEN 1 END) as failed_transactions
+    FROM payments
+    GROUP BY payment_method
     ORDER BY total_amount DESC
     """
     
-    result = execute_query(connection, query)
-    if result:
-        return {
-            'payment_methods': [
-                {
-                    'payment_method': row['payment_method'],
-                    'transaction_count': row['transaction_count'],
-                    'total_amount': float(row['total_amount']) if row['total_amount'] else 0,
-                    'avg_transaction_amount': float(row['avg_transaction_amount']) if row['avg_transaction_amount'] else 0,
-                    'successful_transactions': row['successful_transactions'],
-                    'failed_transactions': row['failed_transactions'],
-                    'success_rate': round((row['successful_transactions'] / row['transaction_count']) * 100, 2) if row['transaction_count'] > 0 else 0
-                }
-                for row in result
-            ]
-        }
+    rows = shape_rows(stream_query(connection, query), 'payment_methods')
+    return {'payment_methods': rows} if rows else None
+
+@instrumented(count_rows=count_section_rows)
+def process_customer_insights(connection):
+    import customer_insights
+    orders = customer_insights.load_frame(
+        stream_query(connection, customer_insights.ORDER_EXTRACT_QUERY),
+        ['customer_id', 'order_date', 'total_amount']
+    )
+    customers = customer_insights.load_frame(
+        stream_query(connection, customer_insights.CUSTOMER_EXTRACT_QUERY),
+        ['customer_id', 'customer_segment']
+    )
+    return customer_insights.build_customer_insights(orders, customers, date.today())
+
+ANALYTICS_SECTIONS = [
+    ('customers', 'process_customers', process_customer_analytics),
+    ('products', 'process_products', process_product_analytics),
+    ('sales', 'process_sales', process_sales_analytics),
+    ('payments', 'process_payments', process_payment_analytics),
+    ('customer_insights', 'process_customer_insights', process_customer_insights)
+]
+
+# Sections that pull full extracts only run when the event asks for them.
+OPT_IN_SECTIONS = {'customer_insights'}
+
+def run_section(section_name, processor, connection=None):
+    owns_connection = connection is None
+    if owns_connection:
+        connection = connection_pool.acquire()
+        if not connection:
+            raise ConnectionError(f"Database connection failed for {section_name}")
+    
+    try:
+        print(f"Processing {section_name} analytics...")
+        return processor(connection)
+    finally:
+        if owns_connection:
+            connection_pool.release(connection)
+
+def run_sections_sequentially(sections, connection):
+    analytics_data = {}
+    section_errors = {}
+    
+    for section_name, processor in sections:
+        try:
+            analytics_data[section_name] = run_section(section_name, processor, connection)
+        except Exception as e:
+            print(f"Error processing {section_name} analytics: {str(e)}")
+            section_errors[section_name] = str(e)
+    
+    return analytics_data, section_errors
+
+def run_sections_concurrently(sections, max_workers, timeout):
+    analytics_data = {}
+    section_errors = {}
+    
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    futures = {
+        executor.submit(run_section, section_name, processor): section_name
+        for section_name, processor in sections
+    }
+    done, not_done = wait(futures, timeout=timeout)
+    executor.shutdown(wait=False, cancel_futures=True)
+    
+    for future in done:
+        section_name = futures[future]
+        try:
+            analytics_data[section_name] = future.result()
+        except Exception as e:
+            print(f"Error processing {section_name} analytics: {str(e)}")
+            section_errors[section_name] = str(e)
+    
+    for future in not_done:
+        section_name = futures[future]
+        print(f"Timed out processing {section_name} analytics after {timeout}s")
+        section_errors[section_name] = f"Timed out after {timeout}s"
+    
+    return analytics_data, section_errors
+
+SECTION_SOURCE_TABLES = {
+    'customers': ['customers', 'orders'],
+    'products': ['products', 'order_items', 'reviews'],
+    'sales': ['orders'],
+    'payments': ['payments'],
+    'customer_insights': ['customers', 'orders']
+}
+
+# Row count plus the highest key and timestamp catch inserts cheaply. orders
+# and payments also change in place (status, refunds), which bumps their
+# indexed updated_at; other in-place updates are picked up when the TTL expires.
+TABLE_FINGERPRINT_COLUMNS = {
+    'customers': ['customer_id'],
+    'products': ['product_id'],
+    'orders': ['order_id', 'updated_at'],
+    'order_items': ['order_item_id'],
+    'reviews': ['review_id', 'review_date'],
+    'payments': ['payment_id', 'updated_at']
+}
+
+class FileResultCache:
+    def __init__(self, directory, ttl_seconds):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(directory, exist_ok=True)
+    
+    def path_for(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+    
+    def get(self, key):
+        try:
+            with open(self.path_for(key)) as cache_file:
+                entry = json.load(cache_file)
+        except (OSError, ValueError):
+            return None
+        
+        if time.time() - entry['stored_at'] > self.ttl_seconds:
+            return None
+        return entry
+    
+    def set(self, key, entry):
+        entry = dict(entry, stored_at=time.time())
+        temp_path = f"{self.path_for(key)}.tmp"
+        with open(temp_path, 'w') as cache_file:
+            json.dump(entry, cache_file, default=str)
+        os.replace(temp_path, self.path_for(key))
+    
+    def touch(self, key):
+        try:
+            with open(self.path_for(key)) as cache_file:
+                entry = json.load(cache_file)
+        except (OSError, ValueError):
+            return
+        self.set(key, entry)
+
+class RedisResultCache:
+    def __init__(self, url, ttl_seconds):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.ttl_seconds = ttl_seconds
+    
+    def get(self, key):
+        value = self.client.get(f"analytics:{key}")
+        return json.loads(value) if value else None
+    
+    def set(self, key, entry):
+        self.client.set(f"analytics:{key}", json.dumps(entry, default=str), ex=self.ttl_seconds)
+    
+    def touch(self, key):
+        self.client.expire(f"analytics:{key}", self.ttl_seconds)
+
+def create_result_cache():
+    try:
+        if RESULT_CACHE_BACKEND == 'redis':
+            return RedisResultCache(os.environ['REDIS_URL'], RESULT_CACHE_TTL_SECONDS)
+        if RESULT_CACHE_BACKEND == 'file':
+            return FileResultCache(RESULT_CACHE_DIR, RESULT_CACHE_TTL_SECONDS)
+    except Exception as e:
+        print(f"Result cache unavailable, computing all sections: {str(e)}")
     return None
 
-def export_to_s3(data, bucket_name, key_prefix):
+result_cache = create_result_cache()
+
+def get_table_fingerprints(connection, tables):
+    query = " UNION ALL ".join(
+        f"SELECT '{table_name}' as table_name, COUNT(*) as row_count, "
+        f"CONCAT_WS('|', {', '.join(f'MAX({column})' for column in TABLE_FINGERPRINT_COLUMNS[table_name])}) as high_water_mark "
+        f"FROM {table_name}"
+        for table_name in tables
+    )
+    return {
+        row['table_name']: f"{row['row_count']}:{row['high_water_mark']}"
+        for row in execute_query(connection, query)
+    }
+
+def get_source_tables(section_names):
+    return sorted({table_name for section_name in section_names for table_name in SECTION_SOURCE_TABLES[section_name]})
+
+@instrumented()
+def probe_table_fingerprints(section_names):
+    connection = connection_pool.acquire()
+    if not connection:
+        raise ConnectionError("Database connection failed for fingerprinting")
+    try:
+        return get_table_fingerprints(connection, get_source_tables(section_names))
+    finally:
+        connection_pool.release(connection)
+
+def get_section_fingerprints(section_names, table_fingerprints=None):
+    if table_fingerprints is None:
+        table_fingerprints = probe_table_fingerprints(section_names)
+    
+    fingerprints = {}
+    for section_name in section_names:
+        parts = [f"{table_name}={table_fingerprints[table_name]}" for table_name in SECTION_SOURCE_TABLES[section_name]]
+        if section_name in ('sales', 'customer_insights'):
+            # Sales and RFM recency are relative to today, so the entry expires daily.
+            parts.append(datetime.now().strftime('%Y-%m-%d'))
+        fingerprints[section_name] = hashlib.sha256("|".join(parts).encode()).hexdigest()
+    return fingerprints
+
+def load_cached_sections(fingerprints):
+    cached_sections = {}
+    for section_name, fingerprint in fingerprints.items():
+        entry = result_cache.get(section_name)
+        if entry and entry['fingerprint'] == fingerprint:
+            print(f"Source tables unchanged, reusing cached {section_name} analytics")
+            cached_sections[section_name] = entry
+            # Still current, so it counts as fresh from now; otherwise an
+            # unchanged section would be recomputed every TTL regardless.
+            result_cache.touch(section_name)
+    return cached_sections
+
+def store_cached_sections(analytics_data, fingerprints, exported):
+    for section_name, data_content in analytics_data.items():
+        if data_content is None or section_name not in fingerprints:
+            continue
+        try:
+            result_cache.set(section_name, {
+                'fingerprint': fingerprints[section_name],
+                'data': data_content,
+                'exported': exported
+            })
+        except Exception as e:
+            print(f"Error caching {section_name} analytics: {str(e)}")
+
+class S3MultipartWriter:
+    # The multipart upload is only started once a full part is buffered;
+    # anything smaller is written with a single put_object on close.
+    def __init__(self, bucket_name, key, content_type, part_size=EXPORT_PART_SIZE_BYTES):
+        self.bucket_name = bucket_name
+        self.key = key
+        self.content_type = content_type
+        self.part_size = part_size
+        self.buffer = bytearray()
+        self.parts = []
+        self.bytes_written = 0
+        self.closed = False
+        self.upload_id = None
+    
+    def write(self, data):
+        self.buffer.extend(data)
+        self.bytes_written += len(data)
+        if len(self.buffer) >= self.part_size:
+            self.upload_part()
+        return len(data)
+    
+    def tell(self):
+        return self.bytes_written
+    
+    def flush(self):
+        pass
+    
+    def upload_part(self):
+        if self.upload_id is None:
+            self.upload_id = get_client('s3').create_multipart_upload(
+                Bucket=self.bucket_name, Key=self.key, ContentType=self.content_type
+            )['UploadId']
+        part_number = len(self.parts) + 1
+        response = get_client('s3').upload_part(
+            Bucket=self.bucket_name,
+            Key=self.key,
+            UploadId=self.upload_id,
+            PartNumber=part_number,
+            Body=bytes(self.buffer)
+        )
+        self.parts.append({'ETag': response['ETag'], 'PartNumber': part_number})
+        self.buffer = bytearray()
+    
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self.upload_id is None:
+            get_client('s3').put_object(
+                Bucket=self.bucket_name, Key=self.key, Body=bytes(self.buffer), ContentType=self.content_type
+            )
+            return
+        if self.buffer:
+            self.upload_part()
+        get_client('s3').complete_multipart_upload(
+            Bucket=self.bucket_name,
+            Key=self.key,
+            UploadId=self.upload_id,
+            MultipartUpload={'Parts': self.parts}
+        )
+    
+    def abort(self):
+        if self.upload_id is not None:
+            get_client('s3').abort_multipart_upload(Bucket=self.bucket_name, Key=self.key, UploadId=self.upload_id)
+
+def ndjson_default(value):
+    # get_athena_type declares Decimal columns DOUBLE, so they are written as
+    # JSON numbers; dates and anything else as their string form.
+    return float(value) if isinstance(value, Decimal) else str(value)
+
+class NdjsonEncoder:
+    def __init__(self, sink, compression=None):
+        self.sink = sink
+        if compression == 'gzip':
+            self.compressor = zlib.compressobj(wbits=31)
+        elif compression == 'zstd':
+            import zstandard
+            self.compressor = zstandard.ZstdCompressor().compressobj()
+        else:
+            self.compressor = None
+    
+    def write_batch(self, columns, column_types, rows):
+        self.write_lines([json.dumps(dict(zip(columns, row)), default=ndjson_default) for row in rows])
+    
+    def write_records(self, columns, column_types, records):
+        self.write_lines([json.dumps(record, default=ndjson_default) for record in records])
+    
+    def write_lines(self, lines):
+        data = ("\n".join(lines) + "\n").encode('utf-8')
+        if self.compressor:
+            data = self.compressor.compress(data)
+        if data:
+            self.sink.write(data)
+    
+    def close(self):
+        if self.compressor:
+            self.sink.write(self.compressor.flush())
+
+class ParquetEncoder:
+    def __init__(self, sink):
+        import pyarrow
+        import pyarrow.parquet
+        self.pa = pyarrow
+        self.sink = sink
+        self.writer = None
+    
+    def write_batch(self, columns, column_types, rows):
+        self.write_columns(columns, column_types, zip(*rows))
+    
+    def write_records(self, columns, column_types, records):
+        self.write_columns(columns, column_types, ([record[column] for record in records] for column in columns))
+    
+    def write_columns(self, columns, column_types, column_values):
+        arrow_types = {
+            'BOOLEAN': self.pa.bool_(),
+            'BIGINT': self.pa.int64(),
+            'DOUBLE': self.pa.float64(),
+            'DATE': self.pa.date32(),
+            'TIMESTAMP': self.pa.timestamp('ms'),
+            'STRING': self.pa.string()
+        }
+        schema = self.pa.schema([(column, arrow_types[column_types[column]]) for column in columns])
+        arrays = []
+        for column, values in zip(columns, column_values):
+            if hasattr(values, 'dtype'):
+                # Already decoded into NumPy columns (SectionRows).
+                arrays.append(self.pa.array(values, type=schema.field(column).type))
+                continue
+            if column_types[column] == 'DOUBLE':
+                values = [float(value) if value is not None else None for value in values]
+            elif column_types[column] == 'STRING':
+                values = [str(value) if value is not None else None for value in values]
+            arrays.append(self.pa.array(values, type=schema.field(column).type))
+        
+        if self.writer is None:
+            self.writer = self.pa.parquet.ParquetWriter(self.pa.PythonFile(self.sink, mode='w'), schema, compression='snappy')
+        self.writer.write_table(self.pa.Table.from_arrays(arrays, schema=schema))
+    
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+# format name -> (file extension, content type, encoder factory, Athena storage clause)
+EXPORT_FORMATS = {
+    'ndjson': ('ndjson', 'application/x-ndjson', lambda sink: NdjsonEncoder(sink),
+               "ROW FORMAT SERDE 'org.openx.data.jsonserde.JsonSerDe'"),
+    'ndjson.gz': ('ndjson.gz', 'application/gzip', lambda sink: NdjsonEncoder(sink, 'gzip'),
+                  "ROW FORMAT SERDE 'org.openx.data.jsonserde.JsonSerDe'"),
+    'ndjson.zst': ('ndjson.zst', 'application/zstd', lambda sink: NdjsonEncoder(sink, 'zstd'),
+                   "ROW FORMAT SERDE 'org.openx.data.jsonserde.JsonSerDe'"),
+    'parquet': ('parquet', 'application/vnd.apache.parquet', lambda sink: ParquetEncoder(sink),
+                "STORED AS PARQUET")
+}
+
+def get_athena_type(value):
+    if isinstance(value, bool):
+        return 'BOOLEAN'
+    if isinstance(value, int):
+        return 'BIGINT'
+    if isinstance(value, (float, Decimal)):
+        return 'DOUBLE'
+    if isinstance(value, datetime):
+        return 'TIMESTAMP'
+    if isinstance(value, date):
+        return 'DATE'
+    return 'STRING'
+
+def infer_column_types(columns, rows, records=False):
+    column_types = {}
+    for index, column in enumerate(columns):
+        key = column if records else index
+        sample = next((row[key] for row in rows if row[key] is not None), None)
+        column_types[column] = get_athena_type(sample)
+    return column_types
+
+def generate_athena_ddl(table_name, columns, column_types, export_format, location):
+    # Every run adds an export_ts=<timestamp>/ directory under the location.
+    # The injected projection makes queries name the export they read
+    # (WHERE export_ts = '...'), so they never add up several runs' rows.
+    column_definitions = ",\n".join(f"    `{column}` {column_types[column]}" for column in columns)
+    return (
+        f"CREATE EXTERNAL TABLE IF NOT EXISTS ecommerce_analytics.{table_name} (\n"
+        f"{column_definitions}\n"
+        f")\n"
+        f"PARTITIONED BY (`export_ts` STRING)\n"
+        f"{EXPORT_FORMATS[export_format][3]}\n"
+        f"LOCATION '{location}'\n"
+        f"TBLPROPERTIES (\n"
+        f"    'projection.enabled' = 'true',\n"
+        f"    'projection.export_ts.type' = 'injected',\n"
+        f"    'storage.location.template' = '{location}export_ts=${{export_ts}}/'\n"
+        f");\n"
+    )
+
+def get_format_prefix(key_prefix, export_format):
+    return f"{key_prefix}/{export_format.replace('.', '_')}"
+
+def get_export_key(table_location, timestamp, name, export_format):
+    return f"{table_location}/export_ts={timestamp}/{name}.{EXPORT_FORMATS[export_format][0]}"
+
+def export_stream_to_s3(batches, bucket_name, key, export_format='ndjson', ddl=None, column_types=None, batch_kind='rows'):
+    # Batches are (columns, rows) with rows as tuples in column order
+    # ('rows'), as dicts keyed by column ('records'), or (columns, arrays)
+    # with one decoded array per column ('columns', Parquet only, which
+    # needs column_types).
+    extension, content_type, create_encoder, _ = EXPORT_FORMATS[export_format]
+    writer = S3MultipartWriter(bucket_name, key, content_type)
+    encoder = create_encoder(writer)
+    write = {'rows': 'write_batch', 'records': 'write_records', 'columns': 'write_columns'}[batch_kind]
+    write = getattr(encoder, write)
+    row_count = 0
+    try:
+        for columns, rows in batches:
+            if column_types is None:
+                column_types = infer_column_types(columns, rows, batch_kind == 'records')
+            write(columns, column_types, rows)
+            row_count += len(rows[0]) if batch_kind == 'columns' else len(rows)
+        encoder.close()
+        writer.close()
+    except Exception:
+        writer.abort()
+        raise
+    
+    stage_metrics.add_counts(rows=row_count, bytes_count=writer.bytes_written)
+    print(f"Streamed {row_count} rows ({writer.bytes_written} bytes, {export_format}) to s3://{bucket_name}/{key}")
+    
+    if ddl and column_types:
+        table_name, ddl_key = ddl
+        # Keys are <table location>/export_ts=<timestamp>/<file>.
+        location = f"s3://{bucket_name}/{key.rsplit('/', 2)[0]}/"
+        get_client('s3').put_object(
+            Bucket=bucket_name,
+            Key=ddl_key,
+            Body=generate_athena_ddl(table_name, columns, column_types, export_format, location),
+            ContentType='text/plain'
+        )
+    return row_count
+
+@instrumented()
+def export_table_to_s3(table_name, bucket_name, key_prefix, export_format='ndjson'):
+    connection = connection_pool.acquire()
+    if not connection:
+        raise ConnectionError(f"Database connection failed for {table_name} export")
+    
+    try:
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        format_prefix = get_format_prefix(key_prefix, export_format)
+        key = get_export_key(f"{format_prefix}/exports/{table_name}", timestamp, table_name, export_format)
+        ddl = (f"{table_name}_export_{export_format.replace('.', '_')}", f"{format_prefix}/_ddl/{table_name}_export.sql")
+        return export_stream_to_s3(
+            stream_query(connection, f"SELECT * FROM {table_name}"), bucket_name, key, export_format, ddl
+        )
+    finally:
+        connection_pool.release(connection)
+
+def export_section_to_s3(data_type, data_content, bucket_name, key_prefix, export_format, timestamp):
+    format_prefix = get_format_prefix(key_prefix, export_format)
+    for rows_name, rows in data_content.items():
+        if not rows:
+            continue
+        columns = list(rows[0].keys())
+        # Freshly decoded sections carry their columns, which Parquet is
+        # written from directly; cached and merged ones are plain row dicts.
+        decoded = getattr(rows, 'columns', None)
+        # Sections with several row sets get a directory (and table) per set.
+        location = data_type if len(data_content) == 1 else f"{data_type}/{rows_name}"
+        key = get_export_key(f"{format_prefix}/{location}", timestamp, rows_name, export_format)
+        ddl = (f"{rows_name}_{export_format.replace('.', '_')}", f"{format_prefix}/_ddl/{rows_name}.sql")
+        if decoded is not None and export_format == 'parquet':
+            batches, batch_kind = [(columns, [decoded[column] for column in columns])], 'columns'
+        else:
+            batches, batch_kind = [(columns, rows)], 'records'
+        export_stream_to_s3(batches, bucket_name, key, export_format, ddl, SECTION_COLUMN_TYPES.get(rows_name), batch_kind)
+
+@instrumented()
+def export_to_s3(data, bucket_name, key_prefix, export_format='json'):
     try:
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         
         for data_type, data_content in data.items():
-            if data_content:
+            if data_content and export_format != 'json':
+                export_section_to_s3(data_type, data_content, bucket_name, key_prefix, export_format, timestamp)
+            elif data_content:
                 key = f"{key_prefix}/{data_type}/{timestamp}.json"
-                s3_client.put_object(
+                body = json.dumps(data_content, default=str)
+                get_client('s3').put_object(
                     Bucket=bucket_name,
                     Key=key,
-                    Body=json.dumps(data_content, default=str),
+                    Body=body,
                     ContentType='application/json'
                 )
+                stage_metrics.add_counts(rows=count_section_rows(data_content), bytes_count=len(body))
                 print(f"Exported {data_type} to s3://{bucket_name}/{key}")
         
         return True
@@ -191,45 +1118,239 @@ def export_to_s3(data, bucket_name, key_prefix):
         print(f"Error exporting to S3: {str(e)}")
         return False
 
+@instrumented()
+def run_athena_reports(report_names=None):
+    import asyncio
+    import athena_runner
+    reports = athena_runner.load_reports(ATHENA_REPORTS_PATH)
+    if report_names:
+        reports = [(name, sql) for name, sql in reports if name in report_names]
+    runner = athena_runner.AthenaQueryRunner(
+        get_client('athena'), get_client('glue'), get_client('s3'), ATHENA_DATABASE, ATHENA_OUTPUT_LOCATION, ATHENA_WORKGROUP,
+        result_cache, ATHENA_MAX_CONCURRENT_QUERIES
+    )
+    results = asyncio.run(runner.run_reports(reports))
+    
+    report_rows = {}
+    report_errors = {}
+    for name, result in results.items():
+        if isinstance(result, Exception):
+            print(f"Error running Athena report {name}: {str(result)}")
+            report_errors[f"athena_{name}"] = str(result)
+            continue
+        print(f"Athena report {name}: {len(result['rows'])} rows, cached={result['cached']}, scanned {result['scanned_bytes']} bytes")
+        report_rows[name] = [dict(zip(result['columns'], row)) for row in result['rows']]
+        stage_metrics.add_counts(rows=len(result['rows']))
+    return report_rows, report_errors
+
+# Change-aware refreshes: the event names the changed tables (and optionally
+# the time range the changes fall in), or detect_changes compares the table
+# fingerprints with the ones saved by the previous run.
+TABLE_STATE_KEY = 'table_state'
+
+def parse_month(value):
+    return datetime.fromisoformat(str(value)).strftime('%Y-%m')
+
+def get_months_between(start, end):
+    year, month = map(int, parse_month(start).split('-'))
+    end_month = parse_month(end)
+    months = []
+    while f"{year:04d}-{month:02d}" <= end_month:
+        months.append(f"{year:04d}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+def get_sales_window_start():
+    today = date.today()
+    return f"{today.year - 1:04d}-{today.month:02d}"
+
+def get_high_water_id(table_fingerprint):
+    match = re.match(r"\d+:(\d+)", table_fingerprint or "")
+    return int(match.group(1)) if match else None
+
+def get_inserted_order_range(last_order_id):
+    connection = connection_pool.acquire()
+    if not connection:
+        raise ConnectionError("Database connection failed for change detection")
+    try:
+        row = execute_query(
+            connection,
+            f"SELECT MIN(order_date) as start_date, MAX(order_date) as end_date FROM orders WHERE order_id > {int(last_order_id)}"
+        )[0]
+    finally:
+        connection_pool.release(connection)
+    return (row['start_date'], row['end_date']) if row['start_date'] else None
+
+def get_event_changes(event):
+    changed_since = event.get('changed_since')
+    time_range = (changed_since, event.get('changed_until') or datetime.now().isoformat()) if changed_since else None
+    return {table_name: time_range for table_name in event['changed_tables']}
+
+def detect_changes(table_fingerprints):
+    entry = result_cache.get(TABLE_STATE_KEY)
+    previous = entry['tables'] if entry else {}
+    changes = {}
+    for table_name, table_fingerprint in table_fingerprints.items():
+        if previous.get(table_name) == table_fingerprint:
+            continue
+        changes[table_name] = None
+        last_order_id = get_high_water_id(previous.get(table_name))
+        previous_count = int(previous[table_name].split(':')[0]) if table_name in previous else None
+        current_count = int(table_fingerprint.split(':')[0])
+        # Pure appends to orders can be narrowed to the months they touched;
+        # anything else (deletes, a first run) recomputes the whole section.
+        if table_name == 'orders' and last_order_id is not None and current_count > previous_count:
+            changes[table_name] = get_inserted_order_range(last_order_id)
+    return changes
+
+def refresh_sales_months(connection, previous_data, months):
+    # The boundary month of the sliding window is always re-queried, so the
+    # cached copy of it is dropped along with months that left the window.
+    window_start = get_sales_window_start()
+    rows = {row['month']: row for row in previous_data.get('monthly_sales', []) if row['month'] > window_start}
+    fresh_data = process_sales_analytics(connection, months)
+    rows.update({row['month']: row for row in (fresh_data or {}).get('monthly_sales', [])})
+    return {'monthly_sales': [rows[month] for month in sorted(rows)]} if rows else None
+
+def plan_changed_sections(sections, changes, cached_sections):
+    changed_tables = set(changes)
+    planned = []
+    for section_name, processor in sections:
+        depends_on_changes = bool(changed_tables & set(SECTION_SOURCE_TABLES[section_name]))
+        if section_name in cached_sections and not depends_on_changes:
+            continue
+        # Changes named by the event win over a fingerprint match, which
+        # misses in-place updates.
+        cached_sections.pop(section_name, None)
+        previous = result_cache.get(section_name)
+        if previous and section_name == 'sales':
+            if not depends_on_changes:
+                months = []
+            elif changes.get('orders'):
+                months = get_months_between(*changes['orders'])
+            else:
+                planned.append((section_name, processor))
+                continue
+            print(f"Refreshing sales months {months} and the window boundary")
+            planned.append((section_name, functools.partial(refresh_sales_months, previous_data=previous['data'], months=months)))
+        elif previous and not depends_on_changes:
+            print(f"No changes in {SECTION_SOURCE_TABLES[section_name]}, reusing previous {section_name} analytics")
+            cached_sections[section_name] = previous
+        else:
+            planned.append((section_name, processor))
+    return planned
+
 def lambda_handler(event, context):
     try:
         print(f"Processing event: {json.dumps(event)}")
+        stage_metrics.reset()
         
-        connection = get_db_connection()
-        if not connection:
-            return {
-                'statusCode': 500,
-                'body': json.dumps({
-                    'error': 'Database connection failed',
-                    'timestamp': datetime.now().isoformat()
-                })
-            }
+        sections = [
+            (section_name, processor)
+            for section_name, event_flag, processor in ANALYTICS_SECTIONS
+            if event.get(event_flag, section_name not in OPT_IN_SECTIONS)
+        ]
         
-        analytics_data = {}
+        use_cache = result_cache is not None and event.get('use_cache', True)
+        fingerprints = {}
+        table_fingerprints = None
+        cached_sections = {}
+        changes = None
+        if use_cache:
+            try:
+                section_names = [section_name for section_name, _ in sections]
+                table_fingerprints = probe_table_fingerprints(section_names)
+                fingerprints = get_section_fingerprints(section_names, table_fingerprints)
+                cached_sections = load_cached_sections(fingerprints)
+                if event.get('changed_tables') is not None:
+                    changes = get_event_changes(event)
+                elif event.get('detect_changes', False):
+                    changes = detect_changes(table_fingerprints)
+                if changes is not None:
+                    print(f"Changed tables: {changes}")
+                    sections = plan_changed_sections(sections, changes, cached_sections)
+            except Exception as e:
+                print(f"Error checking result cache, computing all sections: {str(e)}")
+                cached_sections = {}
+                changes = None
+            sections = [section for section in sections if section[0] not in cached_sections]
         
-        if event.get('process_customers', True):
-            print("Processing customer analytics...")
-            analytics_data['customers'] = process_customer_analytics(connection)
+        section_errors = {}
+        try:
+            refresh_rollups([section_name for section_name, _ in sections], event.get('rebuild_rollups', False))
+        except Exception as e:
+            print(f"Error refreshing rollup tables: {str(e)}")
+            section_errors['rollups'] = str(e)
         
-        if event.get('process_products', True):
-            print("Processing product analytics...")
-            analytics_data['products'] = process_product_analytics(connection)
+        if event.get('concurrent', CONCURRENT_SECTIONS):
+            max_workers = int(event.get('max_workers', MAX_SECTION_WORKERS))
+            # Each query is bounded by QUERY_TIMEOUT_SECONDS on the server; the
+            # extra slack covers connection setup and result shaping.
+            timeout = QUERY_TIMEOUT_SECONDS * 2
+            analytics_data, errors = run_sections_concurrently(sections, max_workers, timeout)
+        else:
+            connection = connection_pool.acquire()
+            if not connection:
+                return {
+                    'statusCode': 500,
+                    'body': json.dumps({
+                        'error': 'Database connection failed',
+                        'timestamp': datetime.now().isoformat()
+                    })
+                }
+            
+            try:
+                analytics_data, errors = run_sections_sequentially(sections, connection)
+            finally:
+                connection_pool.release(connection)
+        section_errors.update(errors)
         
-        if event.get('process_sales', True):
-            print("Processing sales analytics...")
-            analytics_data['sales'] = process_sales_analytics(connection)
+        # Athena reports read the exported data lake, not RDS. True runs every
+        # report in ATHENA_REPORTS_PATH; a list runs only the named ones.
+        if event.get('athena_reports'):
+            report_names = event['athena_reports'] if isinstance(event['athena_reports'], list) else None
+            try:
+                analytics_data['athena_reports'], report_errors = run_athena_reports(report_names)
+                section_errors.update(report_errors)
+            except Exception as e:
+                print(f"Error running Athena reports: {str(e)}")
+                section_errors['athena_reports'] = str(e)
         
-        if event.get('process_payments', True):
-            print("Processing payment analytics...")
-            analytics_data['payments'] = process_payment_analytics(connection)
+        if table_fingerprints is not None and not section_errors:
+            result_cache.set(TABLE_STATE_KEY, {'tables': table_fingerprints})
         
-        connection.close()
+        if use_cache and not event.get('export_to_s3', True):
+            store_cached_sections(analytics_data, fingerprints, False)
+            analytics_data.update({section_name: entry['data'] for section_name, entry in cached_sections.items()})
         
         if event.get('export_to_s3', True):
             bucket_name = os.environ.get('S3_BUCKET_NAME', 'ecommerce-analytics-bucket')
             key_prefix = os.environ.get('S3_KEY_PREFIX', 'analytics')
+            export_format = event.get('export_format', EXPORT_FORMAT)
+            
+            pending_export = dict(analytics_data)
+            pending_export.update({
+                section_name: entry['data']
+                for section_name, entry in cached_sections.items()
+                if not entry['exported']
+            })
+            export_success = export_to_s3(pending_export, bucket_name, key_prefix, export_format)
+            if use_cache:
+                store_cached_sections(pending_export, fingerprints, export_success)
+            analytics_data.update({section_name: entry['data'] for section_name, entry in cached_sections.items()})
             
-            export_success = export_to_s3(analytics_data, bucket_name, key_prefix)
+            exported_tables = {}
+            for table_name in event.get('export_tables', []):
+                if table_name not in TABLE_FINGERPRINT_COLUMNS:
+                    section_errors[f"export_{table_name}"] = f"Unknown table {table_name}"
+                    continue
+                try:
+                    exported_tables[table_name] = export_table_to_s3(
+                        table_name, bucket_name, key_prefix, 'ndjson' if export_format == 'json' else export_format
+                    )
+                except Exception as e:
+                    print(f"Error exporting {table_name} rows: {str(e)}")
+                    section_errors[f"export_{table_name}"] = str(e)
             
             if export_success:
                 return {
@@ -237,6 +1358,12 @@ def lambda_handler(event, context):
                     'body': json.dumps({
                         'message': 'Analytics processing and export completed successfully',
                         'data_processed': list(analytics_data.keys()),
+                        'section_errors': section_errors,
+                        'cached_sections': list(cached_sections.keys()),
+                        'changed_tables': sorted(changes) if changes is not None else None,
+                        'exported_tables': exported_tables,
+                        'connection_metrics': connection_pool.get_metrics(),
+                        'stage_metrics': stage_metrics.summary(),
                         'timestamp': datetime.now().isoformat()
                     })
                 }
@@ -246,6 +1373,12 @@ def lambda_handler(event, context):
                     'body': json.dumps({
                         'error': 'Analytics processing completed but S3 export failed',
                         'data_processed': list(analytics_data.keys()),
+                        'section_errors': section_errors,
+                        'cached_sections': list(cached_sections.keys()),
+                        'changed_tables': sorted(changes) if changes is not None else None,
+                        'exported_tables': exported_tables,
+                        'connection_metrics': connection_pool.get_metrics(),
+                        'stage_metrics': stage_metrics.summary(),
                         'timestamp': datetime.now().isoformat()
                     })
                 }
@@ -255,6 +1388,11 @@ def lambda_handler(event, context):
                 'body': json.dumps({
                     'message': 'Analytics processing completed successfully',
                     'data': analytics_data,
+                    'section_errors': section_errors,
+                    'cached_sections': list(cached_sections.keys()),
+                    'changed_tables': sorted(changes) if changes is not None else None,
+                    'connection_metrics': connection_pool.get_metrics(),
+                    'stage_metrics': stage_metrics.summary(),
                     'timestamp': datetime.now().isoformat()
                 })
             }
@@ -0,0 +1,83 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from lambda_local import ROOT_DIR, LocalS3
+
+sys.path.insert(0, os.path.join(ROOT_DIR, 'analytics-api'))
+import analytics_api
+
+REFRESHES = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+REQUESTS = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+BUCKET_NAME = 'analytics-bucket'
+KEY_PREFIX = 'analytics'
+
+SECTION_EXPORTS = {
+    'customers': {'customer_segments': [
+        {'segment': segment, 'total_customers': 100 * rank, 'total_orders': 400 * rank, 'total_revenue': 25000.0 * rank,
+         'avg_order_value': 62.5, 'max_order_value': 480.0, 'min_order_value': 9.99}
+        for rank, segment in enumerate(['Bronze', 'Silver', 'Gold', 'Platinum'], 1)
+    ]},
+    'products': {'top_products': [
+        {'product_name': f"Product {index}", 'category': 'Electronics', 'brand': 'Brand', 'times_ordered': 50 - index,
+         'total_quantity_sold': 80 - index, 'total_revenue': 4000.0 - index, 'avg_selling_price': 49.99,
+         'avg_rating': 4.2, 'total_reviews': 12}
+        for index in range(20)
+    ]},
+    'sales': {'monthly_sales': [
+        {'month': f"2026-{month:02d}", 'total_orders': 300, 'total_revenue': 18000.0, 'avg_order_value': 60.0,
+         'unique_customers': 210}
+        for month in range(1, 13)
+    ]},
+    'payments': {'payment_methods': [
+        {'payment_method': method, 'transaction_count': 500, 'total_amount': 30000.0, 'avg_transaction_amount': 60.0,
+         'successful_transactions': 480, 'failed_transactions': 20, 'success_rate': 96.0}
+        for method in ['Credit Card', 'PayPal', 'Bank Transfer', 'Debit Card']
+    ]}
+}
+
+def write_exports(s3, version):
+    # Same content under a newer timestamp, as an unchanged scheduled export.
+    for section_name, data in SECTION_EXPORTS.items():
+        s3.put_object(Bucket=BUCKET_NAME, Key=f"{KEY_PREFIX}/{section_name}/20260101_{version:06d}.json", Body=json.dumps(data))
+
+async def run():
+    s3 = LocalS3(tempfile.mkdtemp(prefix="analytics-api-benchmark-"))
+    store = analytics_api.AggregateStore(s3, BUCKET_NAME, KEY_PREFIX)
+
+    # Re-reading identical exports must produce identical payloads; a payload
+    # that grows means derived entries are being folded back into themselves.
+    sizes = []
+    for version in range(REFRESHES):
+        write_exports(s3, version)
+        started = time.perf_counter()
+        changed = await store.refresh()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        sizes.append((len(store.entries['all']['body']), len(store.entries['summary']['body'])))
+        print(f"refresh {version + 1}: {len(changed)} sections changed in {elapsed_ms:7.1f}ms, "
+              f"'all' {sizes[-1][0]} bytes, 'summary' {sizes[-1][1]} bytes")
+
+    app = analytics_api.create_app(store, refresh_interval=3600)
+    async with TestClient(TestServer(app)) as client:
+        etag = (await client.get('/api/sections')).headers['ETag']
+        for label, headers in [('full body', {}), ('gzip body', {'Accept-Encoding': 'gzip'}), ('304', {'If-None-Match': etag})]:
+            started = time.perf_counter()
+            for _ in range(REQUESTS):
+                response = await client.get('/api/sections', headers=headers)
+                await response.read()
+            elapsed = time.perf_counter() - started
+            print(f"GET /api/sections {label:<10} {REQUESTS / elapsed:9.0f} requests/s  ({response.status})")
+
+    if len(set(sizes)) != 1:
+        print(f"Payload size changed across refreshes of identical exports: {sizes}")
+        return 1
+    print("Payload size stable across refreshes")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(run()))
@@ -0,0 +1,114 @@
+import sqlite3
+import threading
+import time
+import uuid
+from collections import Counter
+
+from botocore.exceptions import ClientError
+
+TERMINAL_STATES = {'SUCCEEDED', 'FAILED', 'CANCELLED'}
+
+def get_athena_type(value):
+    if isinstance(value, int):
+        return 'bigint'
+    if isinstance(value, float):
+        return 'double'
+    return 'varchar'
+
+class LocalAthena:
+    # Stand-in for the Athena API that runs queries on sqlite. Executions
+    # stay QUEUED/RUNNING for `latency` seconds, at most `max_running` may be
+    # in flight (more are throttled), and results page through NextToken.
+    # `databases` maps an Athena database name to a sqlite file attached
+    # under that name, so schema-qualified table names resolve.
+    def __init__(self, databases, latency=0.5, max_running=5):
+        self.connection = sqlite3.connect(":memory:", check_same_thread=False)
+        for database_name, path in databases.items():
+            self.connection.execute(f"ATTACH DATABASE '{path}' AS {database_name}")
+        self.latency = latency
+        self.max_running = max_running
+        self.lock = threading.Lock()
+        self.executions = {}
+        self.calls = Counter()
+
+    def throttle(self, operation_name):
+        raise ClientError({'Error': {'Code': 'TooManyRequestsException', 'Message': 'Rate exceeded'}}, operation_name)
+
+    def start_query_execution(self, QueryString, QueryExecutionContext=None, WorkGroup=None, ResultConfiguration=None):
+        self.calls['start_query_execution'] += 1
+        with self.lock:
+            running = sum(1 for execution in self.executions.values() if execution['state'] not in TERMINAL_STATES)
+            if running >= self.max_running:
+                self.calls['throttled'] += 1
+                self.throttle('StartQueryExecution')
+            execution_id = str(uuid.uuid4())
+            self.executions[execution_id] = {'sql': QueryString, 'started': time.monotonic(), 'state': 'QUEUED'}
+        return {'QueryExecutionId': execution_id}
+
+    def run(self, execution):
+        try:
+            cursor = self.connection.execute(execution['sql'])
+            rows = cursor.fetchall()
+            columns = [description[0] for description in cursor.description]
+            execution['columns'] = [
+                (column, get_athena_type(next((row[index] for row in rows if row[index] is not None), None)))
+                for index, column in enumerate(columns)
+            ]
+            execution['rows'] = rows
+            execution['state'] = 'SUCCEEDED'
+        except sqlite3.Error as e:
+            execution['state'] = 'FAILED'
+            execution['reason'] = str(e)
+
+    def get_query_execution(self, QueryExecutionId):
+        self.calls['get_query_execution'] += 1
+        with self.lock:
+            execution = self.executions[QueryExecutionId]
+            if execution['state'] not in TERMINAL_STATES:
+                if time.monotonic() - execution['started'] >= self.latency:
+                    self.run(execution)
+                else:
+                    execution['state'] = 'RUNNING'
+        status = {'State': execution['state']}
+        if 'reason' in execution:
+            status['StateChangeReason'] = execution['reason']
+        return {'QueryExecution': {'QueryExecutionId': QueryExecutionId, 'Status': status, 'Statistics': {}}}
+
+    def get_query_results(self, QueryExecutionId, MaxResults=1000, NextToken=None):
+        self.calls['get_query_results'] += 1
+        execution = self.executions[QueryExecutionId]
+        header = {'Data': [{'VarCharValue': column} for column, _ in execution['columns']]}
+        rows = [
+            {'Data': [{'VarCharValue': str(value)} if value is not None else {} for value in row]}
+            for row in execution['rows']
+        ]
+        rows = [header] + rows
+        start = int(NextToken or 0)
+        page = {
+            'ResultSet': {
+                'Rows': rows[start:start + MaxResults],
+                'ResultSetMetadata': {'ColumnInfo': [{'Name': column, 'Type': column_type} for column, column_type in execution['columns']]}
+            }
+        }
+        if start + MaxResults < len(rows):
+            page['NextToken'] = str(start + MaxResults)
+        return page
+
+class EntityNotFoundException(Exception):
+    pass
+
+class LocalGlueExceptions:
+    EntityNotFoundException = EntityNotFoundException
+
+class LocalGlue:
+    # Catalog stand-in: maps "database.table" to the S3 location of its data.
+    exceptions = LocalGlueExceptions
+
+    def __init__(self, locations):
+        self.locations = locations
+
+    def get_table(self, DatabaseName, Name):
+        location = self.locations.get(f"{DatabaseName}.{Name}")
+        if location is None:
+            raise EntityNotFoundException(f"Table {DatabaseName}.{Name} not found")
+        return {'Table': {'Name': Name, 'DatabaseName': DatabaseName, 'StorageDescriptor': {'Location': location}}}
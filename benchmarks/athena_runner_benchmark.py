@@ -0,0 +1,121 @@
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+from athena_local import LocalAthena, LocalGlue
+from lambda_local import ROOT_DIR, LocalS3, create_sqlite_database, load_data_processor
+
+sys.path.insert(0, os.path.join(ROOT_DIR, 'aws-lambda'))
+import athena_runner
+
+SCALE = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+LATENCY_SECONDS = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+REPORTS_PATH = os.path.join(ROOT_DIR, 'aws-athena', 'athena_queries.sql')
+BUCKET_NAME = 'analytics-bucket'
+
+# Portable builds of the tables athena_queries.sql reads, from the sample
+# OLTP data, in place of the Lambda exports and Glue output.
+REPORT_TABLES = {
+    'customer_segments': """
+        SELECT customer_segment, COUNT(*) as customer_count, SUM(total_spent) as total_revenue,
+               AVG(total_spent) as avg_spent, MAX(total_spent) as max_spent, MIN(total_spent) as min_spent
+        FROM main.customers GROUP BY customer_segment""",
+    'product_performance': """
+        SELECT p.product_name, p.category, p.brand, COUNT(oi.order_item_id) as times_ordered,
+               COALESCE(SUM(oi.quantity), 0) as total_quantity_sold, COALESCE(SUM(oi.total_price), 0) as total_revenue,
+               AVG(oi.unit_price) as avg_selling_price,
+               (SELECT AVG(rating) FROM main.reviews r WHERE r.product_id = p.product_id) as avg_rating,
+               (SELECT COUNT(*) FROM main.reviews r WHERE r.product_id = p.product_id) as total_reviews
+        FROM main.products p LEFT JOIN main.order_items oi ON p.product_id = oi.product_id
+        GROUP BY p.product_id""",
+    'monthly_sales': """
+        SELECT strftime('%Y-%m', order_date) as month, COUNT(*) as total_orders, SUM(total_amount) as total_revenue,
+               AVG(total_amount) as avg_order_value, COUNT(DISTINCT customer_id) as unique_customers
+        FROM main.orders GROUP BY month""",
+    'payment_methods': """
+        SELECT payment_method, COUNT(*) as transaction_count, SUM(amount) as total_amount,
+               AVG(amount) as avg_transaction_amount,
+               SUM(payment_status = 'Completed') as successful_transactions,
+               SUM(payment_status = 'Failed') as failed_transactions,
+               ROUND(SUM(payment_status = 'Completed') * 100.0 / COUNT(*), 2) as success_rate
+        FROM main.payments GROUP BY payment_method""",
+    'sales_analytics': """
+        SELECT order_id, customer_id, order_date, CAST(strftime('%Y', order_date) AS INTEGER) as order_year,
+               CAST(strftime('%m', order_date) AS INTEGER) as order_month, status, total_amount
+        FROM main.orders"""
+}
+
+def build_report_database(directory):
+    oltp_path = os.path.join(directory, 'oltp.db')
+    create_sqlite_database(SCALE, oltp_path).close()
+    analytics_path = os.path.join(directory, 'analytics.db')
+    connection = sqlite3.connect(analytics_path)
+    connection.execute(f"ATTACH DATABASE '{oltp_path}' AS main_oltp")
+    for table_name, query in REPORT_TABLES.items():
+        connection.execute(f"CREATE TABLE {table_name} AS {query.replace('main.', 'main_oltp.')}")
+    connection.commit()
+    connection.close()
+    return analytics_path
+
+def touch_table(s3, table_name, version):
+    s3.put_object(Bucket=BUCKET_NAME, Key=f"analytics/{table_name}/part-{version}.json", Body=f"{version}")
+
+def timed(label, function):
+    started = time.perf_counter()
+    result = function()
+    print(f"{label:<44} {time.perf_counter() - started:8.2f}s")
+    return result
+
+def main():
+    data_processor = load_data_processor()
+    work_dir = tempfile.mkdtemp(prefix="athena-benchmark-")
+    analytics_path = timed(f"build report tables (scale {SCALE})", lambda: build_report_database(work_dir))
+
+    s3 = LocalS3(os.path.join(work_dir, 's3'))
+    for table_name in REPORT_TABLES:
+        touch_table(s3, table_name, 0)
+    glue = LocalGlue({
+        f"ecommerce_analytics.{table_name}": f"s3://{BUCKET_NAME}/analytics/{table_name}/"
+        for table_name in REPORT_TABLES
+    })
+    reports = athena_runner.load_reports(REPORTS_PATH)
+
+    def run(max_concurrency, result_cache=None):
+        athena = LocalAthena({'ecommerce_analytics': analytics_path}, latency=LATENCY_SECONDS)
+        runner = athena_runner.AthenaQueryRunner(
+            athena, glue, s3, 'ecommerce_analytics', result_cache=result_cache,
+            max_concurrency=max_concurrency, poll_interval=0.05, page_size=50
+        )
+        results = asyncio.run(runner.run_reports(reports))
+        failures = {name: str(result) for name, result in results.items() if isinstance(result, Exception)}
+        if failures:
+            raise RuntimeError(f"Reports failed: {failures}")
+        return results, athena.calls
+
+    sequential, calls = timed(f"{len(reports)} reports, one at a time", lambda: run(1))
+    print(f"  API calls: {dict(calls)}")
+    concurrent, calls = timed(f"{len(reports)} reports, 5 concurrent", lambda: run(5))
+    print(f"  API calls: {dict(calls)}")
+
+    result_cache = data_processor.FileResultCache(os.path.join(work_dir, 'cache'), 3600)
+    timed("cold cache", lambda: run(5, result_cache))
+    cached, calls = timed("warm cache, inputs unchanged", lambda: run(5, result_cache))
+    print(f"  queries started: {calls['start_query_execution']}")
+    touch_table(s3, 'monthly_sales', 1)
+    _, calls = timed("warm cache, monthly_sales rewritten", lambda: run(5, result_cache))
+    print(f"  queries started: {calls['start_query_execution']}")
+
+    # Cached rows come back from JSON as lists.
+    mismatches = [
+        name for name, _ in reports
+        if sequential[name]['rows'] != concurrent[name]['rows'] or
+        [list(row) for row in sequential[name]['rows']] != cached[name]['rows']
+    ]
+    print(f"Reports whose rows differ between runs: {mismatches or 'none'}")
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == "__main__":
+    main()
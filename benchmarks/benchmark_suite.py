@@ -0,0 +1,236 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from lambda_local import ROOT_DIR, SCHEMA_PATH, LocalS3, load_data_processor
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+GLUE_TABLES = [
+    ('customers', 'customer_schema'),
+    ('products', 'product_schema'),
+    ('orders', 'order_schema'),
+    ('order_items', 'order_item_schema'),
+    ('reviews', 'review_schema'),
+    ('payments', 'payment_schema')
+]
+
+class BenchmarkResults:
+    def __init__(self):
+        self.results = {}
+
+    def time(self, name, function, repeat=1):
+        durations = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            value = function()
+            durations.append(time.perf_counter() - started)
+        self.results[name] = {
+            'seconds': min(durations),
+            'median_seconds': statistics.median(durations),
+            'repeat': repeat
+        }
+        print(f"{name:<48} {min(durations):10.3f}s")
+        return value
+
+    def record(self, name, **metrics):
+        self.results.setdefault(name, {}).update(metrics)
+
+    def error(self, name, exception):
+        print(f"{name:<48} failed: {exception}")
+        self.results[name] = {'error': str(exception)}
+
+def get_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def load_mysql_dump(data_processor, data_dir, manifest):
+    # Loads into the database the Lambda is configured for (RDS_ENDPOINT,
+    # DB_USERNAME, DB_PASSWORD, DB_NAME); the schema drops existing tables.
+    connection = data_processor.get_db_connection()
+    if not connection:
+        raise ConnectionError("Could not connect to the benchmark database")
+    try:
+        with connection.cursor() as cursor:
+            with open(SCHEMA_PATH) as schema:
+                for statement in schema.read().split(';'):
+                    if statement.strip():
+                        cursor.execute(statement)
+            for table_name in manifest['load_order']:
+                with open(os.path.join(data_dir, 'sql', f"{table_name}.sql")) as dump:
+                    for statement in dump:
+                        cursor.execute(statement.rstrip().rstrip(';'))
+    finally:
+        connection.close()
+
+def run_lambda_suite(results, data_dir, manifest, repeat, load):
+    data_processor = load_data_processor()
+    if load:
+        results.time('lambda.load_dump', lambda: load_mysql_dump(data_processor, data_dir, manifest))
+
+    section_names = [section_name for section_name, _, _ in data_processor.ANALYTICS_SECTIONS]
+    results.time('lambda.refresh_rollups.rebuild', lambda: data_processor.refresh_rollups(section_names, rebuild=True))
+    results.time('lambda.refresh_rollups.incremental', lambda: data_processor.refresh_rollups(section_names), repeat)
+
+    analytics_data = {}
+    connection = data_processor.connection_pool.acquire()
+    try:
+        for section_name, _, processor in data_processor.ANALYTICS_SECTIONS:
+            name = f"lambda.{processor.__name__}"
+            try:
+                analytics_data[section_name] = results.time(name, lambda: processor(connection), repeat)
+            except Exception as e:
+                results.error(name, e)
+    finally:
+        data_processor.connection_pool.release(connection)
+    return analytics_data
+
+def run_glue_suite(results, data_dir, repeat):
+    from pyspark import StorageLevel
+    from glue_local import get_local_spark, load_glue_functions
+
+    spark = get_local_spark("benchmark-suite")
+    glue = load_glue_functions(spark, BROADCAST_SIZE_LIMIT_BYTES=10 * 1024 * 1024)
+    cache = glue["cache"] = glue["DataFrameCache"](StorageLevel.MEMORY_AND_DISK)
+    output_dir = tempfile.mkdtemp(prefix="glue-benchmark-")
+
+    tables = {}
+    for table_name, schema_name in GLUE_TABLES:
+        df = glue["apply_schema"](spark.read.parquet(os.path.join(data_dir, 'parquet', table_name)), glue[schema_name], table_name)
+        tables[table_name] = results.time(f"glue.load.{table_name}", lambda: cache.persist(table_name, df))
+
+    # Each transform is persisted so its own cost is measured once and the
+    # analytics writes below only pay for the write.
+    def persist_transform(name, build):
+        cache.release(name)
+        return cache.persist(name, build())
+
+    customers = results.time("glue.transform_customer_data", lambda: persist_transform(
+        "customers_transformed", lambda: glue["transform_customer_data"](tables["customers"])
+    ), repeat)
+    orders = results.time("glue.transform_order_data", lambda: persist_transform(
+        "orders_transformed", lambda: glue["transform_order_data"](tables["orders"], tables["order_items"])
+    ), repeat)
+    products = results.time("glue.transform_product_data", lambda: persist_transform(
+        "products_transformed",
+        lambda: glue["transform_product_data"](tables["products"], tables["order_items"], tables["reviews"])
+    ), repeat)
+
+    customer_analytics, product_analytics, sales_analytics = glue["create_analytics_tables"](customers, orders, products)
+    cluster_keys = glue["ANALYTICS_CLUSTER_KEYS"]
+    results.time("glue.write.customers", lambda: glue["cluster"](customer_analytics, cluster_keys["customers"])
+                 .write.mode("overwrite").parquet(f"{output_dir}/customers/"))
+    results.time("glue.write.products", lambda: glue["cluster"](product_analytics, cluster_keys["products"])
+                 .write.mode("overwrite").parquet(f"{output_dir}/products/"))
+    results.time("glue.write.sales", lambda: glue["write_partitioned_parquet"](
+        sales_analytics, f"{output_dir}/sales/", ["order_year", "order_month"], sort_keys=cluster_keys["sales"]
+    ))
+    cache.release_all()
+
+def parquet_batches(path, batch_size):
+    import pyarrow.dataset as ds
+    for batch in ds.dataset(path, format='parquet').to_batches(batch_size=batch_size):
+        yield batch.schema.names, list(zip(*(column.to_pylist() for column in batch.columns)))
+
+def run_export_suite(results, data_dir, repeat, s3_endpoint, analytics_data):
+    data_processor = load_data_processor()
+    if s3_endpoint:
+        import boto3
+        data_processor.clients['s3'] = boto3.client('s3', endpoint_url=s3_endpoint)
+    else:
+        data_processor.clients['s3'] = LocalS3(tempfile.mkdtemp(prefix="s3-benchmark-"))
+    s3_client = data_processor.clients['s3']
+    bucket_name = 'benchmark-bucket'
+    orders_path = os.path.join(data_dir, 'parquet', 'orders')
+
+    # Decoding Parquet into row tuples is timed on its own so it can be
+    # subtracted from the export timings below.
+    results.time("export.read_batches", lambda: sum(
+        len(rows) for _, rows in parquet_batches(orders_path, data_processor.STREAM_BATCH_SIZE)
+    ), repeat)
+    for export_format in data_processor.EXPORT_FORMATS:
+        name = f"export.orders.{export_format}"
+        bytes_before = getattr(s3_client, 'bytes_written', 0)
+        try:
+            row_count = results.time(name, lambda: data_processor.export_stream_to_s3(
+                parquet_batches(orders_path, data_processor.STREAM_BATCH_SIZE),
+                bucket_name, f"benchmark/orders/orders.{data_processor.EXPORT_FORMATS[export_format][0]}", export_format
+            ), repeat)
+            bytes_written = (getattr(s3_client, 'bytes_written', 0) - bytes_before) // repeat
+            results.record(name, rows=row_count, bytes=bytes_written or None)
+        except Exception as e:
+            results.error(name, e)
+
+    if analytics_data:
+        results.time("export.analytics.json", lambda: data_processor.export_to_s3(analytics_data, bucket_name, 'benchmark'))
+
+def compare_with_baseline(results, baseline_path, threshold):
+    with open(baseline_path) as baseline_file:
+        baseline = json.load(baseline_file)
+
+    regressions = []
+    print(f"\nCompared with {baseline['commit']} ({baseline_path}):")
+    for name, metrics in sorted(results.items()):
+        previous = baseline['results'].get(name, {})
+        if 'seconds' not in metrics or 'seconds' not in previous or previous['seconds'] == 0:
+            continue
+        ratio = metrics['seconds'] / previous['seconds']
+        flag = ' REGRESSION' if ratio > threshold else ''
+        print(f"{name:<48} {previous['seconds']:10.3f}s -> {metrics['seconds']:10.3f}s ({ratio:5.2f}x){flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the Lambda sections, Glue transforms and S3 export path")
+    parser.add_argument('--data', required=True, help="directory written by data_generator.py")
+    parser.add_argument('--suites', default='lambda,glue,export', help="comma separated: lambda, glue, export")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--load-mysql', action='store_true', help="load the SQL dump into the configured database first")
+    parser.add_argument('--s3-endpoint', default=None, help="S3-compatible endpoint to export to instead of local files")
+    parser.add_argument('--baseline', default=None, help="results JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=1.2, help="slowdown ratio reported as a regression")
+    args = parser.parse_args()
+
+    with open(os.path.join(args.data, 'manifest.json')) as manifest_file:
+        manifest = json.load(manifest_file)
+    suites = args.suites.split(',')
+    results = BenchmarkResults()
+
+    analytics_data = {}
+    if 'lambda' in suites:
+        analytics_data = run_lambda_suite(results, args.data, manifest, args.repeat, args.load_mysql)
+    if 'glue' in suites:
+        run_glue_suite(results, args.data, args.repeat)
+    if 'export' in suites:
+        run_export_suite(results, args.data, args.repeat, args.s3_endpoint, analytics_data)
+
+    commit = get_commit()
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    results_path = os.path.join(RESULTS_DIR, f"{commit}-{manifest['orders']}.json")
+    with open(results_path, 'w') as results_file:
+        json.dump({
+            'commit': commit,
+            'created_at': datetime.now().isoformat(),
+            'python': sys.version.split()[0],
+            'dataset': {key: manifest[key] for key in ('orders', 'seed', 'row_counts')},
+            'suites': suites,
+            'results': results.results
+        }, results_file, indent=2, sort_keys=True)
+    print(f"\nResults written to {results_path}")
+
+    if args.baseline:
+        regressions = compare_with_baseline(results.results, args.baseline, args.threshold)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+import sys
+import tempfile
+
+from glue_local import load_glue_functions
+from lambda_local import LocalS3
+
+BUCKET = "lake"
+
+# A raw table as Spark leaves it: a _SUCCESS marker at the root, checksum and
+# temporary files beside the data, and one ingest_date partition per run.
+RAW_OBJECTS = {
+    "raw/orders/_SUCCESS": 0,
+    "raw/orders/_temporary/0/part-00000.parquet": 100,
+    "raw/orders/ingest_date=2024-01-01/part-00000.parquet": 100,
+    "raw/orders/ingest_date=2024-01-01/.part-00000.parquet.crc": 12,
+    "raw/orders/ingest_date=2024-01-02/part-00000.parquet": 100,
+    "raw/orders/ingest_date=2024-01-03/part-00000.parquet": 100,
+    "raw/orders/ingest_date=2024-01-03/part-00001.parquet": 100,
+    "raw/orders/ingest_date=2024-01-04/part-00000.parquet": 100,
+    "analytics/customers/_SUCCESS": 0,
+    "analytics/customers/part-00000.parquet": 100,
+    "analytics/customers/part-00001.parquet": 100
+}
+
+class RecordingGlue:
+    class exceptions:
+        class EntityNotFoundException(Exception):
+            pass
+
+    def __init__(self):
+        self.deleted = []
+
+    def batch_delete_partition(self, DatabaseName, TableName, PartitionsToDelete):
+        self.deleted.extend(partition['Values'] for partition in PartitionsToDelete)
+
+def main():
+    s3 = LocalS3(tempfile.mkdtemp(prefix="compaction-check-"))
+    for key, size in RAW_OBJECTS.items():
+        with open(s3.path_for(BUCKET, key), 'wb') as target:
+            target.write(b"x" * size)
+
+    glue = RecordingGlue()
+    functions = load_glue_functions(
+        None, s3_client=s3, glue_client=glue, CATALOG_DATABASE="ecommerce_analytics",
+        TARGET_FILE_SIZE_MB=128, COMPACT_MIN_FILES=4
+    )
+    failures = []
+
+    raw = functions["list_table_files"](f"s3://{BUCKET}/raw/orders/")
+    expected = ["ingest_date=2024-01-01", "ingest_date=2024-01-02", "ingest_date=2024-01-03", "ingest_date=2024-01-04"]
+    if sorted(raw) != expected:
+        failures.append(f"raw partitions {sorted(raw)}, expected {expected}")
+    stray = [key for objects in raw.values() for key, _ in objects if "/_" in key or "/." in key]
+    if stray:
+        failures.append(f"non-data files listed: {stray}")
+
+    expired, fragmented = functions["plan_compaction"](raw, keep_snapshots=2)
+    if expired != expected[:2] or fragmented:
+        failures.append(f"planned expired={expired} fragmented={fragmented}, expected expired={expected[:2]}")
+
+    functions["unregister_partitions"]("raw_orders", expired[:-1])
+    functions["unregister_partitions"]("raw_orders", [""])
+    if glue.deleted != [["2024-01-01"]]:
+        failures.append(f"catalog partitions removed {glue.deleted}")
+
+    customers = functions["list_table_files"](f"s3://{BUCKET}/analytics/customers/", partitioned=False)
+    if list(customers) != [""] or len(customers[""]) != 2:
+        failures.append(f"unpartitioned table listed {dict(customers)}")
+
+    print(f"raw partitions: {sorted(raw)}")
+    print(f"expired: {expired}, removed from catalog: {glue.deleted}")
+    if failures:
+        print("Failed: " + "; ".join(failures))
+        return 1
+    print("Compaction plan ignores markers and root-level files")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
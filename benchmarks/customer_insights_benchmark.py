@@ -0,0 +1,113 @@
+import os
+import sqlite3
+import sys
+import time
+from datetime import date
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'aws-lambda'))
+import customer_insights
+
+ORDER_COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+CUSTOMER_COUNT = max(ORDER_COUNT // 20, 1)
+BATCH_SIZE = 5000
+AS_OF = date(2025, 1, 1)
+
+# Portable versions of the customer_cohorts and customer_rfm aggregations in
+# advanced_queries.sql: the work the section moves off the database.
+COHORT_QUERY = """
+WITH activity AS (
+    SELECT DISTINCT customer_id,
+           CAST(strftime('%Y', order_date) AS INTEGER) * 12 + CAST(strftime('%m', order_date) AS INTEGER) - 1 as month_number
+    FROM orders
+),
+cohorts AS (
+    SELECT customer_id, MIN(month_number) as cohort FROM activity GROUP BY customer_id
+)
+SELECT c.cohort, a.month_number - c.cohort as period_number, COUNT(*) as customers_retained
+FROM activity a JOIN cohorts c ON a.customer_id = c.customer_id
+GROUP BY c.cohort, period_number
+ORDER BY c.cohort, period_number
+"""
+
+RFM_QUERY = """
+SELECT customer_id, julianday('2025-01-01') - julianday(MAX(order_date)) as recency_days,
+       COUNT(order_id) as frequency, SUM(total_amount) as monetary_value
+FROM orders
+GROUP BY customer_id
+"""
+
+def create_database(order_count, customer_count):
+    # Skewed customers and a yearly sine wave in order volume, so quintiles
+    # and seasonal indices have something to find.
+    rng = np.random.default_rng(42)
+    customer_ids = (rng.zipf(1.3, order_count) % customer_count) + 1
+    day_offsets = rng.integers(0, 730, order_count)
+    keep = rng.random(order_count) < 0.6 + 0.4 * np.sin(day_offsets / 365.0 * 2 * np.pi)
+    day_offsets = np.where(keep, day_offsets, rng.integers(0, 730, order_count))
+    order_dates = np.datetime64('2023-01-01') + day_offsets.astype('timedelta64[D]')
+    amounts = np.round(rng.gamma(2.0, 60.0, order_count), 2)
+
+    connection = sqlite3.connect(":memory:")
+    connection.execute("CREATE TABLE customers (customer_id INTEGER PRIMARY KEY, customer_segment TEXT)")
+    connection.execute(
+        "CREATE TABLE orders (order_id INTEGER PRIMARY KEY, customer_id INTEGER, order_date TEXT, total_amount REAL)"
+    )
+    connection.executemany(
+        "INSERT INTO customers VALUES (?, ?)",
+        ((customer_id, ('Premium', 'Regular', 'New')[customer_id % 3]) for customer_id in range(1, customer_count + 1))
+    )
+    connection.executemany(
+        "INSERT INTO orders VALUES (?, ?, ?, ?)",
+        zip(range(1, order_count + 1), customer_ids.tolist(), (f"{day} 12:00:00" for day in order_dates.astype(str)), amounts.tolist())
+    )
+    connection.commit()
+    return connection
+
+def stream(connection, query):
+    # Same (columns, rows) batches that stream_query yields from MySQL.
+    cursor = connection.execute(query)
+    columns = [description[0] for description in cursor.description]
+    while True:
+        rows = cursor.fetchmany(BATCH_SIZE)
+        if not rows:
+            break
+        yield columns, rows
+
+def timed(label, function):
+    started = time.perf_counter()
+    result = function()
+    print(f"{label:<32} {time.perf_counter() - started:8.2f}s")
+    return result
+
+def main():
+    connection = timed(f"generate {ORDER_COUNT} orders", lambda: create_database(ORDER_COUNT, CUSTOMER_COUNT))
+
+    database_cohorts = timed("database cohort query", lambda: connection.execute(COHORT_QUERY).fetchall())
+    timed("database RFM aggregation", lambda: connection.execute(RFM_QUERY).fetchall())
+
+    orders = timed("extract orders", lambda: customer_insights.load_frame(
+        stream(connection, customer_insights.ORDER_EXTRACT_QUERY), ['customer_id', 'order_date', 'total_amount']
+    ))
+    customers = timed("extract customers", lambda: customer_insights.load_frame(
+        stream(connection, customer_insights.CUSTOMER_EXTRACT_QUERY), ['customer_id', 'customer_segment']
+    ))
+    prepared = timed("prepare columns", lambda: customer_insights.prepare_orders(orders))
+    segments = timed("vectorized RFM quintiles", lambda: customer_insights.compute_rfm_segments(prepared, customers, AS_OF))
+    cohorts = timed("vectorized cohort retention", lambda: customer_insights.compute_cohort_retention(prepared))
+    seasonal = timed("vectorized seasonal indices", lambda: customer_insights.compute_seasonal_indices(prepared))
+
+    expected = {
+        (f"{cohort // 12:04d}-{cohort % 12 + 1:02d}", period_number): customers_retained
+        for cohort, period_number, customers_retained in database_cohorts
+    }
+    actual = {(row['cohort_month'], row['period_number']): row['customers_retained'] for row in cohorts}
+    mismatches = len(set(expected.items()) ^ set(actual.items()))
+
+    print(f"RFM segments: {len(segments)}, cohort cells: {len(cohorts)}, seasonal months: {len(seasonal)}")
+    print(f"Cohort cells that differ from the database query: {mismatches}")
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == "__main__":
+    main()
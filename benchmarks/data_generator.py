@@ -0,0 +1,454 @@
+import argparse
+import json
+import os
+import re
+import sys
+from datetime import date
+
+import numpy as np
+
+from lambda_local import SCHEMA_PATH, create_sqlite_database
+
+# Row ratios per order. The sample has one customer and one product per order,
+# which would make every customer a one-off buyer at scale, so customers and
+# products are sized for repeat purchases instead.
+ORDERS_PER_CUSTOMER = 4
+ORDERS_PER_PRODUCT = 500
+REVIEWS_PER_ITEM = 0.5
+TAX_RATE = 0.08
+
+CHUNK_ORDERS = 1000000
+SQL_ROWS_PER_INSERT = 1000
+
+# Orders span the two years up to today, so recency windows such as "active
+# in the last 90 days" and date-partitioned reads see current data.
+END_DATE = np.datetime64(date.today(), 's')
+START_DATE = END_DATE - np.timedelta64(730, 'D')
+FIRST_REGISTRATION = START_DATE - np.timedelta64(184, 'D')
+DAY = 86400
+RANDOM_STREAMS = ['customers', 'products', 'orders', 'customer_names', 'product_details']
+
+def random_offsets(rng, spans):
+    return (rng.random(len(spans)) * spans).astype(np.int64).astype('timedelta64[s]')
+
+# Columns in load order, with the representation each writer converts from:
+# decimals are integer cents, timestamps datetime64 (NaT for NULL) and
+# nullable strings object arrays holding None.
+TABLE_COLUMNS = {
+    'customers': [
+        ('customer_id', 'int'), ('first_name', 'string'), ('last_name', 'string'), ('email', 'string'),
+        ('phone', 'string'), ('address', 'string'), ('city', 'string'), ('state', 'string'),
+        ('zip_code', 'string'), ('country', 'string'), ('registration_date', 'date'),
+        ('customer_segment', 'string'), ('total_spent', 'decimal'), ('last_purchase_date', 'date')
+    ],
+    'products': [
+        ('product_id', 'int'), ('product_name', 'string'), ('category', 'string'), ('subcategory', 'string'),
+        ('brand', 'string'), ('price', 'decimal'), ('cost', 'decimal'), ('stock_quantity', 'int'),
+        ('description', 'string'), ('created_date', 'date'), ('is_active', 'bool'),
+        ('weight_kg', 'decimal'), ('dimensions', 'string')
+    ],
+    'orders': [
+        ('order_id', 'int'), ('customer_id', 'int'), ('order_date', 'datetime'), ('status', 'string'),
+        ('total_amount', 'decimal'), ('shipping_address', 'string'), ('shipping_city', 'string'),
+        ('shipping_state', 'string'), ('shipping_zip', 'string'), ('shipping_cost', 'decimal'),
+        ('tax_amount', 'decimal'), ('discount_amount', 'decimal'), ('promo_code', 'string'), ('notes', 'string'),
+        ('updated_at', 'datetime')
+    ],
+    'order_items': [
+        ('order_item_id', 'int'), ('order_id', 'int'), ('product_id', 'int'), ('quantity', 'int'),
+        ('unit_price', 'decimal'), ('total_price', 'decimal')
+    ],
+    'reviews': [
+        ('review_id', 'int'), ('customer_id', 'int'), ('product_id', 'int'), ('order_id', 'int'),
+        ('rating', 'int'), ('review_title', 'string'), ('review_text', 'string'), ('review_date', 'datetime'),
+        ('is_verified_purchase', 'bool'), ('helpful_votes', 'int')
+    ],
+    'payments': [
+        ('payment_id', 'int'), ('order_id', 'int'), ('payment_method', 'string'), ('payment_status', 'string'),
+        ('amount', 'decimal'), ('payment_date', 'datetime'), ('transaction_id', 'string'),
+        ('refund_amount', 'decimal'), ('refund_date', 'datetime'), ('updated_at', 'datetime')
+    ]
+}
+
+def load_enums():
+    with open(SCHEMA_PATH) as schema:
+        return {
+            column: re.findall(r"'([^']*)'", values)
+            for column, values in re.findall(r"(\w+) ENUM\(([^)]*)\)", schema.read())
+        }
+
+def smoothed(observed, domain):
+    # Sample frequencies with one pseudo-count per allowed value, so values
+    # the few sample rows never use (Failed payments, Cancelled orders) still
+    # show up at scale.
+    counts = np.array([observed.get(value, 0) + 1 for value in domain], dtype=np.float64)
+    return np.array(domain, dtype=object), counts / counts.sum()
+
+class SampleProfile:
+    def __init__(self):
+        connection = create_sqlite_database()
+        enums = load_enums()
+
+        def column(query):
+            return [row[0] for row in connection.execute(query)]
+
+        def frequencies(query):
+            return dict(connection.execute(query).fetchall())
+
+        self.first_names = np.array(column("SELECT DISTINCT first_name FROM customers"), dtype=object)
+        self.last_names = np.array(column("SELECT DISTINCT last_name FROM customers"), dtype=object)
+        self.addresses = np.array(column("SELECT address FROM customers"), dtype=object)
+        self.locations = connection.execute("SELECT city, state, zip_code FROM customers").fetchall()
+        self.segments = smoothed(
+            frequencies("SELECT customer_segment, COUNT(*) FROM customers GROUP BY customer_segment"),
+            enums['customer_segment']
+        )
+        self.products = connection.execute(
+            "SELECT product_name, category, subcategory, brand, price, cost, stock_quantity, description, "
+            "weight_kg, dimensions FROM products ORDER BY product_id"
+        ).fetchall()
+        self.statuses = smoothed(frequencies("SELECT status, COUNT(*) FROM orders GROUP BY status"), enums['status'])
+        self.items_per_order = smoothed(
+            frequencies("SELECT item_count, COUNT(*) FROM (SELECT COUNT(*) as item_count FROM order_items GROUP BY order_id) GROUP BY item_count"),
+            [1, 2, 3, 4]
+        )
+        self.quantities = smoothed(frequencies("SELECT quantity, COUNT(*) FROM order_items GROUP BY quantity"), [1, 2, 3])
+        self.shipping_costs = np.array(column("SELECT shipping_cost FROM orders"), dtype=np.float64)
+        self.notes = np.array(column("SELECT notes FROM orders"), dtype=object)
+        self.promotions = connection.execute(
+            "SELECT promo_code, discount_amount FROM orders WHERE promo_code IS NOT NULL"
+        ).fetchall()
+        self.promo_rate = len(self.promotions) / len(self.shipping_costs)
+        self.ratings = smoothed(frequencies("SELECT rating, COUNT(*) FROM reviews GROUP BY rating"), [1, 2, 3, 4, 5])
+        self.review_texts = connection.execute("SELECT review_title, review_text FROM reviews").fetchall()
+        self.helpful_votes_mean = connection.execute("SELECT AVG(helpful_votes) FROM reviews").fetchone()[0]
+        self.payment_methods = smoothed(
+            frequencies("SELECT payment_method, COUNT(*) FROM payments GROUP BY payment_method"), enums['payment_method']
+        )
+        self.payment_statuses = smoothed(
+            frequencies("SELECT payment_status, COUNT(*) FROM payments GROUP BY payment_status"), enums['payment_status']
+        )
+        connection.close()
+
+def choose(rng, distribution, size):
+    values, weights = distribution
+    return values[rng.choice(len(values), size=size, p=weights)]
+
+def skewed_ids(rng, count, size):
+    # Low ids are picked far more often, giving a long tail of occasional
+    # buyers and a head of heavy customers and best-selling products.
+    return (np.floor(count * rng.random(size) ** 2) + 1).astype(np.int64)
+
+def to_cents(values):
+    return np.round(np.asarray(values, dtype=np.float64) * 100).astype(np.int64)
+
+class SyntheticDataset:
+    def __init__(self, order_count, seed=42, profile=None):
+        self.order_count = order_count
+        self.seed = seed
+        self.profile = profile or SampleProfile()
+        self.customer_count = max(order_count // ORDERS_PER_CUSTOMER, len(self.profile.locations))
+        self.product_count = max(order_count // ORDERS_PER_PRODUCT, len(self.profile.products))
+
+        rng = self.rng('customers')
+        self.customer_locations = rng.integers(0, len(self.profile.locations), self.customer_count)
+        self.registration_dates = FIRST_REGISTRATION + random_offsets(
+            rng, np.full(self.customer_count, (END_DATE - 30 * DAY - FIRST_REGISTRATION).astype(np.int64))
+        )
+        self.customer_spent = np.zeros(self.customer_count + 1, dtype=np.int64)
+        self.customer_last_order = np.full(self.customer_count + 1, np.datetime64('NaT'), dtype='datetime64[s]')
+
+        rng = self.rng('products')
+        self.product_templates = np.arange(self.product_count) % len(self.profile.products)
+        template_prices = to_cents([product[4] for product in self.profile.products])
+        self.product_prices = np.maximum(
+            np.round(template_prices[self.product_templates] * rng.uniform(0.8, 1.2, self.product_count)), 99
+        ).astype(np.int64)
+
+    def rng(self, stream, chunk_start=0):
+        # One stream per table and chunk, so any chunk can be regenerated
+        # without replaying the ones before it.
+        return np.random.default_rng([self.seed, RANDOM_STREAMS.index(stream), chunk_start])
+
+    def chunks(self):
+        item_offset = 0
+        review_offset = 0
+        for start in range(0, self.order_count, CHUNK_ORDERS):
+            tables = self.generate_orders(start, min(start + CHUNK_ORDERS, self.order_count), item_offset, review_offset)
+            item_offset += len(tables['order_items']['order_item_id'])
+            review_offset += len(tables['reviews']['review_id'])
+            yield tables
+        yield {'customers': self.generate_customers(), 'products': self.generate_products()}
+
+    def generate_orders(self, start, end, item_offset, review_offset):
+        profile = self.profile
+        rng = self.rng('orders', start)
+        size = end - start
+        order_ids = np.arange(start + 1, end + 1, dtype=np.int64)
+        customer_ids = skewed_ids(rng, self.customer_count, size)
+        registered = self.registration_dates[customer_ids - 1]
+        order_dates = registered + random_offsets(rng, (END_DATE - registered).astype(np.int64))
+
+        item_counts = choose(rng, profile.items_per_order, size).astype(np.int64)
+        item_orders = np.repeat(np.arange(size), item_counts)
+        item_products = skewed_ids(rng, self.product_count, len(item_orders))
+        quantities = choose(rng, profile.quantities, len(item_orders)).astype(np.int64)
+        unit_prices = self.product_prices[item_products - 1]
+        item_totals = unit_prices * quantities
+
+        subtotals = np.bincount(item_orders, weights=item_totals, minlength=size).astype(np.int64)
+        shipping = to_cents(rng.choice(profile.shipping_costs, size))
+        tax = np.round(subtotals * TAX_RATE).astype(np.int64)
+        promoted = rng.random(size) < profile.promo_rate
+        promotion = rng.integers(0, len(profile.promotions), size)
+        promo_codes = np.array([code for code, _ in profile.promotions], dtype=object)[promotion]
+        discounts = np.where(
+            promoted, np.minimum(to_cents([amount for _, amount in profile.promotions])[promotion], subtotals // 2), 0
+        )
+        locations = self.customer_locations[customer_ids - 1]
+
+        np.add.at(self.customer_spent, customer_ids, subtotals)
+        np.fmax.at(self.customer_last_order, customer_ids, order_dates)
+
+        reviewed = rng.random(len(item_orders)) < REVIEWS_PER_ITEM
+        review_orders = item_orders[reviewed]
+        review_count = len(review_orders)
+        review_texts = rng.integers(0, len(profile.review_texts), review_count)
+
+        payment_statuses = choose(rng, profile.payment_statuses, size)
+        payment_amounts = subtotals + shipping + tax - discounts
+        payment_dates = order_dates + rng.integers(60, 900, size).astype('timedelta64[s]')
+        refunded = payment_statuses == 'Refunded'
+        partially_refunded = payment_statuses == 'Partially Refunded'
+
+        return {
+            'orders': {
+                'order_id': order_ids,
+                'customer_id': customer_ids,
+                'order_date': order_dates,
+                'status': choose(rng, profile.statuses, size),
+                'total_amount': subtotals,
+                'shipping_address': profile.addresses[locations],
+                'shipping_city': np.array([profile.locations[index][0] for index in locations], dtype=object),
+                'shipping_state': np.array([profile.locations[index][1] for index in locations], dtype=object),
+                'shipping_zip': np.array([profile.locations[index][2] for index in locations], dtype=object),
+                'shipping_cost': shipping,
+                'tax_amount': tax,
+                'discount_amount': discounts,
+                'promo_code': np.where(promoted, promo_codes, None),
+                'notes': rng.choice(profile.notes, size),
+                'updated_at': order_dates
+            },
+            'order_items': {
+                'order_item_id': np.arange(item_offset + 1, item_offset + len(item_orders) + 1, dtype=np.int64),
+                'order_id': order_ids[item_orders],
+                'product_id': item_products,
+                'quantity': quantities,
+                'unit_price': unit_prices,
+                'total_price': item_totals
+            },
+            'reviews': {
+                'review_id': np.arange(review_offset + 1, review_offset + review_count + 1, dtype=np.int64),
+                'customer_id': customer_ids[review_orders],
+                'product_id': item_products[reviewed],
+                'order_id': order_ids[review_orders],
+                'rating': choose(rng, profile.ratings, review_count).astype(np.int64),
+                'review_title': np.array([profile.review_texts[index][0] for index in review_texts], dtype=object),
+                'review_text': np.array([profile.review_texts[index][1] for index in review_texts], dtype=object),
+                'review_date': order_dates[review_orders] + (rng.integers(3, 30, review_count) * DAY).astype('timedelta64[s]'),
+                'is_verified_purchase': np.ones(review_count, dtype=bool),
+                'helpful_votes': rng.poisson(profile.helpful_votes_mean, review_count)
+            },
+            'payments': {
+                'payment_id': order_ids,
+                'order_id': order_ids,
+                'payment_method': choose(rng, profile.payment_methods, size),
+                'payment_status': payment_statuses,
+                'amount': payment_amounts,
+                'payment_date': payment_dates,
+                'transaction_id': np.char.add('TXN', np.char.zfill(order_ids.astype(str), 12)).astype(object),
+                'refund_amount': np.where(refunded, payment_amounts, np.where(partially_refunded, payment_amounts // 2, 0)),
+                'refund_date': np.where(
+                    refunded | partially_refunded, payment_dates + 7 * DAY, np.datetime64('NaT')
+                ).astype('datetime64[s]'),
+                'updated_at': np.where(refunded | partially_refunded, payment_dates + 7 * DAY, payment_dates).astype('datetime64[s]')
+            }
+        }
+
+    def generate_customers(self):
+        profile = self.profile
+        rng = self.rng('customer_names')
+        size = self.customer_count
+        customer_ids = np.arange(1, size + 1, dtype=np.int64)
+        first_names = rng.choice(profile.first_names, size)
+        last_names = rng.choice(profile.last_names, size)
+        locations = self.customer_locations
+        emails = [f"{first.lower()}.{last.lower()}{customer_id}@example.com"
+                  for first, last, customer_id in zip(first_names, last_names, customer_ids)]
+
+        return {
+            'customer_id': customer_ids,
+            'first_name': first_names,
+            'last_name': last_names,
+            'email': np.array(emails, dtype=object),
+            'phone': np.array([f"555-{customer_id % 10000:04d}" for customer_id in customer_ids], dtype=object),
+            'address': profile.addresses[locations],
+            'city': np.array([profile.locations[index][0] for index in locations], dtype=object),
+            'state': np.array([profile.locations[index][1] for index in locations], dtype=object),
+            'zip_code': np.array([profile.locations[index][2] for index in locations], dtype=object),
+            'country': np.full(size, 'USA', dtype=object),
+            'registration_date': self.registration_dates.astype('datetime64[D]'),
+            'customer_segment': choose(rng, profile.segments, size),
+            'total_spent': self.customer_spent[1:],
+            'last_purchase_date': self.customer_last_order[1:].astype('datetime64[D]')
+        }
+
+    def generate_products(self):
+        profile = self.profile
+        rng = self.rng('product_details')
+        size = self.product_count
+        templates = [profile.products[index] for index in self.product_templates]
+        variants = np.arange(size) // len(profile.products)
+        costs = to_cents([template[5] for template in templates])
+        template_prices = to_cents([template[4] for template in templates])
+
+        return {
+            'product_id': np.arange(1, size + 1, dtype=np.int64),
+            'product_name': np.array([
+                template[0] if variant == 0 else f"{template[0]} #{variant + 1}"
+                for template, variant in zip(templates, variants)
+            ], dtype=object),
+            'category': np.array([template[1] for template in templates], dtype=object),
+            'subcategory': np.array([template[2] for template in templates], dtype=object),
+            'brand': np.array([template[3] for template in templates], dtype=object),
+            'price': self.product_prices,
+            'cost': np.round(costs * self.product_prices / template_prices).astype(np.int64),
+            'stock_quantity': rng.integers(0, 500, size),
+            'description': np.array([template[7] for template in templates], dtype=object),
+            'created_date': (FIRST_REGISTRATION + random_offsets(
+                rng, np.full(size, (START_DATE - FIRST_REGISTRATION).astype(np.int64))
+            )).astype('datetime64[D]'),
+            'is_active': rng.random(size) < 0.95,
+            'weight_kg': to_cents([template[8] for template in templates]),
+            'dimensions': np.array([template[9] for template in templates], dtype=object)
+        }
+
+def sql_literals(values, column_type):
+    if column_type == 'int':
+        return values.astype(str)
+    if column_type == 'decimal':
+        return np.char.mod('%.2f', values / 100)
+    if column_type == 'bool':
+        return np.where(values, 'TRUE', 'FALSE')
+    if column_type in ('date', 'datetime'):
+        text = np.datetime_as_string(values, unit='D' if column_type == 'date' else 's')
+        return np.where(np.isnat(values), 'NULL', np.char.add(np.char.add("'", np.char.replace(text, 'T', ' ')), "'"))
+    return ['NULL' if value is None else "'" + value.replace("\\", "\\\\").replace("'", "''") + "'" for value in values]
+
+class SqlDumpWriter:
+    def __init__(self, output_dir):
+        self.output_dir = os.path.join(output_dir, 'sql')
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.files = {}
+
+    def write(self, table_name, columns):
+        if table_name not in self.files:
+            self.files[table_name] = open(os.path.join(self.output_dir, f"{table_name}.sql"), 'w')
+        dump = self.files[table_name]
+
+        names = [name for name, _ in TABLE_COLUMNS[table_name]]
+        literals = [sql_literals(columns[name], column_type) for name, column_type in TABLE_COLUMNS[table_name]]
+        rows = [f"({', '.join(row)})" for row in zip(*literals)]
+        # One INSERT per line so loaders can stream the dump statement by statement.
+        for start in range(0, len(rows), SQL_ROWS_PER_INSERT):
+            dump.write(f"INSERT INTO {table_name} ({', '.join(names)}) VALUES {', '.join(rows[start:start + SQL_ROWS_PER_INSERT])};\n")
+
+    def close(self):
+        for dump in self.files.values():
+            dump.close()
+
+class ParquetDumpWriter:
+    def __init__(self, output_dir):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self.pa = pa
+        self.pq = pq
+        self.output_dir = os.path.join(output_dir, 'parquet')
+        self.parts = {}
+
+    def arrow_array(self, values, column_type):
+        pa = self.pa
+        if column_type == 'int':
+            return pa.array(values, pa.int32())
+        if column_type == 'decimal':
+            return pa.array(values / 100).cast(pa.decimal128(12, 2))
+        if column_type == 'date':
+            return pa.array(values.astype('datetime64[D]'), pa.date32())
+        if column_type == 'datetime':
+            return pa.array(values, pa.timestamp('s'))
+        if column_type == 'bool':
+            return pa.array(values, pa.bool_())
+        return pa.array(values, pa.string())
+
+    def write(self, table_name, columns):
+        table_dir = os.path.join(self.output_dir, table_name)
+        os.makedirs(table_dir, exist_ok=True)
+        part = self.parts.get(table_name, 0)
+        self.parts[table_name] = part + 1
+        table = self.pa.table({
+            name: self.arrow_array(columns[name], column_type) for name, column_type in TABLE_COLUMNS[table_name]
+        })
+        self.pq.write_table(table, os.path.join(table_dir, f"part-{part:05d}.parquet"))
+
+    def close(self):
+        pass
+
+WRITERS = {
+    'sql': SqlDumpWriter,
+    'parquet': ParquetDumpWriter
+}
+
+def generate(order_count, output_dir, formats, seed=42):
+    dataset = SyntheticDataset(order_count, seed)
+    writers = [WRITERS[output_format](output_dir) for output_format in formats]
+    row_counts = dict.fromkeys(TABLE_COLUMNS, 0)
+    try:
+        for tables in dataset.chunks():
+            for table_name, columns in tables.items():
+                row_counts[table_name] += len(next(iter(columns.values())))
+                for writer in writers:
+                    writer.write(table_name, columns)
+            if 'orders' in tables:
+                print(f"Generated {row_counts['orders']}/{order_count} orders")
+    finally:
+        for writer in writers:
+            writer.close()
+
+    manifest = {
+        'orders': order_count,
+        'seed': seed,
+        'end_date': str(END_DATE.astype('datetime64[D]')),
+        'formats': formats,
+        'load_order': list(TABLE_COLUMNS),
+        'row_counts': row_counts
+    }
+    with open(os.path.join(output_dir, 'manifest.json'), 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+    return manifest
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic e-commerce dataset")
+    parser.add_argument('--orders', type=int, default=10000, help="order rows to generate (10k to 100M)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default=None, help="defaults to benchmarks/data/<orders>")
+    parser.add_argument('--formats', default='sql,parquet', help="comma separated: sql, parquet")
+    args = parser.parse_args()
+
+    output_dir = args.output or os.path.join(os.path.dirname(__file__), 'data', str(args.orders))
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = generate(args.orders, output_dir, args.formats.split(','), args.seed)
+    print(json.dumps(manifest['row_counts']))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+import ast
+import json
+import os
+import urllib.request
+
+from pyspark.sql import SparkSession
+
+GLUE_SCRIPT_PATH = os.path.join(os.path.dirname(__file__), '..', 'aws-glue', 'glue_etl_script.py')
+
+# The Glue script creates its GlueContext and resolves job arguments at import
+# time, so only its pyspark imports, schemas and function definitions are
+# loaded here and bound to a local SparkSession.
+def get_local_spark(app_name="ecommerce-glue-benchmark", shuffle_partitions=8, ui_enabled=False):
+    return SparkSession.builder \
+        .master("local[*]") \
+        .appName(app_name) \
+        .config("spark.sql.shuffle.partitions", shuffle_partitions) \
+        .config("spark.ui.enabled", str(ui_enabled).lower()) \
+        .getOrCreate()
+
+def is_loadable(node):
+    if isinstance(node, (ast.FunctionDef, ast.ClassDef)):
+        return True
+    if isinstance(node, (ast.Import, ast.ImportFrom)):
+        module = node.module if isinstance(node, ast.ImportFrom) else node.names[0].name
+        return module.startswith("pyspark") and module != "pyspark.context" or module in (
+            "json", "time", "resource", "urllib.request", "collections", "concurrent.futures", "contextlib", "datetime"
+        )
+    if isinstance(node, ast.Assign):
+        return all(
+            isinstance(target, ast.Name) and (target.id.endswith("_schema") or target.id in ("ANALYTICS_COLUMNS", "ANALYTICS_CLUSTER_KEYS", "ANALYTICS_PARTITION_KEYS"))
+            for target in node.targets
+        )
+    return False
+
+def load_glue_functions(spark, **overrides):
+    with open(GLUE_SCRIPT_PATH) as script:
+        tree = ast.parse(script.read(), GLUE_SCRIPT_PATH)
+    
+    tree.body = [node for node in tree.body if is_loadable(node)]
+    namespace = {"spark": spark, "STRICT_SCHEMA": False}
+    namespace.update(overrides)
+    exec(compile(tree, GLUE_SCRIPT_PATH, "exec"), namespace)
+    return namespace
+
+def get_stage_metrics(spark, job_group):
+    # Reads shuffle and run-time totals for one job group from the Spark UI
+    # REST API, so the session must be created with ui_enabled=True.
+    api = f"{spark.sparkContext.uiWebUrl}/api/v1/applications/{spark.sparkContext.applicationId}"
+    with urllib.request.urlopen(f"{api}/jobs") as response:
+        jobs = json.load(response)
+    stage_ids = {stage_id for job in jobs if job.get("jobGroup") == job_group for stage_id in job["stageIds"]}
+    
+    with urllib.request.urlopen(f"{api}/stages?status=complete") as response:
+        stages = [stage for stage in json.load(response) if stage["stageId"] in stage_ids]
+    
+    return {
+        "stages": len(stages),
+        "shuffle_write_bytes": sum(stage["shuffleWriteBytes"] for stage in stages),
+        "shuffle_read_bytes": sum(stage["shuffleReadBytes"] for stage in stages),
+        "executor_run_time_ms": sum(stage["executorRunTime"] for stage in stages)
+    }
@@ -0,0 +1,77 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from lambda_local import ROOT_DIR
+
+LAMBDA_DIR = os.path.join(ROOT_DIR, 'aws-lambda')
+
+# Modules that only some invocations need; importing data_processor must not
+# pull them in.
+DEFERRED_MODULES = ['boto3', 'botocore', 'pymysql', 'pandas', 'numpy', 'pyarrow', 'asyncio', 'redis']
+
+MEASURE_IMPORT = """
+import json, resource, sys, time
+started = time.perf_counter()
+import data_processor
+print(json.dumps({
+    'import_ms': (time.perf_counter() - started) * 1000,
+    'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'loaded': [name for name in %r if name in sys.modules]
+}))
+""" % (DEFERRED_MODULES,)
+
+def measure_import():
+    output = subprocess.check_output([sys.executable, '-c', MEASURE_IMPORT], cwd=LAMBDA_DIR, text=True)
+    return json.loads(output.strip().splitlines()[-1])
+
+def slowest_imports(count):
+    # -X importtime writes "import time: self [us] | cumulative | package" lines to stderr.
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import data_processor'],
+        cwd=LAMBDA_DIR, capture_output=True, text=True
+    )
+    timings = []
+    for line in result.stderr.splitlines():
+        parts = line.split('|')
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            timings.append((int(parts[1]), parts[2].rstrip()))
+    return sorted(timings, reverse=True)[:count]
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail when importing data_processor gets slower or heavier")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-import-ms', type=float, default=150.0)
+    parser.add_argument('--max-rss-mb', type=float, default=40.0)
+    args = parser.parse_args()
+
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    runs = [measure_import() for _ in range(args.runs)]
+    import_ms = statistics.median(run['import_ms'] for run in runs)
+    rss_mb = max(run['rss_mb'] for run in runs)
+    loaded = sorted({name for run in runs for name in run['loaded']})
+
+    print(f"import data_processor: {import_ms:.1f}ms median of {args.runs} (budget {args.max_import_ms}ms)")
+    print(f"peak RSS after import: {rss_mb:.1f}MB (budget {args.max_rss_mb}MB)")
+    failures = []
+    if import_ms > args.max_import_ms:
+        failures.append(f"import took {import_ms:.1f}ms")
+    if rss_mb > args.max_rss_mb:
+        failures.append(f"RSS reached {rss_mb:.1f}MB")
+    if loaded:
+        failures.append(f"deferred modules imported at load: {', '.join(loaded)}")
+
+    if failures:
+        print("Over budget: " + "; ".join(failures))
+        print("Slowest imports (cumulative):")
+        for cumulative_us, module in slowest_imports(15):
+            print(f"  {cumulative_us / 1000:8.1f}ms {module}")
+        return 1
+    print("Within budget")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
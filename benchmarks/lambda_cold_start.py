@@ -0,0 +1,88 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from lambda_local import ROOT_DIR
+
+LAMBDA_DIR = os.path.join(ROOT_DIR, 'aws-lambda')
+
+# Runs in a fresh interpreter, like a new Lambda container: module import is
+# the init phase, the first handler call is the cold invocation and the rest
+# reuse the warm module state (clients, connection pool, result cache).
+INVOKE = """
+import json, resource, sys, time
+event = json.loads(sys.argv[1])
+warm_invocations = int(sys.argv[2])
+started = time.perf_counter()
+import data_processor
+init_ms = (time.perf_counter() - started) * 1000
+
+durations = []
+status_codes = []
+errors = []
+for _ in range(warm_invocations + 1):
+    started = time.perf_counter()
+    response = data_processor.lambda_handler(dict(event), None)
+    durations.append((time.perf_counter() - started) * 1000)
+    status_codes.append(response['statusCode'])
+    if response['statusCode'] != 200:
+        errors.append(json.loads(response['body']).get('error'))
+print(json.dumps({
+    'init_ms': init_ms,
+    'cold_invoke_ms': durations[0],
+    'warm_invoke_ms': durations[1:],
+    'status_codes': status_codes,
+    'errors': errors,
+    'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+}))
+"""
+
+def run_container(event, warm_invocations):
+    output = subprocess.check_output(
+        [sys.executable, '-c', INVOKE, json.dumps(event), str(warm_invocations)],
+        cwd=LAMBDA_DIR, text=True, stderr=subprocess.DEVNULL
+    )
+    return json.loads(output.strip().splitlines()[-1])
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold and warm lambda_handler latency locally")
+    parser.add_argument('--containers', type=int, default=5, help="fresh interpreters, one cold start each")
+    parser.add_argument('--warm', type=int, default=10, help="warm invocations per container")
+    parser.add_argument('--event', default='{"export_to_s3": false}', help="event JSON passed to the handler")
+    args = parser.parse_args()
+
+    # The handler talks to the database configured through RDS_ENDPOINT,
+    # DB_USERNAME, DB_PASSWORD and DB_NAME, as in the benchmark suite.
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    event = json.loads(args.event)
+    containers = [run_container(event, args.warm) for _ in range(args.containers)]
+
+    init_ms = [container['init_ms'] for container in containers]
+    cold_ms = [container['cold_invoke_ms'] for container in containers]
+    warm_ms = [duration for container in containers for duration in container['warm_invoke_ms']]
+    status_codes = sorted({code for container in containers for code in container['status_codes']})
+
+    print(f"{'init (import)':<24} p50 {statistics.median(init_ms):8.1f}ms  max {max(init_ms):8.1f}ms")
+    print(f"{'cold invocation':<24} p50 {statistics.median(cold_ms):8.1f}ms  max {max(cold_ms):8.1f}ms")
+    if warm_ms:
+        print(f"{'warm invocation':<24} p50 {statistics.median(warm_ms):8.1f}ms  p95 {percentile(warm_ms, 0.95):8.1f}ms")
+    print(f"peak RSS {max(container['rss_mb'] for container in containers):.1f}MB, status codes {status_codes}")
+
+    # A handler that fails fast (no database, bad credentials) would look
+    # like a very quick cold start, so the timings only count if every
+    # invocation succeeded.
+    errors = sorted({str(error) for container in containers for error in container['errors']})
+    if status_codes != [200]:
+        print(f"Invocations failed, timings are not meaningful: {errors}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
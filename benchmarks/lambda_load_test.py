@@ -0,0 +1,267 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+from lambda_local import LocalS3, load_data_processor
+
+# Each worker process stands in for one Lambda container: it imports
+# data_processor once, keeps its own connection pool, /tmp result cache and
+# S3 client, and handles one invocation at a time, as Lambda does. The
+# number of workers is the function's concurrency limit; invocations that
+# arrive while every container is busy wait in the queue.
+def run_container(container_id, work_dir, s3_endpoint, tasks, results):
+    os.environ['RESULT_CACHE_DIR'] = os.path.join(work_dir, f"container-{container_id}", 'cache')
+    sys.stdout = open(os.devnull, 'w')
+    data_processor = load_data_processor()
+    if s3_endpoint:
+        import boto3
+        data_processor.clients['s3'] = boto3.client('s3', endpoint_url=s3_endpoint)
+    else:
+        data_processor.clients['s3'] = LocalS3(os.path.join(work_dir, f"container-{container_id}", 's3'))
+
+    cold = True
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        invocation_id, scheduled_at, event = task
+        started_at = time.time()
+        result = {'invocation': invocation_id, 'container': container_id, 'cold': cold,
+                  'scheduled_at': scheduled_at, 'started_at': started_at}
+        try:
+            response = data_processor.lambda_handler(dict(event), None)
+            body = json.loads(response['body'])
+            result.update({
+                'status_code': response['statusCode'],
+                'error': body.get('error'),
+                'section_errors': body.get('section_errors', {}),
+                'stage_metrics': body.get('stage_metrics', {}),
+            })
+        except Exception as e:
+            result.update({'status_code': None, 'error': f"{type(e).__name__}: {e}", 'section_errors': {}, 'stage_metrics': {}})
+        result['finished_at'] = time.time()
+        result['connections_opened'] = data_processor.connection_pool.get_metrics()['connections_opened']
+        results.put(result)
+        cold = False
+
+class DatabaseMonitor:
+    # Samples Threads_connected on the MySQL server the handler uses, so the
+    # peak includes connections from every container (minus this one).
+    def __init__(self, interval):
+        self.interval = interval
+        self.samples = []
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        try:
+            import pymysql
+            self.connection = pymysql.connect(
+                host=os.environ['RDS_ENDPOINT'], user=os.environ['DB_USERNAME'],
+                password=os.environ['DB_PASSWORD'], database=os.environ['DB_NAME'], autocommit=True
+            )
+        except Exception as e:
+            print(f"Not sampling server connections: {e}")
+            return
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while not self.stopped.is_set():
+            try:
+                with self.connection.cursor() as cursor:
+                    cursor.execute("SHOW GLOBAL STATUS LIKE 'Threads_connected'")
+                    self.samples.append(int(cursor.fetchone()[1]) - 1)
+            except Exception as e:
+                print(f"Stopped sampling server connections: {e}")
+                return
+            self.stopped.wait(self.interval)
+
+    def take_peak(self):
+        peak = max(self.samples) if self.samples else None
+        self.samples = []
+        return peak
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread:
+            self.thread.join()
+            self.connection.close()
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)] if values else None
+
+def run_step(rate, duration, events, tasks, results, next_id, timeout):
+    # Open loop: invocations are sent on schedule whether or not earlier ones
+    # have finished, like scheduled runs overlapping with manual reruns.
+    invocation_count = max(1, int(rate * duration))
+    started_at = time.time()
+    for index in range(invocation_count):
+        scheduled_at = started_at + index / rate
+        time.sleep(max(0.0, scheduled_at - time.time()))
+        tasks.put((next_id + index, scheduled_at, events[index % len(events)]))
+    step_results = [results.get(timeout=timeout) for _ in range(invocation_count)]
+    return step_results, time.time() - started_at
+
+def summarize(rate, step_results, elapsed, server_peak, opened_before):
+    ok = [result for result in step_results if result['status_code'] == 200 and not result['section_errors']]
+    durations = [(result['finished_at'] - result['started_at']) * 1000 for result in step_results]
+    waits = [(result['started_at'] - result['scheduled_at']) * 1000 for result in step_results]
+
+    # connections_opened is cumulative per container, so the step's count is
+    # the growth of each container's latest value.
+    latest_opened = dict(opened_before)
+    for result in sorted(step_results, key=lambda result: result['finished_at']):
+        if result.get('connections_opened') is not None:
+            latest_opened[result['container']] = result['connections_opened']
+    connections_opened = sum(latest_opened.values()) - sum(opened_before.values())
+
+    # Instrumented stages (process_* sections, rollups, exports) as reported
+    # by the handler's stage_metrics, and section errors from its response.
+    stages = defaultdict(lambda: {'calls': 0, 'errors': 0, 'durations_ms': []})
+    section_errors = defaultdict(int)
+    for result in step_results:
+        for stage_name, metrics in result['stage_metrics'].items():
+            stage = stages[stage_name]
+            stage['calls'] += metrics['calls']
+            stage['errors'] += metrics['errors']
+            stage['durations_ms'].append(metrics['total_ms'])
+        for section_name in result['section_errors']:
+            section_errors[section_name] += 1
+
+    failures = defaultdict(int)
+    for result in step_results:
+        if result['status_code'] != 200 or result['error']:
+            failures[str(result['error'])[:120]] += 1
+
+    return {
+        'rate': rate,
+        'invocations': len(step_results),
+        'succeeded': len(ok),
+        'error_rate': round(1 - len(ok) / len(step_results), 4),
+        'throughput_per_s': round(len(step_results) / elapsed, 2),
+        'cold_starts': sum(1 for result in step_results if result['cold']),
+        'latency_ms': {
+            'p50': round(percentile(durations, 0.5), 1),
+            'p95': round(percentile(durations, 0.95), 1),
+            'p99': round(percentile(durations, 0.99), 1)
+        },
+        'queue_wait_ms': {'p50': round(percentile(waits, 0.5), 1), 'p95': round(percentile(waits, 0.95), 1)},
+        'connections_opened': connections_opened,
+        'peak_server_connections': server_peak,
+        'stages': {
+            name: {
+                'calls': stage['calls'],
+                'error_rate': round(stage['errors'] / stage['calls'], 4) if stage['calls'] else 0.0,
+                'p95_ms': round(percentile(stage['durations_ms'], 0.95), 1) if stage['durations_ms'] else None
+            }
+            for name, stage in sorted(stages.items())
+        },
+        'section_error_rates': {
+            name: round(count / len(step_results), 4) for name, count in sorted(section_errors.items())
+        },
+        'failures': dict(failures)
+    }, latest_opened
+
+def print_step(summary):
+    latency = summary['latency_ms']
+    print(f"{summary['rate']:>7.2f}/s  {summary['invocations']:>5}  {summary['throughput_per_s']:>8.2f}/s  "
+          f"{latency['p50']:>9.1f} {latency['p95']:>9.1f} {latency['p99']:>9.1f}  "
+          f"{summary['queue_wait_ms']['p95']:>9.1f}  {summary['error_rate'] * 100:>6.2f}%  "
+          f"{summary['connections_opened']:>6} {summary['peak_server_connections'] if summary['peak_server_connections'] is not None else '-':>6}")
+    for name, stage in summary['stages'].items():
+        print(f"           {name:<36} p95 {stage['p95_ms']:>9.1f}ms  errors {stage['error_rate'] * 100:6.2f}% of {stage['calls']}")
+    for name, error_rate in summary['section_error_rates'].items():
+        print(f"           section {name:<28} failed in {error_rate * 100:6.2f}% of invocations")
+    for error, count in summary['failures'].items():
+        print(f"           {count} x {error}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive lambda_handler with overlapping invocations and report where it saturates")
+    parser.add_argument('--containers', type=int, default=10, help="concurrent containers (the function's concurrency limit)")
+    parser.add_argument('--rates', default='0.5,1,2,4,8', help="comma separated invocations per second, one step each")
+    parser.add_argument('--duration', type=float, default=30, help="seconds of arrivals per step")
+    parser.add_argument('--event', action='append', help="event JSON; repeat to mix invocation types (default: full run, no cache)")
+    parser.add_argument('--data', default=None, help="directory written by data_generator.py to load first")
+    parser.add_argument('--load-mysql', action='store_true', help="load the --data SQL dump into the configured database first")
+    parser.add_argument('--s3-endpoint', default=None, help="S3-compatible endpoint to export to instead of local files")
+    parser.add_argument('--max-error-rate', type=float, default=0.0, help="error rate a step may have and still count as sustained")
+    parser.add_argument('--max-wait-ms', type=float, default=1000.0, help="p95 wait for a free container a step may have and still count as sustained")
+    parser.add_argument('--timeout', type=float, default=900.0, help="seconds to wait for any one invocation (Lambda's limit by default)")
+    parser.add_argument('--output', default=None, help="write the step summaries to this JSON file")
+    args = parser.parse_args()
+    if args.load_mysql and not args.data:
+        parser.error("--load-mysql needs --data")
+
+    # The handler and the monitor use the database configured through
+    # RDS_ENDPOINT, DB_USERNAME, DB_PASSWORD and DB_NAME, as in the benchmark suite.
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    if args.load_mysql:
+        from benchmark_suite import load_mysql_dump
+        with open(os.path.join(args.data, 'manifest.json')) as manifest_file:
+            manifest = json.load(manifest_file)
+        print(f"Loading {manifest['orders']} orders from {args.data}...")
+        load_mysql_dump(load_data_processor(), args.data, manifest)
+
+    events = [json.loads(event) for event in args.event or ['{"use_cache": false}']]
+    rates = [float(rate) for rate in args.rates.split(',')]
+    work_dir = tempfile.mkdtemp(prefix="lambda-load-")
+
+    # spawn gives each container a fresh interpreter, so its first invocation
+    # is a real cold start.
+    context = multiprocessing.get_context('spawn')
+    tasks = context.Queue()
+    results = context.Queue()
+    containers = [
+        context.Process(target=run_container, args=(container_id, work_dir, args.s3_endpoint, tasks, results), daemon=True)
+        for container_id in range(args.containers)
+    ]
+    for container in containers:
+        container.start()
+
+    monitor = DatabaseMonitor(0.2)
+    monitor.start()
+    summaries = []
+    opened = {}
+    next_id = 0
+    print(f"{'offered':>9}  {'calls':>5}  {'completed':>10}  {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  "
+          f"{'wait p95':>9}  {'errors':>7}  {'opened':>6} {'peak':>6}")
+    try:
+        for rate in rates:
+            step_results, elapsed = run_step(rate, args.duration, events, tasks, results, next_id, args.timeout)
+            next_id += len(step_results)
+            summary, opened = summarize(rate, step_results, elapsed, monitor.take_peak(), opened)
+            summaries.append(summary)
+            print_step(summary)
+    finally:
+        for _ in containers:
+            tasks.put(None)
+        for container in containers:
+            container.join(timeout=30)
+        monitor.stop()
+
+    # The ceiling is the highest offered rate the containers kept up with:
+    # invocations did not queue for a free container and errors stayed
+    # within the allowance. Beyond it the queue, and latency, keep growing.
+    sustained = [
+        summary['rate'] for summary in summaries
+        if summary['queue_wait_ms']['p95'] <= args.max_wait_ms and summary['error_rate'] <= args.max_error_rate
+    ]
+    print(f"\nHighest sustained rate with {args.containers} containers: "
+          f"{f'{max(sustained)}/s' if sustained else 'none of the tested rates'}")
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump({'containers': args.containers, 'events': events, 'steps': summaries}, output_file, indent=2)
+        print(f"Step summaries written to {args.output}")
+    return 0 if sustained else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
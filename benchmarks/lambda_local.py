@@ -0,0 +1,167 @@
+import ast
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), '..')
+DATA_PROCESSOR_PATH = os.path.join(ROOT_DIR, 'aws-lambda', 'data_processor.py')
+SCHEMA_PATH = os.path.join(ROOT_DIR, 'database_schema.sql')
+SAMPLE_DATA_PATH = os.path.join(ROOT_DIR, 'sample_data.sql')
+
+# Child tables are copied once per scale step with their foreign keys shifted
+# onto the copied parent rows, so every copy keeps the sample distributions.
+SCALED_TABLES = {
+    "orders": ("order_id", {}),
+    "order_items": ("order_item_id", {"order_id": "orders"}),
+    "reviews": ("review_id", {"order_id": "orders"}),
+    "payments": ("payment_id", {"order_id": "orders"})
+}
+
+# Portable full builds of the MySQL rollup tables that the Lambda sections
+# read; the Lambda itself maintains them incrementally with MySQL-only SQL.
+ROLLUP_BUILDS = [
+    """INSERT INTO customer_order_stats
+       SELECT customer_id, COUNT(order_id), SUM(total_amount), MAX(total_amount), MIN(total_amount)
+       FROM orders GROUP BY customer_id""",
+    """INSERT INTO monthly_sales_stats
+       SELECT strftime('%Y-%m', order_date), COUNT(order_id), SUM(total_amount)
+       FROM orders GROUP BY strftime('%Y-%m', order_date)""",
+    """INSERT INTO monthly_customer_activity
+       SELECT DISTINCT strftime('%Y-%m', order_date), customer_id FROM orders""",
+    """INSERT INTO product_sales_stats
+       SELECT product_id, COUNT(order_item_id), SUM(quantity), SUM(total_price), SUM(unit_price)
+       FROM order_items GROUP BY product_id""",
+    """INSERT INTO product_review_stats
+       SELECT product_id, COUNT(review_id), SUM(rating) FROM reviews GROUP BY product_id"""
+]
+
+def load_section_queries():
+    with open(DATA_PROCESSOR_PATH) as source:
+        tree = ast.parse(source.read(), DATA_PROCESSOR_PATH)
+    
+    queries = {}
+    for node in tree.body:
+        if isinstance(node, ast.FunctionDef) and node.name.startswith("process_"):
+            for statement in node.body:
+                if isinstance(statement, ast.Assign) and getattr(statement.targets[0], "id", None) == "query":
+                    queries[node.name] = statement.value.value
+    return queries
+
+def mysql_to_sqlite(sql):
+    sql = re.sub(r"INT PRIMARY KEY AUTO_INCREMENT", "INTEGER PRIMARY KEY", sql)
+    sql = re.sub(r" ON UPDATE CURRENT_TIMESTAMP", "", sql)
+    return re.sub(r"ENUM\([^)]*\)", "TEXT", sql)
+
+def create_sqlite_database(scale=1, path=":memory:"):
+    connection = sqlite3.connect(path)
+    with open(SCHEMA_PATH) as schema:
+        connection.executescript(mysql_to_sqlite(schema.read()))
+    with open(SAMPLE_DATA_PATH) as sample_data:
+        connection.executescript(sample_data.read())
+    
+    base_counts = {
+        table_name: connection.execute(f"SELECT MAX({key}) FROM {table_name}").fetchone()[0]
+        for table_name, (key, _) in SCALED_TABLES.items()
+    }
+    
+    for copy in range(1, scale):
+        for table_name, (key, foreign_keys) in SCALED_TABLES.items():
+            columns = [row[1] for row in connection.execute(f"PRAGMA table_info({table_name})")]
+            select_list = [
+                f"{column} + {base_counts[table_name] * copy}" if column == key
+                else f"{column} + {base_counts[foreign_keys[column]] * copy}" if column in foreign_keys
+                else column
+                for column in columns
+            ]
+            connection.execute(
+                f"INSERT INTO {table_name} ({', '.join(columns)}) "
+                f"SELECT {', '.join(select_list)} FROM {table_name} WHERE {key} <= {base_counts[table_name]}"
+            )
+    
+    for statement in ROLLUP_BUILDS:
+        connection.execute(statement)
+    
+    connection.commit()
+    return connection
+
+def load_data_processor():
+    # data_processor creates its boto3 clients on first use, which still
+    # needs a region; importing it makes no AWS calls.
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    sys.path.insert(0, os.path.join(ROOT_DIR, 'aws-lambda'))
+    import data_processor
+    return data_processor
+
+class LocalS3:
+    # Stand-in for the s3_client calls the export path makes. Objects land
+    # under root_dir/<bucket>/<key> so output sizes can be inspected.
+    def __init__(self, root_dir):
+        self.root_dir = root_dir
+        self.uploads = {}
+        self.bytes_written = 0
+    
+    def path_for(self, bucket, key):
+        path = os.path.join(self.root_dir, bucket, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+    
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        body = Body.encode() if isinstance(Body, str) else Body
+        with open(self.path_for(Bucket, Key), 'wb') as target:
+            target.write(body)
+        self.bytes_written += len(body)
+        return {'ETag': hashlib.md5(body).hexdigest()}
+    
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        upload_id = str(len(self.uploads) + 1)
+        self.uploads[upload_id] = []
+        return {'UploadId': upload_id}
+    
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        part_path = f"{self.path_for(Bucket, Key)}.{UploadId}.{PartNumber}"
+        with open(part_path, 'wb') as part:
+            part.write(Body)
+        self.uploads[UploadId].append(part_path)
+        return {'ETag': hashlib.md5(Body).hexdigest()}
+    
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        with open(self.path_for(Bucket, Key), 'wb') as target:
+            for part_path in self.uploads.pop(UploadId):
+                with open(part_path, 'rb') as part:
+                    body = part.read()
+                target.write(body)
+                self.bytes_written += len(body)
+                os.remove(part_path)
+        return {}
+    
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        for part_path in self.uploads.pop(UploadId, []):
+            os.remove(part_path)
+        return {}
+    
+    def get_object(self, Bucket, Key):
+        return {'Body': open(os.path.join(self.root_dir, Bucket, Key), 'rb')}
+    
+    def get_paginator(self, operation_name):
+        return LocalS3Paginator(self)
+
+class LocalS3Paginator:
+    def __init__(self, s3):
+        self.s3 = s3
+    
+    def paginate(self, Bucket, Prefix='', StartAfter=''):
+        bucket_dir = os.path.join(self.s3.root_dir, Bucket)
+        contents = []
+        for directory, _, file_names in os.walk(bucket_dir):
+            for file_name in file_names:
+                path = os.path.join(directory, file_name)
+                key = os.path.relpath(path, bucket_dir).replace(os.sep, '/')
+                if key.startswith(Prefix) and key > StartAfter:
+                    with open(path, 'rb') as source:
+                        etag = hashlib.md5(source.read()).hexdigest()
+                    contents.append({'Key': key, 'Size': os.path.getsize(path), 'ETag': f'"{etag}"'})
+        contents.sort(key=lambda item: item['Key'])
+        for start in range(0, max(len(contents), 1), 1000):
+            yield {'Contents': contents[start:start + 1000]}
@@ -0,0 +1,85 @@
+import sys
+import time
+
+from pyspark import StorageLevel
+from pyspark.sql import functions as F
+
+from glue_local import get_local_spark, get_stage_metrics, load_glue_functions
+
+ORDER_COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+
+def build_orders(spark, order_count):
+    return spark.range(1, order_count + 1).select(
+        F.col("id").cast("int").alias("order_id"),
+        (F.col("id") % 50000 + 1).cast("int").alias("customer_id"),
+        F.expr("timestamp_seconds(1672531200 + id * 30)").alias("order_date"),
+        F.lit("Delivered").alias("status"),
+        (F.col("id") % 100000 / 100).cast("decimal(10,2)").alias("total_amount"),
+        F.lit("123 Main St").alias("shipping_address"),
+        F.lit("Seattle").alias("shipping_city"),
+        F.lit("WA").alias("shipping_state"),
+        F.lit("98101").alias("shipping_zip"),
+        F.lit(9.99).cast("decimal(8,2)").alias("shipping_cost"),
+        (F.col("id") % 1000 / 100).cast("decimal(8,2)").alias("tax_amount"),
+        F.lit(0).cast("decimal(8,2)").alias("discount_amount"),
+        F.lit(None).cast("string").alias("promo_code")
+    )
+
+def build_order_items(spark, order_count):
+    # Roughly three items per order; every tenth order has no items.
+    return spark.range(1, order_count * 3 + 1).select(
+        F.col("id").cast("int").alias("order_item_id"),
+        ((F.col("id") - 1) / 3 + 1).cast("int").alias("order_id"),
+        (F.col("id") % 2000 + 1).cast("int").alias("product_id"),
+        (F.col("id") % 4 + 1).cast("int").alias("quantity"),
+        (F.col("id") % 50000 / 100).cast("decimal(10,2)").alias("unit_price"),
+        (F.col("id") % 50000 / 100 * (F.col("id") % 4 + 1)).cast("decimal(10,2)").alias("total_price")
+    ).filter(F.col("order_id") % 10 != 0)
+
+def first_based_rollup(orders_df, order_items_df):
+    # The transform_order_data implementation this benchmark replaced.
+    orders_with_items = orders_df.join(order_items_df, "order_id", "left")
+    return orders_with_items.groupBy("order_id").agg(
+        F.first("customer_id").alias("customer_id"),
+        F.first("order_date").alias("order_date"),
+        F.first("status").alias("status"),
+        F.first("total_amount").alias("total_amount"),
+        F.first("shipping_cost").alias("shipping_cost"),
+        F.first("tax_amount").alias("tax_amount"),
+        F.first("discount_amount").alias("discount_amount"),
+        F.sum("quantity").alias("total_items"),
+        F.count("product_id").alias("unique_products"),
+        F.avg("unit_price").alias("avg_item_price")
+    )
+
+def run(spark, label, df):
+    spark.sparkContext.setJobGroup(label, label)
+    started = time.perf_counter()
+    df.write.format("noop").mode("overwrite").save()
+    elapsed = time.perf_counter() - started
+    metrics = get_stage_metrics(spark, label)
+    print(f"{label:<20} {elapsed:8.2f}s  stages={metrics['stages']}  "
+          f"shuffle_write={metrics['shuffle_write_bytes'] / 1024 / 1024:.1f}MB  "
+          f"executor_time={metrics['executor_run_time_ms'] / 1000:.1f}s")
+
+def main():
+    spark = get_local_spark("order-rollup-benchmark", ui_enabled=True)
+    glue = load_glue_functions(spark, BROADCAST_SIZE_LIMIT_BYTES=0)
+    glue["cache"] = glue["DataFrameCache"](StorageLevel.MEMORY_AND_DISK)
+    
+    orders_df = glue["cache"].persist("orders", build_orders(spark, ORDER_COUNT))
+    order_items_df = glue["cache"].persist("order_items", build_order_items(spark, ORDER_COUNT))
+    
+    legacy = first_based_rollup(orders_df, order_items_df)
+    rollup = glue["transform_order_data"](orders_df, order_items_df).select(legacy.columns)
+    
+    run(spark, "first() rollup", legacy)
+    run(spark, "pre-aggregated join", rollup)
+    
+    differences = legacy.exceptAll(rollup).count() + rollup.exceptAll(legacy).count()
+    print(f"Rows that differ between implementations: {differences}")
+    
+    spark.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import sys
+import time
+from collections import defaultdict
+
+from lambda_local import create_sqlite_database, load_section_queries
+
+SCALES = [int(scale) for scale in sys.argv[1:]] or [10, 100]
+
+# The process_product_analytics query before it was rebuilt on per-table
+# pre-aggregations: joining items and reviews to products together produces
+# items x reviews rows per product.
+FAN_OUT_QUERY = """
+SELECT 
+    p.product_name,
+    p.category,
+    p.brand,
+    COUNT(oi.order_item_id) as times_ordered,
+    SUM(oi.quantity) as total_quantity_sold,
+    SUM(oi.total_price) as total_revenue,
+    AVG(oi.unit_price) as avg_selling_price,
+    AVG(r.rating) as avg_rating,
+    COUNT(r.review_id) as total_reviews
+FROM products p
+LEFT JOIN order_items oi ON p.product_id = oi.product_id
+LEFT JOIN reviews r ON p.product_id = r.product_id
+GROUP BY p.product_id, p.product_name, p.category, p.brand
+ORDER BY total_revenue DESC
+LIMIT 20
+"""
+
+def expected_product_metrics(connection):
+    expected = defaultdict(lambda: {"times_ordered": 0, "total_revenue": 0.0, "total_reviews": 0})
+    for product_name, total_price in connection.execute(
+        "SELECT p.product_name, oi.total_price FROM order_items oi JOIN products p ON p.product_id = oi.product_id"
+    ):
+        expected[product_name]["times_ordered"] += 1
+        expected[product_name]["total_revenue"] += total_price
+    for (product_name,) in connection.execute(
+        "SELECT p.product_name FROM reviews r JOIN products p ON p.product_id = r.product_id"
+    ):
+        expected[product_name]["total_reviews"] += 1
+    return expected
+
+def time_query(connection, query, repeat=5):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        rows = connection.execute(query).fetchall()
+    return rows, (time.perf_counter() - started) / repeat
+
+def count_mismatches(rows, expected):
+    mismatches = 0
+    for product_name, _, _, times_ordered, _, total_revenue, _, _, total_reviews in rows:
+        metrics = expected[product_name]
+        if (times_ordered != metrics["times_ordered"]
+                or abs((total_revenue or 0) - metrics["total_revenue"]) > 0.01
+                or total_reviews != metrics["total_reviews"]):
+            mismatches += 1
+    return mismatches
+
+def main():
+    query = load_section_queries()["process_product_analytics"]
+    failed = False
+    
+    for scale in SCALES:
+        connection = create_sqlite_database(scale)
+        item_count = connection.execute("SELECT COUNT(*) FROM order_items").fetchone()[0]
+        expected = expected_product_metrics(connection)
+        
+        fan_out_rows, fan_out_time = time_query(connection, FAN_OUT_QUERY)
+        rows, elapsed = time_query(connection, query)
+        mismatches = count_mismatches(rows, expected)
+        failed = failed or mismatches > 0
+        
+        print(f"scale {scale:>4}x ({item_count} order items): "
+              f"fan-out join {fan_out_time * 1000:8.2f}ms ({count_mismatches(fan_out_rows, expected)} wrong rows), "
+              f"current query {elapsed * 1000:8.2f}ms ({mismatches} wrong rows)")
+        connection.close()
+    
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import io
+import random
+import sys
+import time
+from decimal import Decimal
+
+from lambda_local import load_data_processor
+
+ROW_COUNTS = [int(count) for count in sys.argv[1:]] or [20, 10000, 200000]
+
+def make_rows(row_count):
+    # What pymysql returns for the top_products query: Decimal sums and
+    # averages, with NULL for products that were never ordered or reviewed.
+    rng = random.Random(7)
+    rows = []
+    for index in range(row_count):
+        sold = rng.random() > 0.1
+        reviewed = rng.random() > 0.3
+        rows.append((
+            f"Product {index}", 'Electronics', 'Brand',
+            rng.randint(1, 500) if sold else 0,
+            Decimal(rng.randint(1, 900)) if sold else None,
+            Decimal(f"{rng.uniform(10, 90000):.2f}") if sold else None,
+            Decimal(f"{rng.uniform(5, 500):.6f}") if sold else None,
+            Decimal(f"{rng.uniform(1, 5):.4f}") if reviewed else None,
+            rng.randint(1, 80) if reviewed else 0
+        ))
+    return rows
+
+def per_row_dicts(columns, rows):
+    # The DictCursor rows and per-field comprehension the sections used before.
+    result = [dict(zip(columns, row)) for row in rows]
+    return [
+        {
+            'product_name': row['product_name'],
+            'category': row['category'],
+            'brand': row['brand'],
+            'times_ordered': row['times_ordered'],
+            'total_quantity_sold': row['total_quantity_sold'],
+            'total_revenue': float(row['total_revenue']) if row['total_revenue'] else 0,
+            'avg_selling_price': float(row['avg_selling_price']) if row['avg_selling_price'] else 0,
+            'avg_rating': float(row['avg_rating']) if row['avg_rating'] else 0,
+            'total_reviews': row['total_reviews']
+        }
+        for row in result
+    ]
+
+def timed(function, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        value = function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return value, best
+
+def write_parquet(data_processor, columns, column_types, batch_kind, data):
+    sink = io.BytesIO()
+    encoder = data_processor.ParquetEncoder(sink)
+    getattr(encoder, {'records': 'write_records', 'columns': 'write_columns'}[batch_kind])(columns, column_types, data)
+    encoder.close()
+    return sink.tell()
+
+def main():
+    data_processor = load_data_processor()
+    column_types = data_processor.SECTION_COLUMN_TYPES['top_products']
+    columns = list(column_types)
+    for row_count in ROW_COUNTS:
+        rows = make_rows(row_count)
+        batches = [
+            (columns, rows[start:start + data_processor.STREAM_BATCH_SIZE])
+            for start in range(0, row_count, data_processor.STREAM_BATCH_SIZE)
+        ]
+        repeat = 20 if row_count < 50000 else 3
+        before, before_seconds = timed(lambda: per_row_dicts(columns, rows), repeat)
+        decoded, decode_seconds = timed(lambda: data_processor.decode_columns(batches, 'top_products'), repeat)
+        after, after_seconds = timed(lambda: data_processor.shape_rows(batches, 'top_products'), repeat)
+        _, records_parquet_seconds = timed(lambda: write_parquet(data_processor, columns, column_types, 'records', before), repeat)
+        _, columns_parquet_seconds = timed(
+            lambda: write_parquet(data_processor, columns, column_types, 'columns', [decoded[column] for column in columns]), repeat
+        )
+
+        # The old path passed Decimal quantities through unconverted.
+        mismatches = sum(
+            1 for old, new in zip(before, after)
+            if any(float(old[column] or 0) != float(new[column]) for column in columns[3:])
+        )
+        # Per-row dicts are what the JSON sections used before; the columns
+        # alone are what the Parquet export needs, and row dicts on top are
+        # what the JSON consumers still get.
+        print(f"{row_count:>8} rows  per-row dicts {before_seconds * 1000:9.2f}ms  "
+              f"columns {decode_seconds * 1000:9.2f}ms ({before_seconds / decode_seconds:4.1f}x)  "
+              f"columns+dicts {after_seconds * 1000:9.2f}ms ({before_seconds / after_seconds:4.1f}x)  "
+              f"mismatched rows {mismatches}")
+        print(f"{'':>8}       Parquet from dicts {records_parquet_seconds * 1000:9.2f}ms  "
+              f"from columns {columns_parquet_seconds * 1000:9.2f}ms ({records_parquet_seconds / columns_parquet_seconds:4.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import sys
+
+from lambda_local import SAMPLE_DATA_PATH, SCHEMA_PATH, load_data_processor
+
+# Changes applied between refreshes. The second round commits rows stamped
+# before the previous refresh started, as a transaction that was still open
+# during it would, and changes orders that were already rolled up.
+CHANGE_ROUNDS = [
+    [
+        "UPDATE orders SET total_amount = total_amount + 100, status = 'Delivered' WHERE order_id = 1",
+        """INSERT INTO orders (customer_id, order_date, status, total_amount) VALUES (2, NOW(), 'Pending', 250.00)""",
+        """INSERT INTO order_items (order_id, product_id, quantity, unit_price, total_price)
+           SELECT MAX(order_id), 3, 2, 125.00, 250.00 FROM orders""",
+        """INSERT INTO reviews (customer_id, product_id, rating, review_date) VALUES (2, 3, 4, NOW())"""
+    ],
+    [
+        """INSERT INTO orders (customer_id, order_date, status, total_amount, updated_at)
+           VALUES (1, '2023-06-15 10:00:00', 'Delivered', 80.00, NOW() - INTERVAL 60 SECOND)""",
+        """INSERT INTO order_items (order_id, product_id, quantity, unit_price, total_price)
+           SELECT MAX(order_id), 1, 1, 80.00, 80.00 FROM orders""",
+        """INSERT INTO reviews (customer_id, product_id, rating, review_date) VALUES (1, 1, 2, NOW() - INTERVAL 60 SECOND)""",
+        "UPDATE orders SET status = 'Cancelled', total_amount = 0 WHERE order_id = 2"
+    ]
+]
+
+def execute_file(cursor, path):
+    with open(path) as script:
+        for statement in script.read().split(';'):
+            if statement.strip():
+                cursor.execute(statement)
+
+def snapshot(cursor, rollup_names):
+    tables = {}
+    for rollup_name in rollup_names:
+        cursor.execute(f"SELECT * FROM {rollup_name} ORDER BY 1, 2")
+        tables[rollup_name] = cursor.fetchall()
+    return tables
+
+def main():
+    # Resets the database the Lambda is configured for (RDS_ENDPOINT,
+    # DB_USERNAME, DB_PASSWORD, DB_NAME) to the sample data.
+    data_processor = load_data_processor()
+    section_names = [section_name for section_name, _, _ in data_processor.ANALYTICS_SECTIONS]
+    rollup_names = list(data_processor.ROLLUP_REFRESHES)
+    connection = data_processor.get_db_connection()
+    if not connection:
+        print("Could not connect to the check database")
+        return 1
+    try:
+        with connection.cursor() as cursor:
+            execute_file(cursor, SCHEMA_PATH)
+            execute_file(cursor, SAMPLE_DATA_PATH)
+            data_processor.refresh_rollups(section_names)
+            for statements in CHANGE_ROUNDS:
+                for statement in statements:
+                    cursor.execute(statement)
+                data_processor.refresh_rollups(section_names)
+            refreshed = snapshot(cursor, rollup_names)
+
+            data_processor.refresh_rollups(section_names, rebuild=True)
+            rebuilt = snapshot(cursor, rollup_names)
+    finally:
+        connection.close()
+
+    failures = [rollup_name for rollup_name in rollup_names if refreshed[rollup_name] != rebuilt[rollup_name]]
+    for rollup_name in failures:
+        print(f"{rollup_name} differs from a full rebuild:")
+        print(f"  refreshed: {[row for row in refreshed[rollup_name] if row not in rebuilt[rollup_name]]}")
+        print(f"  rebuilt:   {[row for row in rebuilt[rollup_name] if row not in refreshed[rollup_name]]}")
+    if failures:
+        return 1
+    print(f"Incremental refreshes match a full rebuild for {', '.join(rollup_names)}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
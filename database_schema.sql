@@ -1,3 +1,9 @@
+DROP TABLE IF EXISTS rollup_checkpoints;
+DROP TABLE IF EXISTS customer_order_stats;
+DROP TABLE IF EXISTS monthly_sales_stats;
+DROP TABLE IF EXISTS monthly_customer_activity;
+DROP TABLE IF EXISTS product_sales_stats;
+DROP TABLE IF EXISTS product_review_stats;
 DROP TABLE IF EXISTS payments;
 DROP TABLE IF EXISTS reviews;
 DROP TABLE IF EXISTS order_items;
@@ -53,6 +59,7 @@ CREATE TABLE orders (
     discount_amount DECIMAL(8,2) DEFAULT 0.00,
     promo_code VARCHAR(20),
     notes TEXT,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     FOREIGN KEY (customer_id) REFERENCES customers(customer_id)
 );
 
@@ -94,6 +101,7 @@ CREATE TABLE payments (
     gateway_response TEXT,
     refund_amount DECIMAL(10,2) DEFAULT 0.00,
     refund_date DATETIME,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     FOREIGN KEY (order_id) REFERENCES orders(order_id)
 );
 
@@ -109,4 +117,60 @@ CREATE INDEX idx_order_items_product ON order_items(product_id);
 CREATE INDEX idx_reviews_product ON reviews(product_id);
 CREATE INDEX idx_reviews_customer ON reviews(customer_id);
 CREATE INDEX idx_payments_order ON payments(order_id);
-CREATE INDEX idx_payments_status ON payments(payment_status);
\ No newline at end of file
+CREATE INDEX idx_payments_status ON payments(payment_status);
+CREATE INDEX idx_orders_updated ON orders(updated_at);
+CREATE INDEX idx_payments_updated ON payments(updated_at);
+CREATE INDEX idx_reviews_date ON reviews(review_date);
+
+CREATE INDEX idx_orders_customer_amount ON orders(customer_id, total_amount);
+CREATE INDEX idx_orders_date_customer_amount ON orders(order_date, customer_id, total_amount);
+CREATE INDEX idx_order_items_product_sales ON order_items(product_id, quantity, total_price, unit_price);
+CREATE INDEX idx_reviews_product_rating ON reviews(product_id, rating);
+CREATE INDEX idx_payments_method_status_amount ON payments(payment_method, payment_status, amount);
+
+CREATE TABLE customer_order_stats (
+    customer_id INT PRIMARY KEY,
+    order_count INT NOT NULL,
+    revenue DECIMAL(14,2) NOT NULL,
+    max_order_value DECIMAL(10,2),
+    min_order_value DECIMAL(10,2)
+);
+
+CREATE TABLE monthly_sales_stats (
+    order_month CHAR(7) PRIMARY KEY,
+    order_count INT NOT NULL,
+    revenue DECIMAL(14,2) NOT NULL
+);
+
+CREATE TABLE monthly_customer_activity (
+    order_month CHAR(7) NOT NULL,
+    customer_id INT NOT NULL,
+    PRIMARY KEY (order_month, customer_id)
+);
+
+CREATE TABLE product_sales_stats (
+    product_id INT PRIMARY KEY,
+    times_ordered INT NOT NULL,
+    total_quantity_sold INT NOT NULL,
+    total_revenue DECIMAL(14,2) NOT NULL,
+    unit_price_sum DECIMAL(14,2) NOT NULL
+);
+
+CREATE TABLE product_review_stats (
+    product_id INT PRIMARY KEY,
+    review_count INT NOT NULL,
+    rating_sum INT NOT NULL
+);
+
+CREATE TABLE rollup_checkpoints (
+    rollup_name VARCHAR(50) PRIMARY KEY,
+    refreshed_at DATETIME,
+    rebuilt_at DATETIME
+);
+
+INSERT INTO rollup_checkpoints (rollup_name) VALUES
+('customer_order_stats'),
+('monthly_sales_stats'),
+('monthly_customer_activity'),
+('product_sales_stats'),
+('product_review_stats');